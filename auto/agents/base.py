@@ -4,11 +4,14 @@ import json
 import logging
 import re
 from abc import ABCMeta, abstractmethod
-from typing import TYPE_CHECKING, Any, Literal
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Iterable, Literal, Optional
 
 from auto.agents.agent_actions import ActionResult
+from auto.core.json_utils.incremental import FieldCallback, IncrementalJSONParser, JSONPath
 from auto.core.json_utils.utilities import extract_dict_from_response, validate_dict
-from auto.core.llm.base import ChatModelResponse
+from auto.core.llm.base import ChatMessage, ChatModelResponse
+from auto.core.llm.budget import usage_scope
 from auto.core.memory.local_memory import LocalMemory
 from auto.core.models.command import CommandOutput
 from auto.utils.exceptions import (
@@ -24,6 +27,9 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+_pending_responses: ContextVar[tuple[str, ...]] = ContextVar("aium_pending_responses", default=())
+"""最近一次请求中尚未校验的 LLM 响应的缓存键，推测定位等后台线程各自独立"""
+
 CommandName = str
 CommandArgs = dict[str, str]
 AgentThoughts = dict[str, Any]
@@ -134,20 +140,113 @@ class BaseAgent(metaclass=ABCMeta):
     def done(self):
         pass
 
-    def extract_and_validate(self, response_content):
-        assistant_reply_dict = extract_dict_from_response(response_content)
+    def fetch_completion(
+            self,
+            messages: list[ChatMessage],
+            chat_completion_kwargs: dict[str, Any],
+            watch: Iterable[JSONPath] = (),
+            on_field: Optional[FieldCallback] = None,
+    ) -> str:
+        """
+        请求 LLM 并返回响应内容
 
-        _, errors = validate_dict(assistant_reply_dict, self.config)
-        if errors:
-            raise InvalidAgentResponseError(
-                "Validation of response failed:\n  "
-                + ";\n  ".join([str(e) for e in errors])
-            )
+        开启 llm_streaming 时边接收边解析：command 一闭合就检查其格式，watch 中的字段闭合时调用 on_field，
+        出现格式错误立即中止请求并抛出 InvalidAgentResponseError，而不是等待整个响应生成完毕
+        """
+        # 上一次的响应没有经过 extract_and_validate，视为调用方已接受
+        self.settle_responses(valid=True)
+        pending: list[str] = []
+        try:
+            with usage_scope(agent=self.get_agent_name()):
+                content = self._fetch_completion(messages, chat_completion_kwargs, watch, on_field, pending)
+        except Exception:
+            self._settle(pending, valid=False)
+            raise
+        _pending_responses.set(tuple(pending))
+        return content
+
+    @staticmethod
+    def settle_responses(valid: bool):
+        """
+        响应通过校验后才写入 LLM 响应缓存，否则丢弃，重试时重新请求接口而不是取回同一个无效响应
+        """
+        keys = _pending_responses.get()
+        if keys:
+            _pending_responses.set(())
+            BaseAgent._settle(list(keys), valid)
 
-        # Get command name and arguments
-        command_name, arguments = self.extract_command(
-            assistant_reply_dict
+    @staticmethod
+    def _settle(keys: list[str], valid: bool):
+        if not keys:
+            return
+        from auto.core.llm.response_cache import get_response_cache
+
+        cache = get_response_cache()
+        if valid:
+            cache.commit(keys)
+        else:
+            cache.discard(keys)
+
+    def _fetch_completion(
+            self,
+            messages: list[ChatMessage],
+            chat_completion_kwargs: dict[str, Any],
+            watch: Iterable[JSONPath],
+            on_field: Optional[FieldCallback],
+            pending: list[str],
+    ) -> str:
+        # LLM 客户端（openai、aiohttp）在首次请求时才加载
+        from auto.core.llm.gpt import create_chat_completion, create_chat_completion_stream
+
+        if not self.config.llm_streaming:
+            completion = create_chat_completion(messages, cache_pending=pending, **chat_completion_kwargs)
+            content = completion.choices[0].message.content
+            if on_field is not None:
+                # 与流式解析一致，关注的字段在返回前检查格式
+                reply = extract_dict_from_response(content)
+                for path in watch:
+                    value = reply
+                    for key in path:
+                        value = value.get(key) if isinstance(value, dict) else None
+                    if value is not None:
+                        on_field(path, value)
+            return content
+
+        def handle_field(path: JSONPath, value: Any):
+            if path == ("command",):
+                self.extract_command({"command": value})
+            elif on_field is not None:
+                on_field(path, value)
+
+        watch = set(watch)
+        if not self.config.openai_functions:
+            watch.add(("command",))
+        parser = IncrementalJSONParser(watch, handle_field)
+        completion = create_chat_completion_stream(
+            messages, parser.feed, cache_pending=pending, **chat_completion_kwargs
         )
+        parser.close()
+        return completion.choices[0].message.content
+
+    def extract_and_validate(self, response_content):
+        try:
+            assistant_reply_dict = extract_dict_from_response(response_content)
+
+            _, errors = validate_dict(assistant_reply_dict, self.config)
+            if errors:
+                raise InvalidAgentResponseError(
+                    "Validation of response failed:\n  "
+                    + ";\n  ".join([str(e) for e in errors])
+                )
+
+            # Get command name and arguments
+            command_name, arguments = self.extract_command(
+                assistant_reply_dict
+            )
+        except InvalidAgentResponseError:
+            self.settle_responses(valid=False)
+            raise
+        self.settle_responses(valid=True)
         response = command_name, arguments, assistant_reply_dict
 
         return response
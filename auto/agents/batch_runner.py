@@ -0,0 +1,224 @@
+"""
+批量并行执行
+
+在固定数量的工作线程中并行执行多个意图或用例，每个会话使用独立的管家、浏览器以及 IsolateGlobalData/IsolateSteps，
+支持单个会话超时并汇总所有会话的执行结果。
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Literal, Optional
+
+from auto.agents.cases import BatchCase, describe_case, load_cases  # noqa: F401
+from auto.agents.housekeeper import Housekeeper
+from auto.config import Config
+from auto.core.drivers import DriverMetaData, DriverPool
+from auto.core.models.command_registry import CommandRegistry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionResult:
+    """单个会话的执行结果"""
+
+    case: str
+    session_id: Optional[str] = None
+    status: Literal["success", "error", "timeout"] = "success"
+    started_at: float = 0.0
+    duration: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchReport:
+    """批量执行的汇总结果"""
+
+    results: list[SessionResult] = field(default_factory=list)
+    workers: int = 1
+    wall_time: float = 0.0
+
+    def count(self, status: str) -> int:
+        return sum(1 for result in self.results if result.status == status)
+
+    def to_dict(self) -> dict:
+        return {
+            "total": len(self.results),
+            "success": self.count("success"),
+            "error": self.count("error"),
+            "timeout": self.count("timeout"),
+            "workers": self.workers,
+            "wall_time": self.wall_time,
+            "results": [asdict(result) for result in self.results],
+        }
+
+    def summary(self) -> str:
+        return (
+            f"共 {len(self.results)} 个会话，成功 {self.count('success')}，失败 {self.count('error')}，"
+            f"超时 {self.count('timeout')}，并发 {self.workers}，总耗时 {self.wall_time:.1f}s"
+        )
+
+
+class BatchRunner:
+    """
+    批量执行器
+    """
+
+    def __init__(
+            self,
+            command_registry: CommandRegistry,
+            config: Config,
+            workers: int = 4,
+            session_timeout: Optional[float] = None,
+    ):
+        self.command_registry = command_registry
+        self.config = config
+        self.workers = max(1, workers)
+        self.session_timeout = session_timeout
+
+        self.driver_pool: Optional[DriverPool] = None
+        """所有工作线程共享的浏览器池，浏览器数量不超过并发数"""
+        if config.driver_pool_size > 0:
+            self.driver_pool = DriverPool(size=self.workers, max_size=self.workers)
+            self.driver_pool.prefill(DriverMetaData(selenium_headless=config.selenium_headless))
+
+        self._lock = threading.Lock()
+        self._active: dict[int, Housekeeper] = {}
+        self._timed_out: set[int] = set()
+        self._finished: set[int] = set()
+        self._pending: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads = 0
+
+    def run(self, cases: list[BatchCase]) -> BatchReport:
+        report = BatchReport(results=[SessionResult(describe_case(case)) for case in cases], workers=self.workers)
+        started = time.perf_counter()
+
+        self._timed_out.clear()
+        self._finished.clear()
+        for index, case in enumerate(cases):
+            self._pending.put((index, case, report.results[index]))
+        try:
+            for _ in range(min(self.workers, len(cases))):
+                self._start_worker()
+            # 超时的会话不再等待，例如阻塞在 askUser 的输入上
+            while True:
+                with self._lock:
+                    if len(self._finished | self._timed_out) >= len(cases):
+                        break
+                self._check_timeouts(report)
+                time.sleep(0.5)
+        finally:
+            if self.driver_pool is not None:
+                self.driver_pool.close()
+
+        report.wall_time = time.perf_counter() - started
+        print(f"【Aium】批量执行完成：{report.summary()}")
+        return report
+
+    def stuck_sessions(self) -> int:
+        """超时后仍未结束的会话数，这些线程阻塞时（例如等待 input()）解释器无法正常退出"""
+        with self._lock:
+            return len(self._timed_out - self._finished)
+
+    def flush_stuck_sessions(self):
+        """写入超时后仍未结束的会话中缓冲的上下文，进程随后会直接退出，这些会话的 stopSession 不会再执行"""
+        with self._lock:
+            stuck = [housekeeper for index, housekeeper in self._active.items() if index in self._timed_out]
+        for housekeeper in stuck:
+            try:
+                housekeeper.flushMemory()
+            except Exception as e:
+                logger.warning(f"Failed to flush memory of a timed-out session: {e}")
+
+    def _start_worker(self):
+        """
+        工作线程为守护线程：超时后仍阻塞的会话（例如等待 input() 的 askUser）不会阻止进程退出
+        """
+        self._threads += 1
+        threading.Thread(target=self._work, name=f"aium-session-{self._threads}", daemon=True).start()
+
+    def _work(self):
+        while True:
+            try:
+                index, case, result = self._pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self._run_case(index, case, result)
+            except Exception as e:
+                logger.debug(f"Session {index} failed to start", exc_info=True)
+                result.status = "error"
+                result.error = f"{type(e).__name__}: {e}"
+            with self._lock:
+                self._finished.add(index)
+                if index in self._timed_out:
+                    # 超时时已启动替代的工作线程，当前线程退出以保持并发数不变
+                    return
+
+    def _run_case(self, index: int, case: BatchCase, result: SessionResult):
+        housekeeper = Housekeeper(self.command_registry, self.config, driver_pool=self.driver_pool)
+        result.started_at = time.time()
+        started = time.perf_counter()
+        with self._lock:
+            self._active[index] = housekeeper
+
+        _id = None
+        try:
+            if isinstance(case, str):
+                _id, isolate_global, isolate_steps = housekeeper.recognitionIntention(case)
+            elif case.get("steps"):
+                _id, isolate_global, isolate_steps = housekeeper.loadCase(case.get("_global", {}), case["steps"])
+            else:
+                _id, isolate_global, isolate_steps = housekeeper.recognitionIntention(case["intention"])
+            result.session_id = _id
+
+            housekeeper.startSession(_id, isolate_global, isolate_steps)
+        except Exception as e:
+            logger.debug(f"Session {index} failed", exc_info=True)
+            with self._lock:
+                if index not in self._timed_out:
+                    result.status = "error"
+                    result.error = f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self._active.pop(index, None)
+                if index not in self._timed_out:
+                    result.duration = time.perf_counter() - started
+            try:
+                if _id is not None and housekeeper.get_executor(_id) is not None:
+                    housekeeper.stopSession(_id)
+                housekeeper.shutdown()
+            except Exception as e:
+                logger.debug(f"Failed to stop session {_id}: {e}")
+
+    def _check_timeouts(self, report: BatchReport):
+        if not self.session_timeout:
+            return
+        now = time.time()
+        with self._lock:
+            expired = [
+                (index, housekeeper) for index, housekeeper in self._active.items()
+                if index not in self._timed_out and now - report.results[index].started_at > self.session_timeout
+            ]
+            for index, _ in expired:
+                self._timed_out.add(index)
+                result = report.results[index]
+                result.status = "timeout"
+                result.error = f"Session exceeded {self.session_timeout}s"
+                result.duration = now - result.started_at
+
+        for index, housekeeper in expired:
+            print(f"【Aium】会话超时，终止执行：{report.results[index].case}")
+            # 超时的线程可能无法结束，由新的工作线程继续执行剩余的用例
+            if not self._pending.empty():
+                self._start_worker()
+            # 关闭浏览器使阻塞中的驱动调用立即失败，工作线程随之结束
+            for executor in list(housekeeper.executors.values()):
+                try:
+                    executor.driver.quit()
+                except Exception:
+                    pass
@@ -0,0 +1,70 @@
+"""
+批量用例
+
+用例文件的读取与校验。只依赖标准库，校验用例文件时不需要加载 LLM 客户端和 selenium。
+"""
+from __future__ import annotations
+
+import json
+from typing import Union
+
+BatchCase = Union[str, dict]
+"""意图字符串，或包含 intention / _global + steps 的用例字典"""
+
+
+def load_cases(path: str) -> list[BatchCase]:
+    """
+    读取批量用例文件：.json 文件为用例数组，其他文件每行一个意图
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def describe_case(case: BatchCase) -> str:
+    if isinstance(case, str):
+        return case
+    return case.get("intention") or case.get("name") or str(case.get("steps", ""))
+
+
+def validate_cases(cases) -> list[str]:
+    """
+    检查用例结构是否能被 BatchRunner 执行
+    :return: 错误信息列表，为空时表示全部合法
+    """
+    if not isinstance(cases, list):
+        return [f"用例文件应为数组，实际为 {type(cases).__name__}"]
+
+    errors = []
+    for index, case in enumerate(cases, 1):
+        prefix = f"第 {index} 个用例"
+        if isinstance(case, str):
+            if not case.strip():
+                errors.append(f"{prefix}：意图为空")
+            continue
+        if not isinstance(case, dict):
+            errors.append(f"{prefix}：应为字符串或对象，实际为 {type(case).__name__}")
+            continue
+
+        if not case.get("steps"):
+            if not isinstance(case.get("intention"), str) or not case["intention"].strip():
+                errors.append(f"{prefix}：缺少 intention 或 steps")
+            continue
+
+        global_data = case.get("_global", {})
+        if not isinstance(global_data, dict):
+            errors.append(f"{prefix}：_global 应为对象")
+        elif not global_data.get("rootPath"):
+            errors.append(f"{prefix}：_global 缺少 rootPath")
+
+        steps = case["steps"]
+        if not isinstance(steps, list):
+            errors.append(f"{prefix}：steps 应为数组")
+            continue
+        for step_index, step in enumerate(steps, 1):
+            if not isinstance(step, dict) or not step.get("name"):
+                errors.append(f"{prefix}：第 {step_index} 个步骤缺少 name")
+            elif "num" not in step:
+                errors.append(f"{prefix}：第 {step_index} 个步骤缺少 num")
+    return errors
@@ -1,29 +1,48 @@
+import contextvars
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Tuple, Dict, Optional
 
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
 from auto.agents.agent_actions import ActionResult, ActionSuccessResult, ActionErrorResult
 from auto.agents.base import BaseAgent
 from auto.agents.location_agent import LocationAgent
-from auto.agents.script_agent import ScriptAgent
+from auto.agents.plan_agent import PlanAgent
+from auto.agents.script_agent import ScriptAgent, is_replayable
 from auto.config import Config
-from auto.core.drivers import DriverExecutor
+from auto.core.dom import PageState, get_dom_tracker
+from auto.core.drivers import DriverExecutor, DriverMetaData, DriverPool
 from auto.core.llm.base import ChatMessage, ChatRole
-from auto.core.llm.gpt import create_chat_completion
+from auto.core.llm.budget import configure_budget_ledger, get_budget_ledger, usage_scope
 from auto.core.memory.base import MemoryProvider
-from auto.core.memory.json_file import JSONFileMemory
+from auto.core.memory.factory import create_memory
 from auto.core.models.command_registry import CommandRegistry
 from auto.core.models.context_item import ContextItem
 from auto.core.prompt.prompts import INTENTION
+from auto.core.tracing import configure_tracer, get_tracer, traced
 from auto.globals.global_data import IsolateGlobalData, map_dict_to_class, IsolateSteps, LocationItems
 from auto.utils.exceptions import AgentException
 
 
+@dataclass
+class Speculation:
+    """为下一步提前发起的定位"""
+
+    step: dict
+    page: PageState
+    """发起推测时的页面状态"""
+    future: Future
+
+
 class Housekeeper(BaseAgent):
     def __init__(
             self,
             command_registry: CommandRegistry,
             config: Config,
+            driver_pool: Optional[DriverPool] = None,
     ):
         super().__init__(
             command_registry=command_registry,
@@ -42,6 +61,29 @@ class Housekeeper(BaseAgent):
         self.executors: Dict[str, DriverExecutor] = {}
         """初始化驱动桶"""
 
+        self.driver_pool: Optional[DriverPool] = driver_pool
+        """预热的浏览器池，未开启时每个会话单独启动浏览器"""
+        self._owns_driver_pool = False
+        if self.driver_pool is None and config.driver_pool_size > 0:
+            self._owns_driver_pool = True
+            self.driver_pool = DriverPool(config.driver_pool_size, config.driver_pool_max_size)
+            self.driver_pool.prefill(self.driver_meta_data())
+
+        self.speculation_stats = {"attempts": 0, "hits": 0, "misses": 0, "wasted": 0}
+        """流水线模式下推测定位的统计，wasted 为已经发出请求（产生费用）却被丢弃的推测"""
+        self._speculation_pool: Optional[ThreadPoolExecutor] = None
+
+        if config.trace_enabled:
+            configure_tracer(True, config.trace_path)
+        configure_budget_ledger(
+            session_tokens=config.budget_session_tokens,
+            session_cost=config.budget_session_cost,
+            suite_tokens=config.budget_suite_tokens,
+            suite_cost=config.budget_suite_cost,
+            on_exceed=config.budget_on_exceed,
+            downgrade_model=config.budget_downgrade_model,
+        )
+
         print("【Aium】管家为您服务！")
 
     def get_memory(self):
@@ -60,7 +102,11 @@ class Housekeeper(BaseAgent):
         if id in self.executors:
             executor = self.get_executor(id)
             if executor is not None:
-                executor.close_browser()
+                if self.driver_pool is not None:
+                    # 归还浏览器池，重置后供下一个会话复用
+                    self.driver_pool.release(executor)
+                else:
+                    executor.close_browser()
             del self.executors[id]
         else:
             raise KeyError(f"Executor '{id}' not found.")
@@ -108,6 +154,7 @@ class Housekeeper(BaseAgent):
 
             return result
 
+    @traced("intention")
     def recognitionIntention(self, intention) -> Tuple[str, IsolateGlobalData, IsolateSteps]:
         """
         识别用户意图 并且创建全局数据
@@ -117,27 +164,28 @@ class Housekeeper(BaseAgent):
         print("【Aium】管家正在识别客户意图：" + intention)
 
         _id = str(uuid.uuid4()).replace('-', '')
-        self.memory = JSONFileMemory(_id, self.get_agent_name())
+        get_tracer().bind_session(_id)
+        self.memory = create_memory(self.config, _id, self.get_agent_name())
         """初始化当前Agent的上下文"""
 
         isolate_global = IsolateGlobalData()
         isolate_steps = IsolateSteps()
         while True:
-            memories = self.local_memory.get_memories()
-            memories.insert(0, ChatMessage(role=ChatRole.SYSTEM, content=INTENTION))
-            # 避免重复占用token数，临时存储 结果返回才进行持久化
-            memories.append(ChatMessage(role=ChatRole.USER, content=intention))
-
-
             model = "gpt-3.5-turbo"
             chat_completion_kwargs = {
                 "model": model,
                 "temperature": 0,
                 "max_tokens": 2048  # OPEN_AI_CHAT_MODELS[chat_model_mapping[model]].max_tokens / 2 - 1,
             }
-            completion = create_chat_completion(memories, **chat_completion_kwargs)
-            response_raw = completion.choices[0].message
-            response_content = response_raw.content
+            system_message = ChatMessage(role=ChatRole.SYSTEM, content=INTENTION)
+            # 避免重复占用token数，临时存储 结果返回才进行持久化
+            user_message = ChatMessage(role=ChatRole.USER, content=intention)
+            memories = self.local_memory.get_memories(
+                model, chat_completion_kwargs["max_tokens"], [system_message, user_message]
+            )
+            memories.insert(0, system_message)
+            memories.append(user_message)
+            response_content = self.fetch_completion(memories, chat_completion_kwargs)
 
             # response_content = """
             # {
@@ -209,6 +257,26 @@ class Housekeeper(BaseAgent):
 
         return isolate_global._id, isolate_global, isolate_steps
 
+    def loadCase(self, global_data: dict, steps: list) -> Tuple[str, IsolateGlobalData, IsolateSteps]:
+        """
+        直接加载已拆解好步骤的用例，跳过意图识别
+        :param global_data: 与意图识别结果中 data._global 结构一致
+        :param steps: 与意图识别结果中 data.steps 结构一致
+        """
+        isolate_global = IsolateGlobalData()
+        # _id 由管家生成，不使用用例中的值
+        map_dict_to_class({k: v for k, v in global_data.items() if k != "_id"}, isolate_global)
+        if not isolate_global.currentPath:
+            isolate_global.currentPath = isolate_global.rootPath
+
+        isolate_steps = IsolateSteps()
+        isolate_steps._id = isolate_global._id
+        isolate_steps.steps = steps
+
+        get_tracer().bind_session(isolate_global._id)
+        self.memory = create_memory(self.config, isolate_global._id, self.get_agent_name())
+        return isolate_global._id, isolate_global, isolate_steps
+
     def done(self):
         print("【Aium】管家当前阶段任务完成")
 
@@ -219,10 +287,19 @@ class Housekeeper(BaseAgent):
         2、找对应的Agent去做对应的事情
         """
 
+        tracer = get_tracer()
+        tracer.bind_session(_id)
+
         # 初始化驱动
-        manager = DriverExecutor()
-        executor = manager.start()
+        with tracer.span("driver.acquire"):
+            if self.driver_pool is not None:
+                executor = self.driver_pool.acquire(self.driver_meta_data())
+            else:
+                manager = DriverExecutor()
+                executor = manager.start(self.driver_meta_data())
         isolate_global.sessionId = executor.meta_data.session_id
+        if self.config.dom_incremental:
+            executor.track_dom()
 
         self.add_executor(_id, executor)
         print("【Aium】浏览器准备完成！")
@@ -232,38 +309,247 @@ class Housekeeper(BaseAgent):
 
         self.doStep(executor.driver, isolate_global, isolate_steps.steps)
 
+    def driver_meta_data(self) -> DriverMetaData:
+        return DriverMetaData(selenium_headless=self.config.selenium_headless)
+
     def doStep(self, driver, isolate_global, steps=[]):
         """
         保证整个环境执行的作用域
         """
+        if self.config.step_mode == "batch" and isinstance(self.get_warrior(PlanAgent.get_agent_name()), PlanAgent):
+            return self.doBatchedSteps(driver, isolate_global, steps)
+        if self.config.step_pipeline and isinstance(self.get_warrior(LocationAgent.get_agent_name()), LocationAgent):
+            return self.doPipelinedSteps(driver, isolate_global, steps)
+
         for step in steps:
             if 'name' in step and 'num' in step:
                 print(f"【Step {step['num']}】: {step['name']}")
+                self.runStep(driver, isolate_global, step)
+            else:
+                print("Step object is missing required attributes (name and num).")
 
-                # 定位
-                page_source = driver.page_source
-                location_agent = self.get_warrior(LocationAgent.get_agent_name())
+    def runStep(self, driver, isolate_global, step):
+        """
+        单个步骤：定位、生成脚本、执行脚本各一次
+        """
+        tracer = get_tracer()
+        with tracer.span("step", num=step['num'], step=step['name']), usage_scope(step=str(step['num'])):
+            # 定位
+            location_agent = self.get_warrior(LocationAgent.get_agent_name())
+
+            location_items: LocationItems = LocationItems([])
+            if isinstance(location_agent, LocationAgent):
+                with tracer.span("locate"):
+                    location_items = location_agent.find_element_on_page(driver, step['name'])
+
+            # 生成脚本
+            script_code: str = ""
+            script_agent = self.get_warrior(ScriptAgent.get_agent_name())
+            if isinstance(script_agent, ScriptAgent):
+                with tracer.span("script.generate"):
+                    script_code = script_agent.generate_script(
+                        step['name'], location_items, isolate_global.currentPath
+                    )
 
-                location_items: LocationItems = LocationItems([])
-                if isinstance(location_agent, LocationAgent):
-                    location_items = location_agent.find_element(page_source, step['name'])
+            # 驱动脚本
+            with tracer.span("script.exec"):
+                try:
+                    script_agent.exec_script(driver, script_code, location_items)
+                except (NoSuchElementException, TimeoutException) as e:
+                    if not self.config.locator_healing or not isinstance(location_agent, LocationAgent):
+                        raise
+                    self.checkReplayable(e)
+                    self.relocateStep(driver, isolate_global, step, location_agent, script_agent)
+
+            # 实时更新当前url
+            with tracer.span("driver.current_url"):
+                isolate_global.currentPath = driver.current_url
 
-                # 生成脚本
-                script_code: str = ""
-                script_agent = self.get_warrior(ScriptAgent.get_agent_name())
-                if isinstance(script_agent, ScriptAgent):
-                    script_code = script_agent.generate_script(step['name'], location_items, isolate_global.currentPath)
+    def checkReplayable(self, error: Exception):
+        """
+        重新定位后整体重新执行步骤之前的检查：脚本失败前已经输入、点击或跳转过时，重新执行会重复输入或在其他页面上操作，
+        此时直接抛出原异常
+        """
+        if not is_replayable(error):
+            print("【Aium】脚本失败前已执行过页面操作，不重新执行该步骤")
+            raise error
 
-                # 驱动脚本
-                script_agent.exec_script(driver, script_code)
+    def relocateStep(self, driver, isolate_global, step, location_agent: LocationAgent, script_agent: ScriptAgent):
+        """
+        脚本找不到元素且本地修复失败：跳过定位缓存重新请求 LLM 定位，重新生成脚本并执行一次；
+        只在失败的脚本尚未改变页面状态时调用，见 checkReplayable
+        """
+        print("【Aium】本地修复定位失败，重新请求定位")
+        tracer = get_tracer()
+        with tracer.span("locate", refresh=True):
+            location_items = location_agent.find_element_on_page(driver, step['name'], refresh=True)
+        with tracer.span("script.generate"):
+            script_code = script_agent.generate_script(step['name'], location_items, isolate_global.currentPath)
+        script_agent.exec_script(driver, script_code, location_items)
+
+    def doBatchedSteps(self, driver, isolate_global, steps=[]):
+        """
+        批量规划：对同一页面状态下连续的步骤一次请求完成定位与脚本生成，再依次执行；
+        每执行完一个步骤检查 URL 与页面指纹，页面发生变化时剩余步骤按新页面重新规划，
+        规划结果中缺少的步骤按单步方式处理
+        """
+        tracer = get_tracer()
+        plan_agent: PlanAgent = self.get_warrior(PlanAgent.get_agent_name())
+        script_agent: ScriptAgent = self.get_warrior(ScriptAgent.get_agent_name())
 
-                # 实时更新当前url
-                isolate_global.currentPath = driver.current_url
+        valid_steps = []
+        for step in steps:
+            if 'name' in step and 'num' in step:
+                valid_steps.append(step)
+            else:
+                print("Step object is missing required attributes (name and num).")
 
+        index = 0
+        page = plan_agent.read_page(driver) if valid_steps else None
+        while index < len(valid_steps):
+            window = valid_steps[index:index + max(1, self.config.plan_batch_max_steps)]
+            with tracer.span("plan", steps=len(window)), usage_scope(step=str(window[0]['num'])):
+                batch = plan_agent.plan(page, window)
 
+            for step in window:
+                print(f"【Step {step['num']}】: {step['name']}")
+                plan = batch.get(step['num'])
+                if plan is None:
+                    self.runStep(driver, isolate_global, step)
+                else:
+                    with tracer.span("step", num=step['num'], step=step['name'], planned=True):
+                        try:
+                            with tracer.span("script.exec"):
+                                script_agent.exec_script(driver, plan.script_code, plan.location_items)
+                        except (NoSuchElementException, TimeoutException) as e:
+                            if not self.config.locator_healing:
+                                raise
+                            self.checkReplayable(e)
+                            # 规划的定位在本地无法修复时按单步方式重新定位
+                            print("【Aium】规划的定位失效，按单步方式重新定位")
+                            self.runStep(driver, isolate_global, step)
+                        with tracer.span("driver.current_url"):
+                            isolate_global.currentPath = driver.current_url
+                index += 1
+                if index == len(valid_steps):
+                    break
+
+                current = plan_agent.read_page(driver)
+                changed = not current.same_as(page)
+                page = current
+                if changed and step is not window[-1]:
+                    print("【Aium】页面已变化，重新规划剩余步骤")
+                    break
+
+    def doPipelinedSteps(self, driver, isolate_global, steps=[]):
+        """
+        流水线执行：当前步骤生成与执行脚本期间，以当前页面作为执行后页面的预期，在后台提前为下一步定位；
+        当前步骤执行完后页面指纹与推测时一致则直接采用推测结果，否则取消或丢弃，按新页面重新定位
+        """
+        tracer = get_tracer()
+        location_agent: LocationAgent = self.get_warrior(LocationAgent.get_agent_name())
+        script_agent: ScriptAgent = self.get_warrior(ScriptAgent.get_agent_name())
+
+        valid_steps = []
+        for step in steps:
+            if 'name' in step and 'num' in step:
+                valid_steps.append(step)
             else:
                 print("Step object is missing required attributes (name and num).")
 
+        page = location_agent.read_page(driver) if valid_steps else None
+        speculation: Optional[Speculation] = None
+        try:
+            for index, step in enumerate(valid_steps):
+                print(f"【Step {step['num']}】: {step['name']}")
+                with tracer.span("step", num=step['num'], step=step['name']), usage_scope(step=str(step['num'])):
+                    with tracer.span("locate") as span:
+                        location_items = self.takeSpeculation(location_agent, speculation, step, page)
+                        span.set(speculated=location_items is not None)
+                        if location_items is None:
+                            location_items = location_agent.locate_on_page(page, step['name'], driver)
+
+                    speculation = None
+                    if index + 1 < len(valid_steps):
+                        speculation = self.speculate(location_agent, page, valid_steps[index + 1])
+
+                    with tracer.span("script.generate"):
+                        script_code = script_agent.generate_script(
+                            step['name'], location_items, isolate_global.currentPath
+                        )
+                    with tracer.span("script.exec"):
+                        try:
+                            script_agent.exec_script(driver, script_code, location_items)
+                        except (NoSuchElementException, TimeoutException) as e:
+                            if not self.config.locator_healing:
+                                raise
+                            self.checkReplayable(e)
+                            # 重新定位前先结束后台的推测，避免两者并发使用同一个 LocationAgent
+                            if speculation is not None:
+                                self.dropSpeculation(speculation)
+                                self.speculation_stats["misses"] += 1
+                                speculation = None
+                            self.relocateStep(driver, isolate_global, step, location_agent, script_agent)
+                    with tracer.span("driver.current_url"):
+                        isolate_global.currentPath = driver.current_url
+
+                if index + 1 < len(valid_steps):
+                    page = location_agent.read_page(driver)
+        finally:
+            if speculation is not None:
+                self.dropSpeculation(speculation)
+
+    def speculate(self, location_agent: LocationAgent, page: PageState, step) -> Speculation:
+        """
+        在后台线程中为下一步定位，沿用当前的会话与追踪上下文
+        """
+
+        def run():
+            with get_tracer().span("locator.speculate", num=step['num']), usage_scope(step=str(step['num'])):
+                return location_agent.speculate(page, step['name'])
+
+        if self._speculation_pool is None:
+            self._speculation_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aium-speculate")
+        self.speculation_stats["attempts"] += 1
+        return Speculation(step, page, self._speculation_pool.submit(contextvars.copy_context().run, run))
+
+    def takeSpeculation(self, location_agent: LocationAgent, speculation: Optional[Speculation], step,
+                        page: PageState) -> Optional[LocationItems]:
+        """
+        页面与推测时一致则采用推测结果，否则取消（尚未开始时）或丢弃
+        """
+        if speculation is None:
+            return None
+        if speculation.step is not step or not speculation.page.same_as(page):
+            self.dropSpeculation(speculation)
+            self.speculation_stats["misses"] += 1
+            print("【Aium】页面已变化，丢弃推测定位")
+            return None
+        try:
+            locations, exchange = speculation.future.result()
+        except Exception as e:
+            # 推测失败不影响执行，按正常流程重新定位
+            self.speculation_stats["misses"] += 1
+            print(f"【Aium】推测定位失败，重新定位：{e}")
+            return None
+        self.speculation_stats["hits"] += 1
+        location_agent.remember(exchange)
+        return location_agent.to_location_items(locations)
+
+    def dropSpeculation(self, speculation: Speculation):
+        """
+        丢弃推测：尚未开始时直接取消；已经发出的请求无法撤回，等待其结束，
+        避免与随后的前台定位并发使用同一个 LocationAgent（结果已写入定位缓存，不会浪费在下次相同页面上）
+        """
+        if speculation.future.cancel():
+            return
+        self.speculation_stats["wasted"] += 1
+        with get_tracer().span("locator.speculate.wait"):
+            try:
+                speculation.future.result()
+            except Exception:
+                pass
+
     def recruit(self, global_id: str):
         """
         招募 专项Agent
@@ -277,14 +563,98 @@ class Housekeeper(BaseAgent):
         self.add_warrior(ScriptAgent.get_agent_name(), script_agent)
         """负责生成脚本"""
 
+        if self.config.step_mode == "batch":
+            plan_agent = PlanAgent(self.command_registry, self.config, global_id)
+            self.add_warrior(PlanAgent.get_agent_name(), plan_agent)
+            """负责批量规划"""
+
     def stopSession(self, _id):
         """
         管家工作结束
         1、准备结束工作
         2、对应的Agent结束
         """
+        executor = self.get_executor(_id)
+        tracker = get_dom_tracker(executor.driver) if executor is not None else None
+        if tracker is not None:
+            stats = tracker.stats()
+            print(f"【Aium】增量快照统计：完整快照 {stats['full_snapshots']} 次，增量读取 {stats['incremental_reads']} 次，"
+                  f"替换子树 {stats['patched_subtrees']} 个，传输 {stats['transferred_chars']} 字符")
+
         self.remove_executor(_id)
 
+        self.flushMemory()
+
+        location_agent = self.get_warrior(LocationAgent.get_agent_name())
+        if isinstance(location_agent, LocationAgent) and location_agent.locator_cache is not None:
+            stats = location_agent.locator_cache.stats()
+            print(f"【Aium】定位缓存统计：命中 {stats['hits']} 次，未命中 {stats['misses']} 次（其中失效 {stats['stale']} 次），"
+                  f"淘汰 {stats['evictions']} 条，当前 {stats['size']} 条")
+
+        script_agent = self.get_warrior(ScriptAgent.get_agent_name())
+        if isinstance(script_agent, ScriptAgent) and script_agent.script_cache is not None:
+            stats = script_agent.script_cache.stats()
+            print(f"【Aium】脚本缓存统计：命中 {stats['hits']} 次，未命中 {stats['misses']} 次，"
+                  f"失效 {stats['invalidations']} 条，当前 {stats['size']} 条")
+
+        if isinstance(script_agent, ScriptAgent) and script_agent.fast_path is not None:
+            stats = script_agent.fast_path.stats
+            print(f"【Aium】脚本快速执行统计：快速执行 {stats['scripts']} 个，退回 exec {stats['fallbacks']} 个，"
+                  f"页面内调用 {stats['page_calls']} 次，WebDriver 执行 {stats['driver_ops']} 个操作")
+
+        healers = [agent.locator_healer for agent in (location_agent, script_agent)
+                   if isinstance(agent, (LocationAgent, ScriptAgent)) and agent.locator_healer is not None]
+        if healers:
+            stats = {key: sum(healer.stats[key] for healer in healers) for key in healers[0].stats}
+            print(f"【Aium】定位自愈统计：备选定位修复 {stats['alternatives']} 次，相似度修复 {stats['similarity']} 次，"
+                  f"未能修复 {stats['misses']} 次")
+
+        if self.speculation_stats["attempts"]:
+            stats = self.speculation_stats
+            decided = stats["hits"] + stats["misses"]
+            paid = stats["hits"] + stats["wasted"]
+            print(f"【Aium】推测定位统计：发起 {stats['attempts']} 次，采用 {stats['hits']} 次，丢弃 {stats['misses']} 次"
+                  f"（其中已发出请求 {stats['wasted']} 次），命中率 {stats['hits'] / decided if decided else 0:.0%}，"
+                  f"已发出请求的采用率 {stats['hits'] / paid if paid else 0:.0%}")
+
+        usage = get_budget_ledger().session_totals(_id)
+        if usage["requests"]:
+            print(f"【Aium】LLM用量：请求 {usage['requests']} 次（命中缓存 {usage['cache_hits']} 次），"
+                  f"{usage['tokens']} tokens，费用 ${usage['cost']:.4f}")
+
+        tracer = get_tracer()
+        if tracer.enabled:
+            report = tracer.report(_id)
+            if report:
+                print(f"【Aium】耗时统计（明细见 {tracer.trace_path / f'{_id}.jsonl'}）：\n{report}")
+
+        if self.driver_pool is not None:
+            metrics = self.driver_pool.metrics()
+            print(f"【Aium】驱动池统计：空闲 {metrics['idle']}，使用中 {metrics['in_use']}，"
+                  f"启动 {metrics['launches']} 次，复用 {metrics['reuses']} 次，"
+                  f"借出耗时 avg {metrics['checkout_avg']:.3f}s / p95 {metrics['checkout_p95']:.3f}s")
+
+    def flushMemory(self):
+        """
+        写入各 Agent 上下文中缓冲的消息（sqlite 后端按批写入）
+        """
+        for memory in [self.memory, *(warrior.get_memory() for warrior in self.warriors.values())]:
+            flush = getattr(memory, "flush", None)
+            if flush is not None:
+                flush()
+
+    def shutdown(self):
+        """
+        管家下班，释放所有浏览器
+        """
+        for _id in list(self.executors.keys()):
+            self.remove_executor(_id)
+        if self.driver_pool is not None and self._owns_driver_pool:
+            self.driver_pool.close()
+        if self._speculation_pool is not None:
+            self._speculation_pool.shutdown(wait=False, cancel_futures=True)
+            self._speculation_pool = None
+
     @staticmethod
     def get_agent_name():
         return "HouseKeeper"
@@ -1,20 +1,23 @@
-import re
 from datetime import datetime
-
-from bs4 import BeautifulSoup
+from typing import Optional
 
 from auto.agents.agent_actions import ActionResult, ActionSuccessResult, ActionErrorResult
 from auto.agents.base import BaseAgent
 from auto.config import Config
+from auto.core.cache.locator_cache import LocatorCache, get_locator_cache
+from auto.core.dom import (
+    LocatorHealer, PageState, capture_locations, normalize_strategy, read_page_state, reduce_dom, select_context,
+    select_index_rows
+)
 from auto.core.llm.base import ChatMessage, ChatRole
-from auto.core.llm.gpt import create_chat_completion
 from auto.core.memory.base import MemoryProvider
-from auto.core.memory.json_file import JSONFileMemory
+from auto.core.memory.factory import create_memory
 from auto.core.models.command_registry import CommandRegistry
 from auto.core.models.context_item import ContextItem
 from auto.core.prompt.prompts import LOCATOR
+from auto.core.tracing import get_tracer
 from auto.globals.global_data import LocationItems, LocationItem
-from auto.utils.exceptions import AgentException
+from auto.utils.exceptions import AgentException, InvalidAgentResponseError
 
 
 class LocationAgent(BaseAgent):
@@ -33,9 +36,23 @@ class LocationAgent(BaseAgent):
             config=config,
         )
 
-        self.memory: MemoryProvider = JSONFileMemory(global_id, self.get_agent_name())
+        self.memory: MemoryProvider = create_memory(config, global_id, self.get_agent_name())
         """声明当前Agent的上下文"""
 
+        self.locator_cache: LocatorCache = None
+        """定位缓存，命中时跳过LLM请求"""
+        if config.locator_cache_enabled:
+            self.locator_cache = get_locator_cache(
+                config.cache_path,
+                max_entries=config.locator_cache_max_entries,
+                ttl=config.locator_cache_ttl,
+            )
+
+        self.locator_healer: Optional[LocatorHealer] = None
+        """定位自愈，缓存的定位在当前页面失效时先在本地修复"""
+        if config.locator_healing:
+            self.locator_healer = LocatorHealer(config.locator_healing_threshold)
+
         self.created_at = datetime.now().strftime("%Y%m%d_%H%M%S")
         """Timestamp the agent was created; only used for structured debug logging."""
         print("【Aium】元素定位准备就绪！")
@@ -78,104 +95,196 @@ class LocationAgent(BaseAgent):
             return result
 
     def prepare(self, html_source_code) -> str:
-        soup = BeautifulSoup(html_source_code, 'html.parser')
-
-        # 找到所有的<img>标签
-        img_tags = soup.find_all('img')
-
-        # 遍历所有的<img>标签
-        for img_tag in img_tags:
-            src_attribute = img_tag.get('src')
-            if src_attribute and src_attribute.startswith('data:image/'):
-                # 如果src属性以"data:image/"开头，说明包含base64数据，将该<img>标签从DOM中移除
-                img_tag.extract()
-
-        # 获取<body>标签
-        body_tag = soup.body
-        # 找到并移除所有<script>标签及其内容
-        for script_tag in body_tag.find_all('script'):
-            script_tag.extract()
-        for script_tag in body_tag.find_all('style'):
-            script_tag.extract()
-        # 找到并移除具有 style="display: none;" 属性的元素
-        for element in body_tag.find_all(style="display: none;"):
-            element.extract()
-        for element in body_tag.find_all(style="display:none;"):
-            element.extract()
-
-        # 定义一个函数，用于去除标签与标签之间的空白缩进
-        def remove_whitespace_between_tags(soup):
-            for element in soup:
-                if isinstance(element, str):
-                    # 如果是字符串，使用正则表达式去除空白缩进
-                    element.replace_with(re.sub(r'\n\s+', '\n', element))
-                else:
-                    # 如果是标签，递归调用函数
-                    remove_whitespace_between_tags(element)
-
-        # 去除标签与标签之间的空白缩进
-        remove_whitespace_between_tags(body_tag)
-
-        # 压缩<body>标签内容为一个字符串
-        body_content = str(body_tag)
-        return body_content
-
-    def truncated_string(self, original_string: str):
-        if not original_string:
-            return ""
-        max_characters = 512
-        middle_index = len(original_string) // 2
-        start_index = max(0, middle_index - (max_characters // 2))
-        end_index = min(len(original_string), middle_index + (max_characters // 2))
-        truncated_string = original_string[start_index:end_index]
-        return truncated_string
-
-    def fetch_data_from_ai(self, body_content: str, step_name: str):
-        truncated_string = self.truncated_string(body_content)
-        content_format = f"""
-        请为当前操作找到需要定位的元素:{step_name}; 当前网页源码为:{truncated_string}
         """
-        while True:
-            memories = self.local_memory.get_memories()
-            memories.insert(0, ChatMessage(role=ChatRole.SYSTEM, content=LOCATOR + content_format))
-            # 避免重复占用token数，临时存储 结果返回才进行持久化
-            # memories.append(ChatMessage(role=ChatRole.USER, content=content_format))
+        精简页面源码：移除内联图片、脚本、样式与隐藏元素，去除空白缩进，只保留<body>部分
+        """
+        return reduce_dom(html_source_code)
 
+    @staticmethod
+    def check_locators(path, locators):
+        """流式响应中 data.locators 闭合时检查其格式，格式错误时提前中止请求"""
+        if not isinstance(locators, list):
+            raise InvalidAgentResponseError("'data.locators' is not a list")
+        for item in locators:
+            if not isinstance(item, dict) or not {"name", "locator", "value", "desc"} <= item.keys():
+                raise InvalidAgentResponseError(f"Invalid locator in 'data.locators': {item}")
+
+    def fetch_data_from_ai(self, body_content: str, step_name: str, exchange: Optional[list[ChatMessage]] = None):
+        """
+        :param exchange: 传入时本次对话暂存其中而不写入上下文，由调用方决定是否保留（用于推测定位）；
+            此时不执行回复中的命令，taskComplete 以外的命令直接抛出 InvalidAgentResponseError
+        """
+        # 只发送与当前步骤最相关的页面片段
+        if self.config.locator_context_mode == "index":
+            page_context = select_index_rows(body_content, step_name, token_budget=self.config.locator_context_tokens)
+            content_format = f"""
+        请为当前操作找到需要定位的元素:{step_name}; 当前页面的可交互元素为(首行为列名，rect为x,y,宽,高):
+        {page_context}
+        定位优先使用表中的id、name，其次使用css(locator为css selector)或xpath
+        """
+        else:
+            page_context = select_context(
+                body_content,
+                step_name,
+                token_budget=self.config.locator_context_tokens,
+                max_chunk_chars=self.config.locator_chunk_max_chars,
+            )
+            content_format = f"""
+        请为当前操作找到需要定位的元素:{step_name}; 当前网页源码为:{page_context}
+        """
+        while True:
             model = "gpt-3.5-turbo"
             chat_completion_kwargs = {
                 "model": model,
                 "temperature": 0,
                 "max_tokens": 2048  # OPEN_AI_CHAT_MODELS[chat_model_mapping[model]].max_tokens / 2 - 1,
             }
-            completion = create_chat_completion(memories, **chat_completion_kwargs)
-            response_raw = completion.choices[0].message
-            response_content = response_raw.content
+            system_message = ChatMessage(role=ChatRole.SYSTEM, content=LOCATOR + content_format)
+            memories = self.local_memory.get_memories(model, chat_completion_kwargs["max_tokens"], [system_message])
+            memories.insert(0, system_message)
+            # 避免重复占用token数，临时存储 结果返回才进行持久化
+            # memories.append(ChatMessage(role=ChatRole.USER, content=content_format))
+            response_content = self.fetch_completion(
+                memories, chat_completion_kwargs, watch=[("data", "locators")], on_field=self.check_locators
+            )
 
             command_name, arguments, assistant_reply_dict = self.extract_and_validate(response_content)
-            self.execute(command_name, arguments)
+            if exchange is None:
+                self.execute(command_name, arguments)
+            elif command_name != "taskComplete":
+                # 推测定位在后台线程中进行，不能等待用户输入，也不能在推测被采用前写入上下文，其他命令均视为推测失败
+                raise InvalidAgentResponseError(f"Command '{command_name}' is not allowed during speculation")
 
             if assistant_reply_dict.get("next") is None or assistant_reply_dict.get("next") is False:
-                self.memory.add(ChatMessage(role=ChatRole.USER, content=content_format))
-                self.memory.add(ChatMessage(role=ChatRole.ASSISTANT, content=response_content))
+                messages = [
+                    ChatMessage(role=ChatRole.USER, content=content_format),
+                    ChatMessage(role=ChatRole.ASSISTANT, content=response_content),
+                ]
+                if exchange is not None:
+                    exchange.extend(messages)
+                else:
+                    self.remember(messages)
                 break
 
         # 获取 "locations" 列表
         locations = assistant_reply_dict["data"]["locators"]
         return locations
 
-    def find_element(self, html_source_code, step_name) -> LocationItems:
+    def verify_locations(self, driver, locations) -> bool:
+        """
+        校验缓存的定位信息在当前页面上是否依然有效；LLM 返回的定位类型写法不一（ID、css、By.XPATH 等），先统一再查找
+        """
+        for item in locations:
+            try:
+                if not driver.find_elements(normalize_strategy(item["locator"]), item["value"]):
+                    return False
+            except Exception:
+                return False
+        return True
+
+    def heal_locations(self, driver, locations) -> bool:
+        """
+        在本地修复失效的定位（原地修改），全部修复成功才返回 True
+        """
+        if self.locator_healer is None:
+            return False
+        for item in locations:
+            try:
+                if driver.find_elements(normalize_strategy(item["locator"]), item["value"]):
+                    continue
+            except Exception:
+                pass
+            if not self.locator_healer.heal_location(driver, item):
+                return False
+        return True
+
+    def remember(self, messages: list[ChatMessage]):
+        for message in messages:
+            self.memory.add(message)
+
+    def read_page(self, driver) -> PageState:
+        """
+        按配置的方式读取当前页面：
+        dom 模式获取完整页面源码并精简，index 模式在浏览器内一次性提取可交互元素表
+        """
+        return read_page_state(driver, self.config.locator_context_mode, self.config.locator_index_max_elements)
+
+    def find_element_on_page(self, driver, step_name, refresh: bool = False) -> LocationItems:
+        """
+        读取当前页面并定位
+        """
+        return self.locate_on_page(self.read_page(driver), step_name, driver, refresh)
+
+    def locate_on_page(self, page: PageState, step_name, driver=None, refresh: bool = False) -> LocationItems:
+        return self.locate(page.content, step_name, driver, cache_content=page.cache_content, refresh=refresh)
+
+    def speculate(self, page: PageState, step_name) -> tuple[list[dict], list[ChatMessage]]:
+        """
+        推测定位：在上一步的脚本执行期间，假设页面不变，提前为下一步定位。
+        返回定位信息与暂存的对话，推测被采用时再通过 remember 写入上下文
+        """
+        cache_key = None
+        if self.locator_cache is not None:
+            cache_key = LocatorCache.make_key(page.cache_content or page.content, step_name)
+            locations = self.locator_cache.get(cache_key)
+            if locations is not None:
+                return locations, []
+
+        exchange: list[ChatMessage] = []
+        locations = self.fetch_data_from_ai(page.content, step_name, exchange)
+        if cache_key is not None:
+            # 定位信息对推测时的页面本身是正确的，推测未被采用也可以缓存
+            self.locator_cache.put(cache_key, locations)
+        return locations, exchange
+
+    def find_element(self, html_source_code, step_name, driver=None) -> LocationItems:
         """
         定位
         """
-        # 创建Beautiful Soup对象并指定解析器
+        with get_tracer().span("dom.prepare"):
+            body_content = self.prepare(html_source_code)
+        return self.locate(body_content, step_name, driver)
 
-        body_content = self.prepare(html_source_code)
+    def locate(self, body_content: str, step_name, driver=None, cache_content: str = None,
+               refresh: bool = False) -> LocationItems:
+        """
+        根据已处理的页面内容定位，优先使用定位缓存
+        :param cache_content: 用于计算缓存键的页面内容，默认为 body_content
+        :param refresh: 跳过缓存重新请求 LLM 定位（本地修复失败后使用），结果依然写入缓存
+        """
+        tracer = get_tracer()
+        locations = None
+        cache_key = None
+        if self.locator_cache is not None:
+            with tracer.span("locator.cache") as span:
+                cache_key = LocatorCache.make_key(cache_content or body_content, step_name)
+                locations = None if refresh else self.locator_cache.get(cache_key)
+                if locations is not None and driver is not None and not self.verify_locations(driver, locations):
+                    if self.heal_locations(driver, locations):
+                        print("【Aium】缓存的定位已在本地修复")
+                        self.locator_cache.put(cache_key, locations)
+                    else:
+                        self.locator_cache.invalidate(cache_key)
+                        locations = None
+                span.set(hit=locations is not None)
+
+        if locations is None:
+            with tracer.span("locator.llm"):
+                locations = self.fetch_data_from_ai(body_content, step_name)
+            if self.locator_healer is not None and driver is not None:
+                capture_locations(driver, locations)
+            if cache_key is not None:
+                self.locator_cache.put(cache_key, locations)
+        else:
+            print("【Aium】命中定位缓存")
 
-        locations = self.fetch_data_from_ai(body_content, step_name)
+        return self.to_location_items(locations)
 
+    @staticmethod
+    def to_location_items(locations) -> LocationItems:
         # 创建 LocationItem 对象的列表
-        location_items = [LocationItem(item["name"], item["locator"], item["value"], item["desc"]) for item in
-                          locations]
+        location_items = [LocationItem(item["name"], item["locator"], item["value"], item["desc"],
+                                       item.get("alternatives"), item.get("signature")) for item in locations]
 
         # 创建 LocationItems 对象
         return LocationItems(location_items)
@@ -0,0 +1,188 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from auto.agents.agent_actions import ActionResult, ActionSuccessResult, ActionErrorResult
+from auto.agents.base import BaseAgent
+from auto.agents.location_agent import LocationAgent
+from auto.config import Config
+from auto.core.dom import PageState, read_page_state, select_context, select_index_rows
+from auto.core.llm.base import ChatMessage, ChatRole
+from auto.core.memory.base import MemoryProvider
+from auto.core.memory.factory import create_memory
+from auto.core.models.command_registry import CommandRegistry
+from auto.core.models.context_item import ContextItem
+from auto.core.prompt.prompts import BATCH_PLAN
+from auto.globals.global_data import LocationItem, LocationItems
+from auto.utils.exceptions import AgentException, InvalidAgentResponseError
+
+
+@dataclass
+class StepPlan:
+    """单个步骤的定位与脚本"""
+
+    num: str
+    location_items: LocationItems
+    script_code: str = ""
+
+
+@dataclass
+class BatchPlan:
+    plans: dict[str, StepPlan] = field(default_factory=dict)
+    """按步骤序号索引"""
+
+    def get(self, num) -> Optional[StepPlan]:
+        return self.plans.get(str(num))
+
+
+class PlanAgent(BaseAgent):
+    """
+    负责批量规划：针对同一页面状态下连续的多个步骤，一次请求同时完成定位与脚本生成
+    """
+
+    def __init__(
+            self,
+            command_registry: CommandRegistry,
+            config: Config,
+            global_id: str
+    ):
+        super().__init__(
+            command_registry=command_registry,
+            config=config,
+        )
+
+        self.memory: MemoryProvider = create_memory(config, global_id, self.get_agent_name())
+        """声明当前Agent的上下文"""
+
+        self.created_at = datetime.now().strftime("%Y%m%d_%H%M%S")
+        """Timestamp the agent was created; only used for structured debug logging."""
+        print("【Aium】规划Agent准备就绪！")
+
+    def get_memory(self):
+        return self.memory
+
+    def execute(
+            self,
+            command_name: str,
+            command_args: dict[str, str] = {},
+            user_input: str = "",
+    ) -> ActionResult:
+        result: ActionResult
+
+        if command_name == "ask_user":
+            pass
+        else:
+            try:
+                return_value = self.execute_command(
+                    command_name=command_name,
+                    arguments=command_args,
+                    agent=self,
+                )
+
+                # Intercept ContextItem if one is returned by the command
+                if type(return_value) == tuple and isinstance(
+                        return_value[1], ContextItem
+                ):
+                    context_item = return_value[1]
+                    return_value = return_value[0]
+                    print(
+                        f"Command {command_name} returned a ContextItem: {context_item}"
+                    )
+
+                result = ActionSuccessResult(return_value)
+            except AgentException as e:
+                result = ActionErrorResult(e.message, e)
+
+            return result
+
+    def read_page(self, driver) -> PageState:
+        """
+        按 locator_context_mode 读取当前页面，指纹用于判断后续步骤执行前页面是否发生了变化
+        """
+        return read_page_state(driver, self.config.locator_context_mode, self.config.locator_index_max_elements)
+
+    @staticmethod
+    def check_plans(path, plans):
+        """流式响应中 data.plans 闭合时检查其格式，格式错误时提前中止请求"""
+        if not isinstance(plans, list):
+            raise InvalidAgentResponseError("'data.plans' is not a list")
+        for plan in plans:
+            if not isinstance(plan, dict) or "num" not in plan:
+                raise InvalidAgentResponseError(f"Invalid plan in 'data.plans': {plan}")
+            LocationAgent.check_locators(path, plan.get("locators", []))
+            if not isinstance(plan.get("script_code", ""), str):
+                raise InvalidAgentResponseError(f"'script_code' of step {plan['num']} is not a string")
+
+    def plan(self, page: PageState, steps: list[dict]) -> BatchPlan:
+        """
+        为同一页面状态下的多个步骤生成定位与脚本
+        """
+        step_list = "\n".join(f"{step['num']}. {step['name']}" for step in steps)
+        query = " ".join(step['name'] for step in steps)
+        # 上下文按所有步骤的描述挑选，预算随步骤数增加，但不超过两倍
+        token_budget = self.config.locator_context_tokens * min(2, len(steps))
+        if self.config.locator_context_mode == "index":
+            page_context = select_index_rows(page.content, query, token_budget=token_budget)
+            content_format = f"""
+        请按顺序为以下步骤生成定位与脚本:
+        {step_list}
+        当前页面的可交互元素为(首行为列名，rect为x,y,宽,高):
+        {page_context}
+        定位优先使用表中的id、name，其次使用css(locator为css selector)或xpath
+        """
+        else:
+            page_context = select_context(
+                page.content, query, token_budget=token_budget, max_chunk_chars=self.config.locator_chunk_max_chars
+            )
+            content_format = f"""
+        请按顺序为以下步骤生成定位与脚本:
+        {step_list}
+        当前网页源码为:{page_context}
+        """
+        system_prompt = BATCH_PLAN.replace("[[__current_path__]]", page.url)
+        plans = self.fetch_data_from_ai(content_format, system_prompt)
+
+        batch = BatchPlan()
+        for plan in plans:
+            location_items = LocationItems([
+                LocationItem(item["name"], item["locator"], item["value"], item["desc"])
+                for item in plan.get("locators", [])
+            ])
+            batch.plans[str(plan["num"])] = StepPlan(str(plan["num"]), location_items, plan.get("script_code", ""))
+        return batch
+
+    def fetch_data_from_ai(self, prompt: str, system_prompt: str):
+        while True:
+            model = "gpt-3.5-turbo"
+            chat_completion_kwargs = {
+                "model": model,
+                "temperature": 0,
+                "max_tokens": 2048  # OPEN_AI_CHAT_MODELS[chat_model_mapping[model]].max_tokens / 2 - 1,
+            }
+            system_message = ChatMessage(role=ChatRole.SYSTEM, content=system_prompt)
+            # 避免重复占用token数，临时存储 结果返回才进行持久化
+            user_message = ChatMessage(role=ChatRole.USER, content=prompt)
+            memories = self.local_memory.get_memories(
+                model, chat_completion_kwargs["max_tokens"], [system_message, user_message]
+            )
+            memories.insert(0, system_message)
+            memories.append(user_message)
+            response_content = self.fetch_completion(
+                memories, chat_completion_kwargs, watch=[("data", "plans")], on_field=self.check_plans
+            )
+
+            command_name, arguments, assistant_reply_dict = self.extract_and_validate(response_content)
+            self.execute(command_name, arguments)
+
+            if assistant_reply_dict.get("next") is None or assistant_reply_dict.get("next") is False:
+                self.memory.add(ChatMessage(role=ChatRole.USER, content=prompt))
+                self.memory.add(ChatMessage(role=ChatRole.ASSISTANT, content=response_content))
+                break
+
+        plans = assistant_reply_dict["data"]["plans"]
+        self.check_plans(("data", "plans"), plans)
+        return plans
+
+    @staticmethod
+    def get_agent_name():
+        return "PlanAgent"
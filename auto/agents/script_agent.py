@@ -1,18 +1,83 @@
+import ast
 import time
 from datetime import datetime
+from typing import Optional
+
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
 from auto.agents.agent_actions import ActionResult, ActionSuccessResult, ActionErrorResult
 from auto.agents.base import BaseAgent
 from auto.config import Config
+from auto.core.cache.script_cache import SCRIPT_FILENAME, ScriptCache, get_script_cache
+from auto.core.dom import HealingDriver, LocatorHealer
+from auto.core.drivers.script_fast_path import ScriptFastPath, is_chromium
 from auto.core.llm.base import ChatMessage, ChatRole
-from auto.core.llm.gpt import create_chat_completion
 from auto.core.memory.base import MemoryProvider
-from auto.core.memory.json_file import JSONFileMemory
+from auto.core.memory.factory import create_memory
 from auto.core.models.command_registry import CommandRegistry
 from auto.core.models.context_item import ContextItem
 from auto.core.prompt.prompts import GENERATE_SCRIPT
 from auto.globals.global_data import LocationItems
-from auto.utils.exceptions import AgentException
+from auto.utils.exceptions import AgentException, InvalidAgentResponseError
+
+# 只读取页面、不改变页面状态的调用；脚本在只包含这些调用的语句之后失败时可以整体重试
+_READ_ONLY_CALLS = frozenset([
+    "find_element", "find_elements", "WebDriverWait", "until", "until_not", "sleep",
+    "get_attribute", "get_property", "get_dom_attribute", "is_displayed", "is_enabled", "is_selected",
+    "value_of_css_property",
+])
+
+
+def is_replayable(error: Exception) -> bool:
+    """exec_script 抛出的找不到元素或等待超时是否发生在任何改变页面状态的操作之前，此时重新定位后整体重试不会重复操作"""
+    return getattr(error, "aium_replayable", False)
+
+
+def _read_only(node: ast.AST) -> bool:
+    for call in ast.walk(node):
+        if not isinstance(call, ast.Call):
+            continue
+        func = call.func
+        name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+        owner = func.value if isinstance(func, ast.Attribute) else None
+        if name in _READ_ONLY_CALLS or (isinstance(owner, ast.Name) and owner.id in ("EC", "By")):
+            continue
+        return False
+    return True
+
+
+def _replayable_line(script_code: str, lineno: int) -> bool:
+    """
+    失败发生在顶层的简单语句中，且之前的顶层语句都不改变页面状态；
+    函数、循环等复合语句内部的失败之前可能已有操作执行过，不视为可重试
+    """
+    try:
+        tree = ast.parse(script_code)
+    except SyntaxError:
+        return False
+    simple = (ast.Expr, ast.Assign, ast.AnnAssign, ast.AugAssign)
+    # 同一行中用分号分隔的多条语句无法区分失败的是哪一条，取最后一条，之前的都需要只读
+    containing = [i for i, statement in enumerate(tree.body)
+                  if statement.lineno <= lineno <= (statement.end_lineno or statement.lineno)]
+    if not containing or not isinstance(tree.body[containing[-1]], simple):
+        return False
+    for statement in tree.body[:containing[-1]]:
+        if isinstance(statement, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.Global, ast.Pass)):
+            continue
+        if not isinstance(statement, simple) or not _read_only(statement):
+            return False
+    return True
+
+
+def _failed_line(error: Exception) -> Optional[int]:
+    """异常在生成脚本顶层的行号；失败发生在脚本定义的函数内部时返回 None"""
+    lines = []
+    tb = error.__traceback__
+    while tb is not None:
+        if tb.tb_frame.f_code.co_filename == SCRIPT_FILENAME:
+            lines.append(tb.tb_lineno)
+        tb = tb.tb_next
+    return lines[0] if len(lines) == 1 else None
 
 
 class ScriptAgent(BaseAgent):
@@ -31,9 +96,27 @@ class ScriptAgent(BaseAgent):
             config=config,
         )
 
-        self.memory: MemoryProvider = JSONFileMemory(global_id, self.get_agent_name())
+        self.memory: MemoryProvider = create_memory(config, global_id, self.get_agent_name())
         """声明当前Agent的上下文"""
 
+        self.script_cache: ScriptCache = None
+        """脚本缓存，命中时跳过LLM请求与重复编译"""
+        if config.script_cache_enabled:
+            self.script_cache = get_script_cache(
+                config.cache_path,
+                max_entries=config.script_cache_max_entries,
+            )
+
+        self.fast_path: ScriptFastPath = None
+        """Chromium 内核浏览器中把脚本合并为页面内的一次调用执行"""
+        if config.script_fast_path:
+            self.fast_path = ScriptFastPath(quiet_ms=config.script_settle_quiet_ms)
+
+        self.locator_healer: Optional[LocatorHealer] = None
+        """定位自愈，脚本中的定位找不到元素时先在本地修复"""
+        if config.locator_healing:
+            self.locator_healer = LocatorHealer(config.locator_healing_threshold)
+
         self.created_at = datetime.now().strftime("%Y%m%d_%H%M%S")
         """Timestamp the agent was created; only used for structured debug logging."""
         print("【Aium】脚本Agent准备就绪！")
@@ -75,23 +158,32 @@ class ScriptAgent(BaseAgent):
 
             return result
 
+    @staticmethod
+    def check_script_code(path, script_code):
+        """流式响应中 data.script_code 闭合时检查其格式，格式错误时提前中止请求"""
+        if not isinstance(script_code, str):
+            raise InvalidAgentResponseError("'data.script_code' is not a string")
+
     def fetch_data_from_ai(self, prompt: str, system_prompt: str):
 
         while True:
-            memories = self.local_memory.get_memories()
-            memories.insert(0, ChatMessage(role=ChatRole.SYSTEM, content=system_prompt))
-            # 避免重复占用token数，临时存储 结果返回才进行持久化
-            memories.append(ChatMessage(role=ChatRole.USER, content=prompt))
-
             model = "gpt-3.5-turbo"
             chat_completion_kwargs = {
                 "model": model,
                 "temperature": 0,
                 "max_tokens": 2048  # OPEN_AI_CHAT_MODELS[chat_model_mapping[model]].max_tokens / 2 - 1,
             }
-            completion = create_chat_completion(memories, **chat_completion_kwargs)
-            response_raw = completion.choices[0].message
-            response_content = response_raw.content
+            system_message = ChatMessage(role=ChatRole.SYSTEM, content=system_prompt)
+            # 避免重复占用token数，临时存储 结果返回才进行持久化
+            user_message = ChatMessage(role=ChatRole.USER, content=prompt)
+            memories = self.local_memory.get_memories(
+                model, chat_completion_kwargs["max_tokens"], [system_message, user_message]
+            )
+            memories.insert(0, system_message)
+            memories.append(user_message)
+            response_content = self.fetch_completion(
+                memories, chat_completion_kwargs, watch=[("data", "script_code")], on_field=self.check_script_code
+            )
 
             command_name, arguments, assistant_reply_dict = self.extract_and_validate(response_content)
             self.execute(command_name, arguments)
@@ -123,7 +215,17 @@ class ScriptAgent(BaseAgent):
         for placeholder, replacement in replacement_dict.items():
             system_prompt = system_prompt.replace(placeholder, replacement)
 
+        cache_key = None
+        if self.script_cache is not None:
+            cache_key = ScriptCache.make_key(prompt, element_locators, current_path)
+            script_code = self.script_cache.get(cache_key)
+            if script_code is not None:
+                print("【Aium】命中脚本缓存")
+                return script_code
+
         script_code = self.fetch_data_from_ai(prompt, system_prompt)
+        if cache_key is not None:
+            self.script_cache.put(cache_key, script_code)
 
         # script_code = """
         # def click(id):
@@ -143,16 +245,50 @@ class ScriptAgent(BaseAgent):
         #         """
         return script_code
 
-    def exec_script(self, driver, script_code: str):
+    def exec_script(self, driver, script_code: str, location_items: Optional[LocationItems] = None):
+        """
+        :param location_items: 生成脚本所用的定位，开启定位自愈时脚本找不到其中的元素会先在本地修复
+        """
         if script_code is None:
             return
 
-        globals()['driver'] = driver
-        globals()['time'] = time
-        globals()['n'] = 0
+        if self.locator_healer is not None and location_items is not None and location_items.items:
+            driver = HealingDriver(driver, self.locator_healer, location_items.items)
+
+        if self.fast_path is not None and is_chromium(driver):
+            try:
+                if self.fast_path.run(driver, script_code):
+                    return
+            except Exception:
+                if self.script_cache is not None:
+                    self.script_cache.invalidate(script_code)
+                raise
+
+        # 每次执行使用独立的命名空间，并行会话之间互不影响
+        namespace = dict(globals())
+        namespace['driver'] = driver
+        namespace['time'] = time
+        namespace['n'] = 0
+
+        if self.script_cache is not None:
+            code = self.script_cache.compiled(script_code)
+        else:
+            code = compile(script_code, SCRIPT_FILENAME, "exec")
 
         # TODO 变量表维护
-        exec(script_code, globals(), locals())
+        try:
+            exec(code, namespace)
+        except (NoSuchElementException, TimeoutException) as e:
+            lineno = _failed_line(e)
+            e.aium_replayable = lineno is not None and _replayable_line(script_code, lineno)
+            if self.script_cache is not None:
+                self.script_cache.invalidate(script_code)
+            raise
+        except Exception:
+            # 执行出错的脚本不再复用，下次重新向LLM请求
+            if self.script_cache is not None:
+                self.script_cache.invalidate(script_code)
+            raise
 
     @staticmethod
     def get_agent_name():
@@ -0,0 +1,171 @@
+"""
+命令行入口
+
+    python main.py run [--intention 意图]
+    python main.py batch cases.txt --workers 4 --timeout 300 --report report.json
+    python main.py validate cases.json
+
+selenium、openai、pydantic 等较重的依赖在子命令中才导入，--help 与 validate 不会加载它们。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import Optional
+
+from auto.utils.env import load_env
+
+COMMANDS = ("run", "batch", "validate")
+
+
+def report_usage(config):
+    """输出 LLM 用量汇总，配置了 budget_report_path 时导出明细"""
+    from auto.core.llm.budget import get_budget_ledger
+
+    ledger = get_budget_ledger()
+    print(f"【Aium】{ledger.report()}")
+    if config.budget_report_path:
+        ledger.export(config.budget_report_path)
+
+
+def create_command_registry(config):
+    from auto.commands import COMMAND_CATEGORIES
+    from auto.core.models.command_registry import CommandRegistry
+
+    # 注册指令
+    command_registry = CommandRegistry.with_command_modules(COMMAND_CATEGORIES, config)
+    print("【Aium】指令加载器初始化完成！")
+    return command_registry
+
+
+def run(args) -> int:
+    from auto.agents.housekeeper import Housekeeper
+    from auto.config import Config
+    from auto.core.llm.response_cache import get_response_cache
+
+    config = Config()
+    command_registry = create_command_registry(config)
+
+    # 创建大管家
+    housekeeper = Housekeeper(command_registry, config)
+
+    intention = args.intention or ""
+    while not intention.strip():
+        intention = input("请输入...\n")
+        if intention is None or len(intention.strip()) == 0:
+            print("输入不能为空！")
+    print("\n")
+
+    print(">>>>> USER >>>>>" + intention)
+
+    # 解析意图，初始化操作
+    _id, isolate_global, isolate_steps = housekeeper.recognitionIntention(intention)
+
+    housekeeper.startSession(_id, isolate_global, isolate_steps)
+
+    housekeeper.stopSession(_id)
+
+    housekeeper.shutdown()
+
+    report_usage(config)
+
+    print(f"【Aium】{get_response_cache().report()}")
+    return 0
+
+
+def batch(args) -> int:
+    from auto.agents.batch_runner import BatchRunner
+    from auto.agents.cases import load_cases, validate_cases
+    from auto.config import Config
+    from auto.core.llm.response_cache import get_response_cache
+
+    try:
+        cases = load_cases(args.file)
+    except (OSError, ValueError) as e:
+        print(f"无法读取用例文件 {args.file}：{e}", file=sys.stderr)
+        return 2
+    errors = validate_cases(cases)
+    if errors:
+        print("\n".join(errors), file=sys.stderr)
+        return 2
+
+    config = Config()
+    command_registry = create_command_registry(config)
+    runner = BatchRunner(command_registry, config, workers=args.workers, session_timeout=args.timeout)
+    report = runner.run(cases)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+    print(f"【Aium】{get_response_cache().report()}")
+    report_usage(config)
+    code = 0 if report.count("success") == len(report.results) else 1
+    if runner.stuck_sessions():
+        # 超时的会话仍阻塞在驱动调用或 input() 上，解释器退出时会等待标准输入的锁；
+        # 先写入这些会话缓冲的上下文、关闭 LLM 连接池（追踪按 span 实时写入，浏览器池已在 run 中关闭），再直接结束进程
+        from auto.core.llm.async_client import close_async_client
+
+        print(f"【Aium】{runner.stuck_sessions()} 个超时会话未能结束，强制退出", file=sys.stderr)
+        runner.flush_stuck_sessions()
+        close_async_client()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+    return code
+
+
+def validate(args) -> int:
+    from auto.agents.cases import load_cases, validate_cases
+
+    try:
+        cases = load_cases(args.file)
+    except (OSError, ValueError) as e:
+        print(f"无法读取用例文件 {args.file}：{e}", file=sys.stderr)
+        return 2
+    errors = validate_cases(cases)
+    if errors:
+        print("\n".join(errors), file=sys.stderr)
+        return 1
+    print(f"【Aium】{args.file}：{len(cases)} 个用例格式正确")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="aium", description="Aium")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run", help="执行单个意图（默认）")
+    run_parser.add_argument("--intention", help="要执行的意图，不指定时从标准输入读取")
+    run_parser.set_defaults(handler=run)
+
+    batch_parser = subparsers.add_parser("batch", help="并行执行用例文件")
+    batch_parser.add_argument("file", help="批量执行的用例文件，.json 为用例数组，其他文件每行一个意图")
+    batch_parser.add_argument("--workers", type=int, default=4, help="批量执行的并发数")
+    batch_parser.add_argument("--timeout", type=float, default=None, help="单个会话的超时时间（秒）")
+    batch_parser.add_argument("--report", help="批量执行结果的输出文件")
+    batch_parser.set_defaults(handler=batch)
+
+    validate_parser = subparsers.add_parser("validate", help="只校验用例文件，不启动浏览器")
+    validate_parser.add_argument("file")
+    validate_parser.set_defaults(handler=validate)
+    return parser
+
+
+def _normalize(argv: list[str]) -> list[str]:
+    """兼容原有的 --batch FILE 写法，未指定子命令时执行 run"""
+    if "--batch" in argv:
+        index = argv.index("--batch")
+        return ["batch", *argv[index + 1:index + 2], *argv[:index], *argv[index + 2:]]
+    if any(arg.startswith("--batch=") for arg in argv):
+        rest = [arg for arg in argv if not arg.startswith("--batch=")]
+        return ["batch", next(arg for arg in argv if arg.startswith("--batch="))[len("--batch="):], *rest]
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        return ["run", *argv]
+    return argv
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    load_env()
+    args = build_parser().parse_args(_normalize(list(sys.argv[1:] if argv is None else argv)))
+    return args.handler(args)
@@ -1,6 +1,8 @@
 """Configuration class to store the state of bools for different scripts access."""
 from __future__ import annotations
 
+from typing import Literal, Optional
+
 from pydantic import Field
 
 from auto.core.configuration.schema import SystemSettings
@@ -22,3 +24,82 @@ class Config(SystemSettings, arbitrary_types_allowed=True):
     # General
     disabled_command_categories: list[str] = Field(default_factory=list)
     openai_functions: bool = False
+    #######
+    # LLM #
+    #######
+    # 流式接收响应，边接收边解析：字段闭合即可处理，格式错误时提前中止请求
+    llm_streaming: bool = False
+    # 单个会话 / 整个批次的 token 与费用（美元）上限，None 表示不限制
+    budget_session_tokens: Optional[int] = None
+    budget_session_cost: Optional[float] = None
+    budget_suite_tokens: Optional[int] = None
+    budget_suite_cost: Optional[float] = None
+    # 将超出上限时：abort 中止会话；downgrade 先尝试改用更便宜的 budget_downgrade_model（未设置或不比原模型便宜时跳过），
+    # 仍超出时把 max_tokens 缩小到剩余预算
+    budget_on_exceed: Literal["abort", "downgrade"] = "abort"
+    budget_downgrade_model: Optional[str] = None
+    # 运行结束时导出用量报告（JSON）的路径
+    budget_report_path: Optional[str] = None
+    ##########
+    # Memory #
+    ##########
+    # jsonl 为追加写的日志，sqlite 为所有会话共用的单个数据库文件，json 为每次重写整个文件的旧格式
+    memory_backend: Literal["json", "jsonl", "sqlite"] = "jsonl"
+    memory_path: str = "memory_data"
+    # 每追加多少条消息执行一次 fsync，0 表示交由操作系统刷新
+    memory_fsync_every: int = 0
+    # sqlite 后端批量写入的消息条数
+    memory_batch_size: int = 16
+    ###########
+    # Caching #
+    ###########
+    cache_path: str = "cache_data"
+    locator_cache_enabled: bool = True
+    locator_cache_max_entries: int = 512
+    locator_cache_ttl: int = 7 * 24 * 3600
+    script_cache_enabled: bool = True
+    script_cache_max_entries: int = 1024
+    ############
+    # Locating #
+    ############
+    # 发送给 LLM 的页面片段的 token 预算，页面超出预算时按与步骤的相关度挑选片段
+    # gpt-3.5-turbo 的 4096 tokens 中预留 2048 给回复，定位提示词约占 500
+    locator_context_tokens: int = 1000
+    locator_chunk_max_chars: int = 800
+    # 定位上下文的来源：dom 为精简后的页面源码，index 为在浏览器内提取的可交互元素表
+    locator_context_mode: Literal["dom", "index"] = "dom"
+    locator_index_max_elements: int = 500
+    # dom 模式下通过页面内的 MutationObserver 增量获取页面，只在导航后获取完整源码
+    dom_incremental: bool = False
+    # 定位时记录备选定位与元素特征，缓存定位或生成脚本找不到元素时先在本地修复，修复失败才重新请求 LLM 定位
+    locator_healing: bool = False
+    # 本地修复时元素特征相似度的最低值（0~1）
+    locator_healing_threshold: float = 0.6
+    ############
+    # Planning #
+    ############
+    # single 为每个步骤分别请求定位与脚本，batch 为同一页面状态下的连续步骤一次请求完成定位与脚本
+    step_mode: Literal["single", "batch"] = "single"
+    # batch 模式下一次规划的最大步骤数
+    plan_batch_max_steps: int = 5
+    # single 模式下执行当前步骤的同时在后台提前为下一步定位，页面发生变化时丢弃推测结果
+    step_pipeline: bool = False
+    ###########
+    # Tracing #
+    ###########
+    # 记录每个环节的耗时与 token 数，写入 {trace_path}/{会话id}.jsonl，会话结束时打印汇总
+    trace_enabled: bool = False
+    trace_path: str = "trace_data"
+    ###########
+    # Drivers #
+    ###########
+    # 以无头模式启动浏览器，在没有图形界面的机器（如 CI）上运行时开启
+    selenium_headless: bool = False
+    # 每种浏览器保持的预热浏览器数量，0 表示不使用驱动池
+    driver_pool_size: int = 1
+    driver_pool_max_size: Optional[int] = None
+    # Chromium 内核浏览器中，把生成脚本里连续的查找、点击、输入合并为一次 execute_async_script 执行，
+    # time.sleep 改为等待页面稳定，无法转换的部分仍通过 WebDriver 执行
+    script_fast_path: bool = False
+    # 等待页面稳定时要求的无 DOM 变化时长（毫秒）
+    script_settle_quiet_ms: int = 50
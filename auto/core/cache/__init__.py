@@ -0,0 +1,4 @@
+from .locator_cache import LocatorCache, get_locator_cache
+from .script_cache import ScriptCache, get_script_cache
+
+__all__ = ["LocatorCache", "get_locator_cache", "ScriptCache", "get_script_cache"]
@@ -0,0 +1,137 @@
+"""
+元素定位缓存
+
+以「页面指纹 + 步骤名称」为键，缓存 LocationAgent 从 LLM 获取到的定位信息，
+回放同一套用例时可以直接跳过 LLM 请求。缓存持久化在 memory_data/ 同级的 cache_data/ 目录下。
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+import orjson
+
+from auto.core.dom.fingerprint import dom_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "cache_data"
+
+
+class LocatorCache:
+    """基于 LRU + TTL 淘汰的定位信息缓存"""
+
+    file_path: Path
+    entries: OrderedDict[str, dict[str, Any]]
+
+    def __init__(
+            self,
+            cache_path: str = DEFAULT_CACHE_PATH,
+            max_entries: int = 512,
+            ttl: int = 7 * 24 * 3600,
+    ) -> None:
+        if not os.path.exists(cache_path):
+            os.makedirs(cache_path)
+
+        self.file_path = Path(f"{cache_path}/locator_cache.json")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+        try:
+            self.load()
+            logger.debug(f"Loaded {len(self.entries)} locator cache entries from {self.file_path}")
+        except Exception as e:
+            logger.warning(f"Could not load locator cache from file: {e}")
+            self.entries.clear()
+
+    @staticmethod
+    def make_key(body_content: str, step_name: str) -> str:
+        """页面指纹 + 步骤名称 组成缓存键"""
+        step_digest = hashlib.sha1(step_name.strip().encode("utf-8")).hexdigest()
+        return f"{dom_fingerprint(body_content)}:{step_digest}"
+
+    def get(self, key: str) -> Optional[list[dict[str, Any]]]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if self.ttl and time.time() - entry["created_at"] > self.ttl:
+                del self.entries[key]
+                self.evictions += 1
+                self.misses += 1
+                self.save()
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry["locations"]
+
+    def put(self, key: str, locations: list[dict[str, Any]]):
+        with self._lock:
+            self.entries[key] = {"created_at": time.time(), "locations": locations}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            self.save()
+
+    def invalidate(self, key: str):
+        """命中后校验失败时调用，移除失效的缓存；该次命中改记为未命中（stale 计数包含在 misses 中）"""
+        with self._lock:
+            self.stale += 1
+            if self.hits:
+                self.hits -= 1
+                self.misses += 1
+            if self.entries.pop(key, None) is not None:
+                self.save()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "size": len(self.entries),
+            }
+
+    def load(self):
+        if not self.file_path.is_file() or self.file_path.stat().st_size == 0:
+            return
+        with self.file_path.open("rb") as f:
+            for key, entry in orjson.loads(f.read()):
+                self.entries[key] = entry
+
+    def save(self):
+        # 先写临时文件再替换，避免写入过程中断导致缓存文件损坏
+        tmp_path = self.file_path.with_suffix(".tmp")
+        with tmp_path.open("wb") as f:
+            f.write(orjson.dumps(list(self.entries.items())))
+        os.replace(tmp_path, self.file_path)
+
+
+_caches: dict[str, LocatorCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_locator_cache(cache_path: str = DEFAULT_CACHE_PATH, **kwargs) -> LocatorCache:
+    """同一进程内同一路径共享一个缓存实例，避免多个 Agent 互相覆盖缓存文件"""
+    with _caches_lock:
+        if cache_path not in _caches:
+            _caches[cache_path] = LocatorCache(cache_path, **kwargs)
+        return _caches[cache_path]
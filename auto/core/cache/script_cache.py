@@ -0,0 +1,183 @@
+"""
+脚本缓存
+
+以「步骤描述 + 元素定位信息 + 当前URL模式」为键，缓存 ScriptAgent 生成的 selenium 脚本以及 compile() 后的 code object，
+命中时同时跳过 LLM 请求与重复编译。缓存使用 marshal 格式持久化，文件头记录当前解释器的 MAGIC_NUMBER，
+解释器版本不一致时只保留源码并在加载时重新编译。
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import logging
+import marshal
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from types import CodeType
+from typing import Optional
+from urllib.parse import urlsplit
+
+from auto.core.cache.locator_cache import DEFAULT_CACHE_PATH
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_FILENAME = "<aium-script>"
+
+_NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def url_pattern(current_path: str) -> str:
+    """
+    将URL归一化为模式：忽略查询参数与锚点，路径中的纯数字段替换为占位符
+    例如 https://a.com/item/123?x=1 -> https://a.com/item/{n}
+    """
+    if not current_path:
+        return ""
+    parts = urlsplit(current_path)
+    path = _NUMERIC_SEGMENT.sub("/{n}", parts.path)
+    return f"{parts.scheme}://{parts.netloc}{path}"
+
+
+def _digest(*values: str) -> str:
+    sha = hashlib.sha1()
+    for value in values:
+        sha.update((value or "").encode("utf-8"))
+        sha.update(b"\x00")
+    return sha.hexdigest()
+
+
+class ScriptCache:
+    """生成脚本及其预编译结果的缓存"""
+
+    file_path: Path
+    entries: OrderedDict[str, tuple[str, CodeType, float]]
+
+    def __init__(self, cache_path: str = DEFAULT_CACHE_PATH, max_entries: int = 1024) -> None:
+        if not os.path.exists(cache_path):
+            os.makedirs(cache_path)
+
+        self.file_path = Path(f"{cache_path}/script_cache.bin")
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self._compiled: dict[str, CodeType] = {}
+        """源码摘要 -> code object，用于执行阶段查找预编译结果"""
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        try:
+            self.load()
+            logger.debug(f"Loaded {len(self.entries)} script cache entries from {self.file_path}")
+        except Exception as e:
+            logger.warning(f"Could not load script cache from file: {e}")
+            self.entries.clear()
+            self._compiled.clear()
+
+    @staticmethod
+    def make_key(prompt: str, element_locators: str, current_path: str) -> str:
+        return _digest(prompt.strip(), element_locators, url_pattern(current_path))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, script_code: str):
+        """缓存脚本，无法编译的脚本不缓存"""
+        if script_code is None:
+            return
+        try:
+            code = compile(script_code, SCRIPT_FILENAME, "exec")
+        except SyntaxError as e:
+            logger.debug(f"Generated script is not valid python, skip caching: {e}")
+            return
+
+        with self._lock:
+            self.entries[key] = (script_code, code, time.time())
+            self.entries.move_to_end(key)
+            self._compiled[_digest(script_code)] = code
+            while len(self.entries) > self.max_entries:
+                _, (source, _, _) = self.entries.popitem(last=False)
+                self._compiled.pop(_digest(source), None)
+            self.save()
+
+    def compiled(self, script_code: str) -> CodeType:
+        """获取脚本的 code object，未缓存的脚本会被编译"""
+        source_digest = _digest(script_code)
+        with self._lock:
+            code = self._compiled.get(source_digest)
+        if code is None:
+            code = compile(script_code, SCRIPT_FILENAME, "exec")
+        return code
+
+    def invalidate(self, script_code: str):
+        """脚本执行出错时调用，移除所有生成该脚本的缓存"""
+        source_digest = _digest(script_code)
+        with self._lock:
+            stale_keys = [key for key, entry in self.entries.items() if _digest(entry[0]) == source_digest]
+            for key in stale_keys:
+                del self.entries[key]
+            self._compiled.pop(source_digest, None)
+            if stale_keys:
+                self.invalidations += len(stale_keys)
+                self.save()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "size": len(self.entries),
+            }
+
+    def load(self):
+        if not self.file_path.is_file() or self.file_path.stat().st_size == 0:
+            return
+        with self.file_path.open("rb") as f:
+            magic = f.read(len(importlib.util.MAGIC_NUMBER))
+            data = marshal.loads(f.read())
+
+        same_interpreter = magic == importlib.util.MAGIC_NUMBER
+        for key, source, code_bytes, created_at in data:
+            if same_interpreter:
+                code = marshal.loads(code_bytes)
+            else:
+                code = compile(source, SCRIPT_FILENAME, "exec")
+            self.entries[key] = (source, code, created_at)
+            self._compiled[_digest(source)] = code
+
+    def save(self):
+        # code object 单独序列化，外层结构与解释器版本无关
+        data = [
+            (key, source, marshal.dumps(code), created_at)
+            for key, (source, code, created_at) in self.entries.items()
+        ]
+        tmp_path = self.file_path.with_suffix(".tmp")
+        with tmp_path.open("wb") as f:
+            f.write(importlib.util.MAGIC_NUMBER)
+            f.write(marshal.dumps(data))
+        os.replace(tmp_path, self.file_path)
+
+
+_caches: dict[str, ScriptCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_script_cache(cache_path: str = DEFAULT_CACHE_PATH, **kwargs) -> ScriptCache:
+    """同一进程内同一路径共享一个缓存实例"""
+    with _caches_lock:
+        if cache_path not in _caches:
+            _caches[cache_path] = ScriptCache(cache_path, **kwargs)
+        return _caches[cache_path]
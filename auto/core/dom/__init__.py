@@ -0,0 +1,16 @@
+from .chunker import DomChunk, chunk_dom, rank_chunks, select_context
+from .element_index import collect_element_index, format_element_index, select_index_rows
+from .fingerprint import dom_fingerprint, normalize_dom
+from .locator_healing import HealingDriver, LocatorHealer, capture_locations, normalize_strategy
+from .mutation_tracker import DomTracker, get_dom_tracker, track_dom, untrack_dom
+from .page_state import PageState, read_page_state
+from .reducer import reduce_dom
+
+__all__ = [
+    "DomChunk", "chunk_dom", "rank_chunks", "select_context",
+    "collect_element_index", "format_element_index", "select_index_rows",
+    "dom_fingerprint", "normalize_dom",
+    "HealingDriver", "LocatorHealer", "capture_locations", "normalize_strategy",
+    "DomTracker", "get_dom_tracker", "track_dom", "untrack_dom",
+    "PageState", "read_page_state", "reduce_dom",
+]
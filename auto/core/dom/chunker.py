@@ -0,0 +1,227 @@
+"""
+DOM 分块检索
+
+把 reduce_dom 输出的页面切分为元素级的片段（附带祖先路径），按当前步骤描述对片段做 BM25 打分，
+在 token 预算内挑选相关度最高的片段交给 LLM，取代原先只截取页面中间 512 个字符的做法。
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+from auto.core.llm.token_counter import count_tokens
+
+_TAG_RE = re.compile(r"<(/?)([^\s/>]+)([^>]*?)(/?)>")
+_ATTR_RE = re.compile(r"""([^\s=]+)=(?:"([^"]*)"|'([^']*)')""")
+_WORD_RE = re.compile(r"[A-Za-z]+|\d+|[一-鿿]+")
+_CAMEL_RE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+_CJK_RE = re.compile(r"[一-鿿]")
+
+SEARCHABLE_ATTRIBUTES = (
+    "id", "name", "class", "type", "value", "placeholder", "title", "alt", "aria-label", "role", "for", "href",
+)
+"""参与打分的属性，与元素文本一起构成片段的检索文本"""
+
+INTERACTIVE_TAGS = ("a", "button", "input", "select", "textarea", "option", "label", "summary")
+_INTERACTIVE_RE = re.compile(rf"<(?:{'|'.join(INTERACTIVE_TAGS)})[\s/>]")
+
+INTERACTIVE_BOOST = 1.2
+"""包含可交互元素的片段加权，步骤通常是对可交互元素的操作"""
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    分词：英文按驼峰/下划线拆分并小写，中文取单字与相邻两字
+    """
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        if _CJK_RE.match(word):
+            tokens.extend(word)
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            parts = _CAMEL_RE.findall(word) or [word]
+            tokens.extend(part.lower() for part in parts)
+            if len(parts) > 1:
+                tokens.append(word.lower())
+    return tokens
+
+
+def _clip(html: str, limit: int) -> str:
+    """截断过长的片段，尽量在标签边界处截断"""
+    if len(html) <= limit:
+        return html
+    cut = html.rfind(">", 0, limit)
+    return html[:cut + 1 if cut > 0 else limit] + "..."
+
+
+def _unescape(text: str) -> str:
+    return text.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"').replace("&amp;", "&")
+
+
+@dataclass
+class _Node:
+    tag: str
+    attrs: str
+    start: int
+    parent: Optional["_Node"] = None
+    end: int = -1
+    open_end: int = -1
+    """开始标签结束的位置"""
+    children: list["_Node"] = field(default_factory=list)
+    texts: list[tuple[int, int]] = field(default_factory=list)
+    """直接包含的文本在源码中的区间"""
+
+    def label(self) -> str:
+        attrs = dict((m.group(1), m.group(2) if m.group(2) is not None else m.group(3))
+                     for m in _ATTR_RE.finditer(self.attrs))
+        label = self.tag
+        if attrs.get("id"):
+            label += f"#{attrs['id']}"
+        if attrs.get("class"):
+            label += "".join(f".{name}" for name in attrs["class"].split()[:2])
+        return label
+
+
+@dataclass
+class DomChunk:
+    """页面片段"""
+
+    index: int
+    """在页面中的顺序"""
+    path: str
+    """祖先路径，例如 body > div#app > form.login"""
+    html: str
+    score: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return count_tokens(self.path) + count_tokens(self.html)
+
+    def searchable_text(self) -> str:
+        parts = [_unescape(re.sub(r"<[^>]+>", " ", self.html))]
+        for m in _ATTR_RE.finditer(self.html):
+            if m.group(1) in SEARCHABLE_ATTRIBUTES:
+                parts.append(_unescape(m.group(2) if m.group(2) is not None else m.group(3)))
+        return " ".join(parts)
+
+    def render(self) -> str:
+        return f"[{self.path}]\n{self.html}"
+
+
+def _parse(body_content: str) -> _Node:
+    """解析 reduce_dom 的输出（标签均已闭合、特殊字符均已转义），记录每个元素在源码中的区间"""
+    root = _Node("#root", "", 0)
+    current = root
+    position = 0
+    for m in _TAG_RE.finditer(body_content):
+        if m.start() > position:
+            current.texts.append((position, m.start()))
+        position = m.end()
+        closing, tag, attrs, self_closing = m.groups()
+        if closing:
+            node = current
+            while node is not root and node.tag != tag:
+                node = node.parent
+            if node is root:
+                continue
+            while current is not node:
+                current.end = m.start()
+                current = current.parent
+            node.end = m.end()
+            current = node.parent
+            continue
+        node = _Node(tag, attrs, m.start(), parent=current, open_end=m.end())
+        current.children.append(node)
+        if self_closing:
+            node.end = m.end()
+        else:
+            current = node
+    if position < len(body_content):
+        current.texts.append((position, len(body_content)))
+    while current is not root:
+        current.end = len(body_content)
+        current = current.parent
+    root.end = len(body_content)
+    return root
+
+
+def chunk_dom(body_content: str, max_chunk_chars: int = 800) -> list[DomChunk]:
+    """
+    按元素切分页面：不超过 max_chunk_chars 的最大子树作为一个片段，
+    过大的元素继续向下切分，其直接包含的文本单独作为一个片段
+    """
+    root = _parse(body_content)
+    chunks: list[DomChunk] = []
+    stack: list[tuple[_Node, tuple[str, ...]]] = [(child, ()) for child in reversed(root.children)]
+    if any(body_content[s:e].strip() for s, e in root.texts):
+        text = " ".join(body_content[s:e].strip() for s, e in root.texts if body_content[s:e].strip())
+        chunks.append(DomChunk(0, "", _clip(text, max_chunk_chars)))
+
+    while stack:
+        node, ancestors = stack.pop()
+        path = " > ".join(ancestors)
+        if node.end - node.start <= max_chunk_chars or not node.children:
+            chunks.append(DomChunk(len(chunks), path, _clip(body_content[node.start:node.end], max_chunk_chars)))
+            continue
+
+        text = " ".join(body_content[s:e].strip() for s, e in node.texts if body_content[s:e].strip())
+        if text:
+            opening = body_content[node.start:node.open_end]
+            chunks.append(DomChunk(len(chunks), path, f"{opening}{_clip(text, max_chunk_chars)}</{node.tag}>"))
+        child_ancestors = ancestors + (node.label(),)
+        stack.extend((child, child_ancestors) for child in reversed(node.children))
+    return chunks
+
+
+def rank_chunks(chunks: list[DomChunk], query: str, k1: float = 1.5, b: float = 0.75) -> list[DomChunk]:
+    """BM25 打分，返回按得分从高到低排序的片段"""
+    query_terms = set(tokenize(query))
+    documents = [Counter(tokenize(chunk.searchable_text())) for chunk in chunks]
+    if not documents:
+        return []
+    average_length = sum(sum(doc.values()) for doc in documents) / len(documents) or 1
+    document_frequency = Counter(term for doc in documents for term in query_terms if term in doc)
+
+    for chunk, doc in zip(chunks, documents):
+        length = sum(doc.values())
+        score = 0.0
+        for term in query_terms:
+            frequency = doc.get(term)
+            if not frequency:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+        if score and _INTERACTIVE_RE.search(chunk.html):
+            score *= INTERACTIVE_BOOST
+        chunk.score = score
+    return sorted(chunks, key=lambda chunk: chunk.score, reverse=True)
+
+
+def select_context(body_content: str, query: str, token_budget: int = 1000, max_chunk_chars: int = 800) -> str:
+    """
+    在 token 预算内挑选与 query 最相关的片段，按页面顺序拼接；
+    页面本身不超过预算时直接返回整个页面
+    """
+    if not body_content:
+        return ""
+    if count_tokens(body_content) <= token_budget:
+        return body_content
+
+    chunks = chunk_dom(body_content, max_chunk_chars)
+    # 没有任何相关片段时按页面顺序填充
+    candidates = [chunk for chunk in rank_chunks(chunks, query) if chunk.score > 0] or chunks
+
+    selected = []
+    used = 0
+    for chunk in candidates:
+        cost = chunk.tokens
+        if used + cost > token_budget:
+            continue
+        selected.append(chunk)
+        used += cost
+    selected.sort(key=lambda chunk: chunk.index)
+    return "\n".join(chunk.render() for chunk in selected)
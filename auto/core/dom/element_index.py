@@ -0,0 +1,140 @@
+"""
+可交互元素索引
+
+通过一次 execute_script 在浏览器内收集可见、可交互的元素（标签、id、name、role、文本、aria 属性、位置以及
+稳定的 CSS/XPath），以单个 JSON 字符串返回，作为定位上下文替代完整的 page_source，
+避免每个步骤都通过 WebDriver 传输并在 Python 中解析整页源码。
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from auto.core.llm.token_counter import count_tokens
+
+from .chunker import DomChunk, rank_chunks
+
+INDEX_FIELDS = ("tag", "id", "name", "type", "role", "text", "label", "aria", "placeholder", "rect", "css", "xpath")
+"""元素表的列，rect 为 [x, y, width, height]"""
+
+PATH_FUNCTIONS = r"""
+const SELECTOR = 'a[href],button,input,select,textarea,summary,label,[role],[onclick],[contenteditable=""],' +
+    '[contenteditable="true"],[tabindex]:not([tabindex="-1"])';
+const escape = (value) => (window.CSS && CSS.escape) ? CSS.escape(value) : value.replace(/([^\w-])/g, '\\$1');
+const unique = (selector) => { try { return document.querySelectorAll(selector).length === 1; } catch (e) { return false; } };
+
+function cssPath(el) {
+    if (el.id && unique('#' + escape(el.id))) return '#' + escape(el.id);
+    const tag = el.tagName.toLowerCase();
+    for (const attr of ['name', 'data-testid', 'data-test', 'aria-label', 'placeholder']) {
+        const value = el.getAttribute(attr);
+        if (value && !value.includes('"')) {
+            const selector = tag + '[' + attr + '="' + value + '"]';
+            if (unique(selector)) return selector;
+        }
+    }
+    const parts = [];
+    for (let node = el; node && node.nodeType === 1 && node !== document.documentElement; node = node.parentElement) {
+        if (node !== el && node.id && unique('#' + escape(node.id))) { parts.unshift('#' + escape(node.id)); break; }
+        let part = node.tagName.toLowerCase();
+        const parent = node.parentElement;
+        if (parent) {
+            const same = Array.prototype.filter.call(parent.children, (c) => c.tagName === node.tagName);
+            if (same.length > 1) part += ':nth-of-type(' + (same.indexOf(node) + 1) + ')';
+        }
+        parts.unshift(part);
+    }
+    return parts.join(' > ');
+}
+
+function xpath(el) {
+    const parts = [];
+    for (let node = el; node && node.nodeType === 1; node = node.parentElement) {
+        if (node.id && !node.id.includes('"') && unique('#' + escape(node.id))) {
+            parts.unshift('//*[@id="' + node.id + '"]');
+            return parts.join('/');
+        }
+        let index = 0, count = 0;
+        for (const sibling of (node.parentElement ? node.parentElement.children : [node])) {
+            if (sibling.tagName === node.tagName) { count++; if (sibling === node) index = count; }
+        }
+        parts.unshift(node.tagName.toLowerCase() + (count > 1 ? '[' + index + ']' : ''));
+    }
+    return '/' + parts.join('/');
+}
+"""
+"""可交互元素的选择器，以及生成稳定 CSS/XPath 的页面内函数，与 locator_healing 共用"""
+
+ELEMENT_INDEX_SCRIPT = r"""
+const maxElements = arguments[0], maxText = arguments[1];
+const clean = (value) => (value || '').replace(/\s+/g, ' ').trim().slice(0, maxText);
+""" + PATH_FUNCTIONS + r"""
+const rows = [];
+for (const el of document.querySelectorAll(SELECTOR)) {
+    if (rows.length >= maxElements) break;
+    if (el.disabled || el.type === 'hidden' || el.namespaceURI !== 'http://www.w3.org/1999/xhtml') continue;
+    const rect = el.getBoundingClientRect();
+    if (rect.width === 0 || rect.height === 0) continue;
+    const style = getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.display === 'none' || parseFloat(style.opacity) === 0) continue;
+
+    const tag = el.tagName.toLowerCase();
+    const text = el.type === 'password' ? '' : (el.innerText || el.value || '');
+    const label = el.labels && el.labels.length ? el.labels[0].innerText : '';
+    rows.push([
+        tag, el.id || '', el.getAttribute('name') || '', el.getAttribute('type') || '', el.getAttribute('role') || '',
+        clean(text), clean(label), clean(el.getAttribute('aria-label') || el.getAttribute('title')),
+        clean(el.getAttribute('placeholder')),
+        [Math.round(rect.x), Math.round(rect.y), Math.round(rect.width), Math.round(rect.height)],
+        cssPath(el), xpath(el),
+    ]);
+}
+return JSON.stringify(rows);
+"""
+
+
+def collect_element_index(driver, max_elements: int = 500, max_text: int = 80) -> list[dict[str, Any]]:
+    """在浏览器中执行一次脚本，返回可交互元素列表"""
+    payload = driver.execute_script(ELEMENT_INDEX_SCRIPT, max_elements, max_text)
+    return [dict(zip(INDEX_FIELDS, row)) for row in json.loads(payload or "[]")]
+
+
+def format_element_index(elements: list[dict[str, Any]], with_rect: bool = True) -> str:
+    """
+    把元素列表格式化为紧凑的表格，首行为列名，每行一个元素
+    :param with_rect: 是否包含位置，位置会随滚动变化，计算缓存键时不包含
+    """
+    fields = [field for field in INDEX_FIELDS if with_rect or field != "rect"]
+    lines = ["|".join(fields)]
+    for element in elements:
+        values = []
+        for field in fields:
+            value = element.get(field, "")
+            if field == "rect":
+                value = ",".join(str(v) for v in value)
+            values.append(str(value).replace("|", "/").replace("\n", " "))
+        lines.append("|".join(values))
+    return "\n".join(lines)
+
+
+def select_index_rows(table: str, query: str, token_budget: int = 1000) -> str:
+    """
+    在 token 预算内挑选与 query 最相关的元素行，保留表头并按页面顺序输出
+    """
+    if not table or count_tokens(table) <= token_budget:
+        return table
+
+    header, *rows = table.split("\n")
+    chunks = [DomChunk(index, "", row) for index, row in enumerate(rows)]
+    candidates = [chunk for chunk in rank_chunks(chunks, query) if chunk.score > 0] or chunks
+
+    selected = []
+    used = count_tokens(header)
+    for chunk in candidates:
+        cost = count_tokens(chunk.html)
+        if used + cost > token_budget:
+            continue
+        selected.append(chunk)
+        used += cost
+    selected.sort(key=lambda chunk: chunk.index)
+    return "\n".join([header] + [chunk.html for chunk in selected])
@@ -0,0 +1,29 @@
+"""
+页面指纹
+
+对 LocationAgent.prepare() 的输出做归一化后计算摘要，用于判断两次获取的页面是否“相同”。
+归一化会抹掉空白差异以及时间戳、token 一类每次请求都会变化的值，避免同一页面因噪声而被判定为不同。
+"""
+import hashlib
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+_HEX_TOKEN = re.compile(r"\b[0-9a-fA-F]{16,}\b")
+_LONG_NUMBER = re.compile(r"\d{4,}")
+_TAG_GAP = re.compile(r">\s+<")
+
+
+def normalize_dom(body_content: str) -> str:
+    """去除页面中的易变内容，返回可用于比较的文本"""
+    if not body_content:
+        return ""
+    content = _HEX_TOKEN.sub("#", body_content)
+    content = _LONG_NUMBER.sub("#", content)
+    content = _WHITESPACE.sub(" ", content)
+    content = _TAG_GAP.sub("><", content)
+    return content.strip()
+
+
+def dom_fingerprint(body_content: str) -> str:
+    """计算归一化后页面的指纹"""
+    return hashlib.sha1(normalize_dom(body_content).encode("utf-8")).hexdigest()
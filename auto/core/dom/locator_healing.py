@@ -0,0 +1,339 @@
+"""
+定位自愈
+
+页面改版（id、class 变化）后，缓存或生成脚本中的定位会找不到元素，原先只能重新请求 LLM 定位。
+定位时通过一次 execute_script 为每个元素记录：
+    - alternatives：当前页面上唯一的备选定位（id、name、data-testid、aria-label、placeholder、文本、CSS 路径、相对 XPath）
+    - signature：紧凑的元素特征（标签、id、name、类型、role、文本、aria-label、placeholder、class 等）
+找不到元素时先依次尝试备选定位（命中的元素特征需与记录的足够接近），再在当前页面的可交互元素中按特征相似度查找，
+都失败才交给调用方重新请求 LLM。
+"""
+from __future__ import annotations
+
+import difflib
+import logging
+from typing import Any, Optional
+
+from selenium.common.exceptions import NoSuchElementException
+
+from auto.core.tracing import get_tracer
+
+from .element_index import PATH_FUNCTIONS
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_WEIGHTS = {
+    "id": 2.0,
+    "testid": 3.0,
+    "name": 2.0,
+    "text": 3.0,
+    "aria": 2.0,
+    "placeholder": 2.0,
+    "type": 1.0,
+    "role": 1.0,
+    "href": 1.0,
+    "classes": 1.0,
+}
+"""元素特征中各字段在相似度中的权重，标签不一致时得分减半；id 与 class 是改版中最常变化的部分，权重低于文本"""
+
+_STRATEGY_ALIASES = {
+    "css": "css selector",
+    "css_selector": "css selector",
+    "class": "class name",
+    "class_name": "class name",
+    "link": "link text",
+    "link_text": "link text",
+    "partial_link_text": "partial link text",
+    "tag": "tag name",
+    "tag_name": "tag name",
+}
+
+# 页面内的公共函数：按 WebDriver 的定位方式查找元素、生成元素特征
+_COMMON = PATH_FUNCTIONS + r"""
+const clean = (value, max) => (value || '').replace(/\s+/g, ' ').trim().slice(0, max || 80);
+
+function locate(by, value) {
+    try {
+        switch (by) {
+            case 'id': return document.getElementById(value);
+            case 'css selector': return document.querySelector(value);
+            case 'xpath': {
+                const node = document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+                return node && node.nodeType === 1 ? node : null;
+            }
+            case 'name': return document.querySelector('[name="' + escape(value) + '"]');
+            case 'class name': return document.getElementsByClassName(value)[0] || null;
+            case 'tag name': return document.getElementsByTagName(value)[0] || null;
+            case 'link text':
+            case 'partial link text':
+                for (const link of document.getElementsByTagName('a')) {
+                    const text = link.innerText.trim();
+                    if (by === 'link text' ? text === value : text.includes(value)) return link;
+                }
+        }
+    } catch (e) {}
+    return null;
+}
+
+function signature(el) {
+    const href = el.getAttribute('href');
+    let path = '';
+    if (href) { try { path = new URL(href, location.href).pathname; } catch (e) {} }
+    return {
+        tag: el.tagName.toLowerCase(), id: el.id || '', name: el.getAttribute('name') || '',
+        type: el.getAttribute('type') || '', role: el.getAttribute('role') || '',
+        text: el.type === 'password' ? '' : clean(el.innerText || el.value || ''),
+        aria: clean(el.getAttribute('aria-label') || el.getAttribute('title')),
+        placeholder: clean(el.getAttribute('placeholder')), testid: el.getAttribute('data-testid') || '',
+        classes: Array.prototype.slice.call(el.classList, 0, 8), href: path,
+    };
+}
+"""
+
+CAPTURE_SCRIPT = r"""
+const targets = arguments[0];
+""" + _COMMON + r"""
+function countXPath(expression) {
+    try {
+        return document.evaluate(expression, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null).snapshotLength;
+    } catch (e) { return 0; }
+}
+
+function alternatives(el) {
+    const tag = el.tagName.toLowerCase(), found = [];
+    const add = (by, value) => { if (value && !found.some((a) => a[0] === by && a[1] === value)) found.push([by, value]); };
+    if (el.id && unique('#' + escape(el.id))) add('id', el.id);
+    const name = el.getAttribute('name');
+    if (name && unique('[name="' + escape(name) + '"]')) add('name', name);
+    for (const attr of ['data-testid', 'aria-label', 'placeholder']) {
+        const value = el.getAttribute(attr);
+        if (value && !value.includes('"') && unique(tag + '[' + attr + '="' + value + '"]')) {
+            add('css selector', tag + '[' + attr + '="' + value + '"]');
+        }
+    }
+    const text = clean(el.innerText, 50);
+    if (text && !text.includes('"') && text === (el.innerText || '').trim()) {
+        const expression = '//' + tag + '[normalize-space()="' + text + '"]';
+        if (countXPath(expression) === 1) add('xpath', expression);
+    }
+    add('css selector', cssPath(el));
+    add('xpath', xpath(el));
+    return found;
+}
+
+return targets.map((target) => {
+    const el = locate(target[0], target[1]);
+    if (!el) return null;
+    return {alternatives: alternatives(el).filter((a) => a[0] !== target[0] || a[1] !== target[1]), signature: signature(el)};
+});
+"""
+
+SEARCH_SCRIPT = r"""
+const tag = arguments[0], maxElements = arguments[1];
+""" + _COMMON + r"""
+const candidates = [];
+for (const el of document.querySelectorAll(SELECTOR + ',' + tag)) {
+    if (candidates.length >= maxElements) break;
+    const rect = el.getBoundingClientRect();
+    if (rect.width === 0 || rect.height === 0) continue;
+    candidates.push([el, signature(el)]);
+}
+return candidates;
+"""
+
+
+def normalize_strategy(locator: str) -> str:
+    """把 LLM 返回的定位类型（如 ID、css、By.CSS_SELECTOR）统一为 WebDriver 的定位方式"""
+    strategy = (locator or "").strip().lower()
+    if strategy.startswith("by."):
+        strategy = strategy[3:]
+    strategy = _STRATEGY_ALIASES.get(strategy, strategy.replace("_", " "))
+    return _STRATEGY_ALIASES.get(strategy, strategy)
+
+
+def _similarity(field: str, expected, actual) -> float:
+    if field == "classes":
+        expected, actual = set(expected or []), set(actual or [])
+        return len(expected & actual) / len(expected | actual) if expected | actual else 0.0
+    if not actual:
+        return 0.0
+    if expected == actual:
+        return 1.0
+    if field == "text":
+        return difflib.SequenceMatcher(None, expected, actual).ratio()
+    return 0.0
+
+
+def signature_similarity(expected: dict[str, Any], actual: dict[str, Any]) -> float:
+    """按记录时有值的字段计算加权相似度，范围 0~1"""
+    total = score = 0.0
+    for field, weight in SIGNATURE_WEIGHTS.items():
+        if not expected.get(field):
+            continue
+        total += weight
+        score += weight * _similarity(field, expected[field], actual.get(field))
+    if not total:
+        return 0.0
+    score /= total
+    return score if expected.get("tag") == actual.get("tag") else score / 2
+
+
+def capture_locations(driver, locations: list[dict[str, Any]]) -> int:
+    """
+    在浏览器中为定位信息补充 alternatives 与 signature（原地修改），一次 execute_script 完成
+    :return: 成功补充的数量，当前页面上找不到的定位保持不变
+    """
+    if not locations:
+        return 0
+    with get_tracer().span("locator.capture", count=len(locations)) as span:
+        try:
+            results = driver.execute_script(
+                CAPTURE_SCRIPT, [[normalize_strategy(item["locator"]), item["value"]] for item in locations])
+        except Exception as e:
+            logger.debug(f"Failed to capture locator alternatives: {e}")
+            return 0
+        captured = 0
+        for item, result in zip(locations, results or []):
+            if result:
+                item["alternatives"] = [list(alternative) for alternative in result["alternatives"]]
+                item["signature"] = result["signature"]
+                captured += 1
+        span.set(captured=captured)
+        return captured
+
+
+class LocatorHealer:
+    """
+    找不到元素时在本地修复定位
+    """
+
+    def __init__(self, threshold: float = 0.6, margin: float = 0.1, max_candidates: int = 500):
+        """
+        :param threshold: 相似度查找命中的元素，特征相似度不低于该值才采用；
+            备选定位本身是唯一匹配，只要求不低于该值的一半，避免备选定位已指向无关元素
+        :param margin: 相似度查找中最佳候选需比第二名高出的分数，避免在相似元素之间误选
+        """
+        self.threshold = threshold
+        self.margin = margin
+        self.max_candidates = max_candidates
+        self.stats = {"alternatives": 0, "similarity": 0, "misses": 0}
+        """alternatives：通过备选定位修复，similarity：通过相似度查找修复，misses：本地无法修复"""
+
+    def heal(self, driver, alternatives: Optional[list], signature: Optional[dict]) -> Optional[tuple[Any, str, str]]:
+        """
+        :return: (元素, 定位方式, 定位的值)，本地无法修复时返回 None
+        """
+        if not alternatives and not signature:
+            return None
+        with get_tracer().span("locator.heal") as span:
+            healed = self._try_alternatives(driver, alternatives or [], signature)
+            if healed is not None:
+                self.stats["alternatives"] += 1
+                span.set(healed="alternatives")
+                return healed
+            healed = self._search(driver, signature) if signature else None
+            if healed is not None:
+                self.stats["similarity"] += 1
+                span.set(healed="similarity")
+                return healed
+            self.stats["misses"] += 1
+            span.set(healed=None)
+            return None
+
+    def heal_location(self, driver, location: dict[str, Any]) -> bool:
+        """
+        修复缓存中的定位信息（原地修改）：命中的定位作为主定位，原主定位移入备选
+        """
+        healed = self.heal(driver, location.get("alternatives"), location.get("signature"))
+        if healed is None:
+            return False
+        _, by, value = healed
+        alternatives = [a for a in location.get("alternatives") or [] if list(a) != [by, value]]
+        location["alternatives"] = [[location["locator"], location["value"]]] + alternatives
+        location["locator"], location["value"] = by, value
+        return True
+
+    def _try_alternatives(self, driver, alternatives: list, signature: Optional[dict]):
+        for by, value in alternatives:
+            try:
+                elements = driver.find_elements(by, value)
+            except Exception:
+                continue
+            if len(elements) != 1:
+                continue
+            if signature and not self._matches(driver, elements[0], signature):
+                continue
+            return elements[0], by, value
+        return None
+
+    def _matches(self, driver, element, signature: dict) -> bool:
+        try:
+            actual = driver.execute_script(_COMMON + "return signature(arguments[0]);", element)
+        except Exception:
+            return False
+        return signature_similarity(signature, actual or {}) >= self.threshold / 2
+
+    def _search(self, driver, signature: dict):
+        try:
+            candidates = driver.execute_script(SEARCH_SCRIPT, signature.get("tag") or "*", self.max_candidates) or []
+        except Exception as e:
+            logger.debug(f"Locator similarity search failed: {e}")
+            return None
+        scored = sorted(((signature_similarity(signature, sig), element) for element, sig in candidates),
+                        key=lambda pair: pair[0], reverse=True)
+        if not scored or scored[0][0] < self.threshold:
+            return None
+        if len(scored) > 1 and scored[0][0] - scored[1][0] < self.margin:
+            return None
+        element = scored[0][1]
+        # 用元素的 CSS 路径作为修复后的定位
+        try:
+            css = driver.execute_script(PATH_FUNCTIONS + "return cssPath(arguments[0]);", element)
+        except Exception:
+            css = None
+        return element, "css selector", css
+
+
+class HealingDriver:
+    """
+    执行生成脚本时包装 driver：find_element / find_elements 找不到本步骤定位中的元素时先在本地修复，
+    其余属性与方法直接转发给原 driver
+    """
+
+    def __init__(self, driver, healer: LocatorHealer, location_items):
+        self._driver = driver
+        self._healer = healer
+        self._items = {}
+        for item in location_items:
+            if getattr(item, "alternatives", None) or getattr(item, "signature", None):
+                self._items[(normalize_strategy(item.locator), item.value)] = item
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+    def find_element(self, by="id", value=None):
+        try:
+            return self._driver.find_element(by, value)
+        except NoSuchElementException:
+            element = self._heal(by, value)
+            if element is None:
+                raise
+            return element
+
+    def find_elements(self, by="id", value=None):
+        elements = self._driver.find_elements(by, value)
+        if elements:
+            return elements
+        element = self._heal(by, value)
+        return [element] if element is not None else elements
+
+    def _heal(self, by, value):
+        item = self._items.get((normalize_strategy(by), value))
+        if item is None:
+            return None
+        healed = self._healer.heal(self._driver, item.alternatives, item.signature)
+        if healed is None:
+            return None
+        element, healed_by, healed_value = healed
+        print(f"【Aium】定位已自愈：{item.name} {by}={value} -> {healed_by}={healed_value}")
+        return element
@@ -0,0 +1,330 @@
+"""
+增量 DOM 快照
+
+在页面中安装基于 MutationObserver 的变更跟踪器，Python 侧缓存精简后的 DOM：
+    首次读取（以及导航到新文档后）由跟踪器序列化整个文档，为每个元素分配 id，按 DomReducer 精简后缓存为节点树；
+    之后每次读取只取回两次读取之间发生变化的子树（新增、移除的子节点与属性、文本的变化都归到其父元素，
+    只保留最上层的变化元素），重新精简这些子树并替换缓存中对应的节点。
+
+单页应用中大部分步骤只改变页面的一小部分，避免每个步骤都通过 WebDriver 传输整页源码并在 Python 中重新解析。
+跟踪器不可用（脚本执行失败、页面不允许执行脚本等）时返回 None，由调用方回退到 page_source。
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import weakref
+from typing import Any, Optional, Union
+
+from .reducer import DomReducer, _Element
+
+logger = logging.getLogger(__name__)
+
+ID_ATTRIBUTE = "data-aium-id"
+"""序列化时写入每个元素的 id 属性，精简时移除，不会出现在输出中"""
+
+_TRACKER_SOURCE = r"""
+if (!window.__aiumTracker) {
+    const ID = '""" + ID_ATTRIBUTE + r"""';
+    const VOID = new Set(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+        'source', 'track', 'wbr']);
+    const RAW_TEXT = new Set(['script', 'style']);
+    const ids = new WeakMap();
+    const dirty = new Set();
+    let seq = 0;
+    const escapeText = (s) => s.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    const escapeAttr = (s) => s.replace(/&/g, '&amp;').replace(/"/g, '&quot;');
+
+    function serialize(root) {
+        const out = [];
+        const stack = [root];
+        while (stack.length) {
+            const node = stack.pop();
+            if (typeof node === 'string') { out.push(node); continue; }
+            if (node.nodeType === 1) {
+                const tag = node.localName;
+                if (!ids.has(node)) ids.set(node, ++seq);
+                out.push('<' + tag + ' ' + ID + '="' + ids.get(node) + '"');
+                for (const attr of node.attributes) {
+                    if (attr.name !== ID) out.push(' ' + attr.name + '="' + escapeAttr(attr.value) + '"');
+                }
+                out.push('>');
+                if (VOID.has(tag)) continue;
+                stack.push('</' + tag + '>');
+                const children = tag === 'template' ? node.content.childNodes : node.childNodes;
+                for (let i = children.length - 1; i >= 0; i--) stack.push(children[i]);
+            } else if (node.nodeType === 3) {
+                const parent = node.parentNode;
+                out.push(parent && RAW_TEXT.has(parent.localName) ? node.data : escapeText(node.data));
+            } else if (node.nodeType === 8) {
+                out.push('<!--' + node.data + '-->');
+            }
+        }
+        return out.join('');
+    }
+
+    function mark(record) {
+        const target = record.type === 'characterData' ? record.target.parentNode : record.target;
+        if (target && target.nodeType === 1) dirty.add(target);
+    }
+
+    const observer = new MutationObserver((records) => records.forEach(mark));
+    const OPTIONS = {subtree: true, childList: true, attributes: true, characterData: true};
+    let observed = document.documentElement;
+    observer.observe(observed, OPTIONS);
+
+    const token = Date.now().toString(36) + Math.random().toString(36).slice(2);
+    const snapshot = () => {
+        observer.takeRecords();
+        dirty.clear();
+        return {token: token, url: location.href, full: serialize(document.documentElement)};
+    };
+    window.__aiumTracker = {
+        snapshot: snapshot,
+        diff: () => {
+            if (observed !== document.documentElement) {
+                // document.open 等替换了根元素
+                observer.disconnect();
+                observed = document.documentElement;
+                observer.observe(observed, OPTIONS);
+                return snapshot();
+            }
+            observer.takeRecords().forEach(mark);
+            const changes = [];
+            for (const el of dirty) {
+                // 已脱离文档的元素，其移除已记录在原父元素上
+                if (!el.isConnected) continue;
+                let covered = false;
+                for (let p = el.parentNode; p && !covered; p = p.parentNode) covered = dirty.has(p);
+                if (covered) continue;
+                if (el === document.documentElement || el === document.body || !ids.has(el)) return snapshot();
+                changes.push({id: String(ids.get(el)), html: serialize(el)});
+            }
+            dirty.clear();
+            return {token: token, url: location.href, changes: changes};
+        },
+    };
+}
+"""
+
+SNAPSHOT_SCRIPT = _TRACKER_SOURCE + "return window.__aiumTracker.snapshot();"
+"""安装跟踪器（已安装时跳过）并返回整个文档"""
+
+DIFF_SCRIPT = "return window.__aiumTracker ? window.__aiumTracker.diff() : null;"
+"""返回上次读取以来变化的子树；导航到新文档后跟踪器不存在，返回 null"""
+
+
+class _Node:
+    __slots__ = ("id", "parts", "parent", "hidden", "preserve", "emitting")
+
+    def __init__(self, node_id: Optional[str], parent: Optional["_Node"], hidden: bool, preserve: bool,
+                 emitting: bool):
+        self.id = node_id
+        self.parts: list[Union[str, "_Node"]] = []
+        """精简后的输出片段与子元素节点，按输出顺序排列"""
+        self.parent = parent
+        self.hidden = hidden
+        """父元素是否位于被移除的子树中"""
+        self.preserve = preserve
+        """父元素是否位于 pre/textarea 中"""
+        self.emitting = emitting
+        """元素是否位于 <body> 中，<head> 中的变化不影响精简结果"""
+
+
+class _TrackingReducer(DomReducer):
+    """
+    在 DomReducer 的基础上记录每个带 id 的元素在输出中的起止位置，据此构建节点树
+    """
+
+    def __init__(self, fragment_parent: Optional[_Node] = None):
+        super().__init__()
+        self._ids: list[Optional[str]] = []
+        self._marks: list[tuple[int, Optional[_Node]]] = []
+        """(输出位置, 节点)，节点为 None 表示元素结束"""
+        if fragment_parent is not None:
+            # 片段按其父元素所处的上下文精简
+            self.whole_document = True
+            self._stack[0] = _Element("[fragment]", fragment_parent.hidden, fragment_parent.preserve)
+
+    def _push(self, tag: str, attrs: dict[str, str]):
+        node_id = attrs.pop(ID_ATTRIBUTE, None)
+        parent = self._stack[-1]
+        start = len(self.output)
+        super()._push(tag, attrs)
+        self._ids.append(node_id)
+        if node_id is not None:
+            # 位置信息在构建节点树时填充
+            self._marks.append((start, _Node(node_id, None, parent.hidden, parent.preserve, self._emitting())))
+
+    def _pop(self, emit: bool = True):
+        super()._pop(emit)
+        if self._ids.pop() is not None:
+            self._marks.append((len(self.output), None))
+
+    def build(self, root_id: Optional[str] = None) -> _Node:
+        """按输出与标记构建节点树，返回的根节点包含全部输出"""
+        root = _Node(root_id, None, False, False, True)
+        current = root
+        position = 0
+        for index, node in self._marks:
+            if index > position:
+                current.parts.append("".join(self.output[position:index]))
+                position = index
+            if node is None:
+                current = current.parent
+            else:
+                node.parent = current
+                current.parts.append(node)
+                current = node
+        if position < len(self.output):
+            current.parts.append("".join(self.output[position:]))
+        return root
+
+
+def _walk(node: _Node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(part for part in node.parts if isinstance(part, _Node))
+
+
+def _render(root: _Node) -> str:
+    out: list[str] = []
+    stack: list[Union[str, _Node]] = [root]
+    while stack:
+        part = stack.pop()
+        if isinstance(part, str):
+            out.append(part)
+        else:
+            stack.extend(reversed(part.parts))
+    return "".join(out)
+
+
+class DomTracker:
+    """
+    单个浏览器的增量快照：页面内的跟踪器 + Python 侧缓存的精简 DOM
+    """
+
+    def __init__(self):
+        self._token: Optional[str] = None
+        self._root: Optional[_Node] = None
+        self._nodes: dict[str, _Node] = {}
+        self._content: Optional[str] = None
+        self._lock = threading.Lock()
+        self.full_snapshots = 0
+        self.incremental_reads = 0
+        self.patched_subtrees = 0
+        self.transferred_chars = 0
+        """通过 WebDriver 取回的字符数"""
+
+    def read(self, driver) -> Optional[str]:
+        """
+        返回当前页面精简后的 <body> 片段，与 reduce_dom(driver.page_source) 的结果一致；跟踪器不可用时返回 None
+        """
+        with self._lock:
+            try:
+                result = driver.execute_script(DIFF_SCRIPT)
+                if not result or result.get("token") != self._token:
+                    result = driver.execute_script(SNAPSHOT_SCRIPT)
+            except Exception as e:
+                logger.debug(f"DOM tracker unavailable, falling back to page_source: {e}")
+                self._reset()
+                return None
+            if not isinstance(result, dict) or result.get("token") is None:
+                self._reset()
+                return None
+
+            if "full" in result:
+                self._load(result["token"], result["full"])
+            else:
+                self.incremental_reads += 1
+                changes = result.get("changes") or []
+                for change in changes:
+                    self.transferred_chars += len(change["html"])
+                    self._patch(change["id"], change["html"])
+                if changes:
+                    self._content = None
+            if self._content is None:
+                self._content = _render(self._root)
+            return self._content
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "full_snapshots": self.full_snapshots,
+                "incremental_reads": self.incremental_reads,
+                "patched_subtrees": self.patched_subtrees,
+                "transferred_chars": self.transferred_chars,
+            }
+
+    def _reset(self):
+        self._token = None
+        self._root = None
+        self._nodes = {}
+        self._content = None
+
+    def _load(self, token: str, html: str):
+        self.full_snapshots += 1
+        self.transferred_chars += len(html)
+        reducer = _TrackingReducer()
+        reducer.feed(html)
+        reducer.close()
+        if reducer._body_depth is None:
+            # 与 reduce_dom 一致：没有 <body> 时输出整个文档
+            reducer = _TrackingReducer()
+            reducer.whole_document = True
+            reducer.feed(html)
+            reducer.close()
+        self._token = token
+        self._root = reducer.build()
+        self._nodes = {node.id: node for node in _walk(self._root) if node.id is not None}
+        self._content = None
+
+    def _patch(self, node_id: str, html: str):
+        old = self._nodes.get(node_id)
+        if old is None or old.parent is None or not old.emitting or old.hidden:
+            # <head> 中或被移除子树中的变化不影响精简结果
+            return
+        reducer = _TrackingReducer(fragment_parent=old)
+        reducer.feed(html)
+        reducer.close()
+        fragment = reducer.build()
+
+        parent = old.parent
+        index = next(i for i, part in enumerate(parent.parts) if part is old)
+        for node in _walk(old):
+            # 移动到其他位置的元素可能已由另一处变化登记，只移除仍指向旧节点的 id
+            if self._nodes.get(node.id) is node:
+                del self._nodes[node.id]
+        for part in fragment.parts:
+            if isinstance(part, _Node):
+                part.parent = parent
+        parent.parts[index:index + 1] = fragment.parts
+        for node in _walk(fragment):
+            if node.id is not None:
+                self._nodes[node.id] = node
+        self.patched_subtrees += 1
+
+
+_trackers: "weakref.WeakKeyDictionary[Any, DomTracker]" = weakref.WeakKeyDictionary()
+_trackers_lock = threading.Lock()
+
+
+def track_dom(driver) -> DomTracker:
+    """为浏览器开启增量快照，已开启时返回现有的跟踪器"""
+    with _trackers_lock:
+        tracker = _trackers.get(driver)
+        if tracker is None:
+            tracker = _trackers[driver] = DomTracker()
+        return tracker
+
+
+def untrack_dom(driver):
+    with _trackers_lock:
+        _trackers.pop(driver, None)
+
+
+def get_dom_tracker(driver) -> Optional[DomTracker]:
+    """浏览器未开启增量快照时返回 None"""
+    return _trackers.get(driver)
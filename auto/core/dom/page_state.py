@@ -0,0 +1,61 @@
+"""
+页面状态
+
+一次读取得到的页面内容（精简后的源码或可交互元素表）、URL 与指纹，
+用于判断执行某个步骤之后页面是否发生了变化。
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+from auto.core.tracing import get_tracer
+
+from .element_index import collect_element_index, format_element_index
+from .fingerprint import dom_fingerprint
+from .mutation_tracker import get_dom_tracker
+from .reducer import reduce_dom
+
+
+@dataclass
+class PageState:
+    url: str
+    content: str
+    """精简后的页面源码，或可交互元素表"""
+    fingerprint: str
+    cache_content: Optional[str] = None
+    """用于计算缓存键与指纹的内容，元素表不包含位置；None 表示与 content 相同"""
+
+    def same_as(self, other: Optional["PageState"]) -> bool:
+        return other is not None and self.url == other.url and self.fingerprint == other.fingerprint
+
+
+def read_page_state(driver, context_mode: Literal["dom", "index"] = "dom", max_elements: int = 500) -> PageState:
+    """
+    按定位上下文的来源读取当前页面：dom 获取完整页面源码并精简，index 在浏览器内一次性提取可交互元素表；
+    dom 模式下浏览器开启了增量快照（见 track_dom）时只取回上次读取以来变化的部分
+    """
+    tracer = get_tracer()
+    if context_mode == "index":
+        with tracer.span("dom.element_index") as span:
+            elements = collect_element_index(driver, max_elements=max_elements)
+            span.set(elements=len(elements))
+        # 元素位置会随滚动变化，不参与缓存键与指纹的计算
+        cache_content = format_element_index(elements, with_rect=False)
+        return PageState(driver.current_url, format_element_index(elements), dom_fingerprint(cache_content),
+                         cache_content)
+
+    tracker = get_dom_tracker(driver)
+    if tracker is not None:
+        with tracer.span("dom.incremental") as span:
+            content = tracker.read(driver)
+            span.set(fallback=content is None)
+        if content is not None:
+            return PageState(driver.current_url, content, dom_fingerprint(content))
+
+    with tracer.span("dom.page_source") as span:
+        html_source_code = driver.page_source
+        span.set(chars=len(html_source_code))
+    with tracer.span("dom.prepare"):
+        content = reduce_dom(html_source_code)
+    return PageState(driver.current_url, content, dom_fingerprint(content))
@@ -0,0 +1,266 @@
+"""
+DOM 精简
+
+在一次流式遍历中完成 LocationAgent 对页面源码的全部预处理：
+    移除 base64 内联图片、<script>、<style> 以及 style 为 display:none 的元素，
+    去除文本中的换行缩进，只输出 <body> 部分。
+
+沿用标准库 html.parser 的分词结果，并按 BeautifulSoup(html.parser) 的建树与输出规则直接拼接字符串，
+不再构建完整的文档树，也没有递归调用，输出与原先基于 BeautifulSoup 的实现保持一致。
+"""
+from __future__ import annotations
+
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import Optional
+
+VOID_ELEMENTS = frozenset([
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed", "frame", "hr", "image", "img",
+    "input", "isindex", "keygen", "link", "menuitem", "meta", "nextid", "param", "source", "spacer",
+    "track", "wbr",
+])
+"""没有结束标签的元素，开始后立即闭合"""
+
+PRESERVE_WHITESPACE_ELEMENTS = frozenset(["pre", "textarea"])
+
+REMOVED_ELEMENTS = frozenset(["script", "style"])
+
+HIDDEN_STYLES = frozenset(["display: none;", "display:none;"])
+
+MULTI_VALUED_ATTRIBUTES = {
+    "*": frozenset(["class", "accesskey", "dropzone"]),
+    "a": frozenset(["rel", "rev"]),
+    "link": frozenset(["rel", "rev"]),
+    "td": frozenset(["headers"]),
+    "th": frozenset(["headers"]),
+    "form": frozenset(["accept-charset"]),
+    "object": frozenset(["archive"]),
+    "area": frozenset(["rel"]),
+    "icon": frozenset(["sizes"]),
+    "iframe": frozenset(["sandbox"]),
+    "output": frozenset(["for"]),
+}
+"""以空白分隔的多值属性，输出时压缩为单个空格分隔"""
+
+_ENTITIES = {name[:-1]: char for name, char in html5.items() if name.endswith(";")}
+_ASCII_SPACES = frozenset("\x20\x0a\x09\x0c\x0d")
+_INDENT_RE = re.compile(r"\n\s+")
+_NON_WHITESPACE_RE = re.compile(r"\S+")
+_ESCAPE_RE = re.compile(r"[<>&]")
+_ESCAPES = {"<": "&lt;", ">": "&gt;", "&": "&amp;"}
+_DECIMAL_REF_RE = re.compile(r"^([0-9]+)(.*)")
+_HEX_REF_RE = re.compile(r"^([0-9a-f]+)(.*)")
+_NONCHARACTERS = frozenset([(plane << 16) | low for plane in range(0x11) for low in (0xfffe, 0xffff)])
+
+
+def _escape(value: str) -> str:
+    if "<" in value or ">" in value or "&" in value:
+        return _ESCAPE_RE.sub(lambda m: _ESCAPES[m.group()], value)
+    return value
+
+
+def _quote(value: str) -> str:
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', "&quot;") + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
+
+
+def _numeric_reference(name: str) -> tuple[str, str]:
+    """解析数字字符引用，返回 (字符, 紧随其后的普通文本)"""
+    pattern = _DECIMAL_REF_RE
+    base = 10
+    if name[:1] in ("x", "X"):
+        name = name[1:]
+        pattern = _HEX_REF_RE
+        base = 16
+
+    extra = ""
+    try:
+        number = int(name, base)
+    except ValueError:
+        match = pattern.search(name)
+        if match is None:
+            return "", name
+        number = int(match.group(1), base)
+        extra = match.group(2)
+
+    if number == 0 or number > 0x10ffff or 0xd800 <= number <= 0xdfff:
+        return "\ufffd", extra
+    if 0xfdd0 <= number <= 0xfdef or number in _NONCHARACTERS:
+        return chr(number), extra
+    if 0x80 <= number <= 0x9f:
+        try:
+            return bytes([number]).decode("cp1252"), extra
+        except UnicodeDecodeError:
+            pass
+    return chr(number), extra
+
+
+class _Element:
+    __slots__ = ("name", "hidden", "preserve")
+
+    def __init__(self, name: str, hidden: bool, preserve: bool):
+        self.name = name
+        self.hidden = hidden
+        """是否位于被移除的子树中"""
+        self.preserve = preserve
+        """是否位于 pre/textarea 中，保留纯空白文本"""
+
+
+class DomReducer(HTMLParser):
+    """
+    流式 DOM 精简器，每个标签与文本只处理一次
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.output: list[str] = []
+        self._stack: list[_Element] = [_Element("[document]", False, False)]
+        self._open: dict[str, int] = {}
+        """各标签名当前未闭合的数量"""
+        self._text: list[str] = []
+        """尚未落地的文本片段，遇到下一个标签时合并"""
+        self._closed_void: list[str] = []
+        self._body_depth: Optional[int] = None
+        """<body> 在栈中的位置，None 表示尚未遇到"""
+        self._body_done = False
+        self.whole_document = False
+        """没有 <body> 时输出整个文档"""
+
+    def _emitting(self) -> bool:
+        return (self.whole_document or self._body_depth is not None) and not self._body_done
+
+    def _flush(self):
+        if not self._text:
+            return
+        text = "".join(self._text)
+        self._text = []
+        parent = self._stack[-1]
+        if not self._emitting() or parent.hidden:
+            return
+        if not parent.preserve and all(c in _ASCII_SPACES for c in text):
+            text = "\n" if "\n" in text else " "
+        self.output.append(_escape(_INDENT_RE.sub("\n", text)))
+
+    def _push(self, tag: str, attrs: dict[str, str]):
+        parent = self._stack[-1]
+        in_body = self._body_depth is not None or self.whole_document
+        hidden = parent.hidden or (
+            (tag == "img" and attrs.get("src", "").startswith("data:image/"))
+            or (in_body and (tag in REMOVED_ELEMENTS or attrs.get("style") in HIDDEN_STYLES))
+        )
+        if self._body_depth is None and tag == "body" and not self._body_done:
+            self._body_depth = len(self._stack)
+            hidden = False
+
+        self._stack.append(_Element(tag, hidden, parent.preserve or tag in PRESERVE_WHITESPACE_ELEMENTS))
+        self._open[tag] = self._open.get(tag, 0) + 1
+        if self._emitting() and not hidden:
+            self.output.append(self._start_tag(tag, attrs))
+
+    def _pop(self, emit: bool = True):
+        element = self._stack.pop()
+        self._open[element.name] -= 1
+        if emit and self._emitting() and not element.hidden:
+            self.output.append(f"</{element.name}>")
+        if self._body_depth is not None and len(self._stack) == self._body_depth:
+            self._body_done = True
+
+    def _pop_to(self, tag: str):
+        while len(self._stack) > 1 and self._open.get(tag):
+            name = self._stack[-1].name
+            self._pop()
+            if name == tag:
+                break
+
+    @staticmethod
+    def _start_tag(tag: str, attrs: dict[str, str]) -> str:
+        if not attrs:
+            return f"<{tag}/>" if tag in VOID_ELEMENTS else f"<{tag}>"
+        multi_valued = MULTI_VALUED_ATTRIBUTES["*"] | MULTI_VALUED_ATTRIBUTES.get(tag, frozenset())
+        parts = [tag]
+        for key in sorted(attrs):
+            value = attrs[key]
+            if key in multi_valued:
+                value = " ".join(_NON_WHITESPACE_RE.findall(value))
+            parts.append(f"{key}={_quote(_escape(value))}")
+        return f"<{' '.join(parts)}/>" if tag in VOID_ELEMENTS else f"<{' '.join(parts)}>"
+
+    def handle_starttag(self, tag, attrs, self_closing: bool = False):
+        self._flush()
+        attr_dict = {}
+        for key, value in attrs:
+            attr_dict[key] = "" if value is None else value
+        self._push(tag, attr_dict)
+        if tag in VOID_ELEMENTS:
+            # 空元素已输出为自闭合标签，直接出栈，之后多余的结束标签被忽略
+            self._pop(emit=False)
+            if not self_closing:
+                self._closed_void.append(tag)
+        elif self_closing:
+            self._pop_to(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, self_closing=True)
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_void:
+            self._closed_void.remove(tag)
+            return
+        self._flush()
+        self._pop_to(tag)
+
+    def handle_data(self, data):
+        self._text.append(data)
+
+    def handle_entityref(self, name):
+        self._text.append(_ENTITIES.get(name) or f"&{name}")
+
+    def handle_charref(self, name):
+        char, extra = _numeric_reference(name)
+        self._text.append(char)
+        self._text.append(extra)
+
+    def _handle_special(self, data: str):
+        # 注释、声明等在原实现中被替换为普通文本
+        self._flush()
+        self._text.append(data)
+        self._flush()
+
+    def handle_comment(self, data):
+        self._handle_special(data)
+
+    def handle_decl(self, decl):
+        self._handle_special(decl[len("DOCTYPE "):])
+
+    def unknown_decl(self, data):
+        if data.upper().startswith("CDATA["):
+            data = data[len("CDATA["):]
+        self._handle_special(data)
+
+    def handle_pi(self, data):
+        self._handle_special(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+        while len(self._stack) > 1:
+            self._pop()
+
+
+def reduce_dom(html_source_code: str) -> str:
+    """
+    精简页面源码，返回处理后的 <body> 片段；页面没有 <body> 时返回处理后的整个文档
+    """
+    reducer = DomReducer()
+    reducer.feed(html_source_code)
+    reducer.close()
+    if reducer._body_depth is None:
+        reducer = DomReducer()
+        reducer.whole_document = True
+        reducer.feed(html_source_code)
+        reducer.close()
+    return "".join(reducer.output)
@@ -1,3 +1,6 @@
-from .driver_executor import DriverExecutor
+from .driver_executor import DriverExecutor, DriverMetaData
+from .driver_pool import DriverPool
+from .driver_watch import DriverWatch, LogEntry
+from .script_fast_path import ScriptFastPath
 
-__all__ = ["DriverExecutor"]
\ No newline at end of file
+__all__ = ["DriverExecutor", "DriverMetaData", "DriverPool", "DriverWatch", "LogEntry", "ScriptFastPath"]
@@ -3,61 +3,43 @@
 from __future__ import annotations
 
 import logging
-import os
 import re
-import threading
-import time
-from pathlib import Path
+import socket
 from sys import platform
-from typing import Type
+from typing import TYPE_CHECKING
 
 from selenium.common.exceptions import WebDriverException
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeDriverService
-from selenium.webdriver.chrome.webdriver import WebDriver as ChromeDriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.options import ArgOptions as BrowserOptions
-from selenium.webdriver.edge.options import Options as EdgeOptions
-from selenium.webdriver.edge.service import Service as EdgeDriverService
-from selenium.webdriver.edge.webdriver import WebDriver as EdgeDriver
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.firefox.service import Service as GeckoDriverService
-from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxDriver
-from selenium.webdriver.remote.webdriver import WebDriver
-from selenium.webdriver.safari.options import Options as SafariOptions
-from selenium.webdriver.safari.webdriver import WebDriver as SafariDriver
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.wait import WebDriverWait
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.firefox import GeckoDriverManager
-from webdriver_manager.microsoft import EdgeChromiumDriverManager as EdgeDriverManager
-from dotenv import load_dotenv
-
-load_dotenv()
+
+from auto.core.dom import DomTracker, track_dom, untrack_dom
+
+from .driver_resolver import resolve_driver
+from .driver_watch import DriverWatch
+
+if TYPE_CHECKING:
+    from selenium.webdriver.common.options import ArgOptions as BrowserOptions
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+
+def find_free_port() -> int:
+    """向系统申请一个当前空闲的本地端口"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
 
 class DriverMetaData:
     selenium_web_browser: str = "chrome"
     selenium_headless: bool = False
     session_id: str = None
 
+    def __init__(self, selenium_web_browser: str = "chrome", selenium_headless: bool = False):
+        self.selenium_web_browser = selenium_web_browser
+        self.selenium_headless = selenium_headless
+        self.session_id = None
 
-class DriverWatch:
-    log_thread = None
-
-    def listen(self, driver):
-        # 日志打印
-        self.log_thread = threading.Thread(target=self.listen_console_logs, args=(driver,))
-        self.log_thread.start()
-
-    def destory(self):
-        pass
-
-    def listen_console_logs(self, driver):
-        while True:
-            logs = driver.get_log('browser')
-            for log_entry in logs:
-                print("控制台输出:", log_entry['level'], "-", log_entry['message'])
-            time.sleep(1)
+    def pool_key(self) -> tuple[str, bool]:
+        """驱动池按 浏览器类型 + 是否无头 分组"""
+        return self.selenium_web_browser, self.selenium_headless
 
 
 class DriverExecutor:
@@ -65,7 +47,7 @@ class DriverExecutor:
     meta_data: DriverMetaData = None
     driver_watch: DriverWatch = None
 
-    def start(self, meta_data: DriverMetaData = DriverMetaData()) -> DriverExecutor:
+    def start(self, meta_data: DriverMetaData = None) -> DriverExecutor:
         """Browse a website and return the answer and links to the user
 
         Args:
@@ -115,56 +97,67 @@ class DriverExecutor:
           """
         logging.getLogger("selenium").setLevel(logging.CRITICAL)
 
-        options_available: dict[str, Type[BrowserOptions]] = {
-            "chrome": ChromeOptions,
-            "edge": EdgeOptions,
-            "firefox": FirefoxOptions,
-            "safari": SafariOptions,
-        }
+        # 只导入所选浏览器的 selenium 后端
+        if config.selenium_web_browser == "firefox":
+            from selenium.webdriver.firefox.options import Options
+        elif config.selenium_web_browser == "edge":
+            from selenium.webdriver.edge.options import Options
+        elif config.selenium_web_browser == "safari":
+            from selenium.webdriver.safari.options import Options
+        else:
+            from selenium.webdriver.chrome.options import Options
 
-        options: BrowserOptions = options_available[config.selenium_web_browser]()
+        options: BrowserOptions = Options()
         options.add_argument(
             "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.5615.49 Safari/537.36"
         )
 
         if config.selenium_web_browser == "firefox":
+            from selenium.webdriver.firefox.service import Service as GeckoDriverService
+            from selenium.webdriver.firefox.webdriver import WebDriver as FirefoxDriver
+
             if config.selenium_headless:
                 options.headless = True
                 options.add_argument("--disable-gpu")
             self.driver = FirefoxDriver(
-                service=GeckoDriverService(GeckoDriverManager().install()), options=options
+                service=GeckoDriverService(resolve_driver("firefox")), options=options
             )
         elif config.selenium_web_browser == "edge":
+            from selenium.webdriver.edge.service import Service as EdgeDriverService
+            from selenium.webdriver.edge.webdriver import WebDriver as EdgeDriver
+
             self.driver = EdgeDriver(
-                service=EdgeDriverService(EdgeDriverManager().install()), options=options
+                service=EdgeDriverService(resolve_driver("edge")), options=options
             )
         elif config.selenium_web_browser == "safari":
             # Requires a bit more setup on the users end
             # See https://developer.apple.com/documentation/webkit/testing_with_webdriver_in_safari
+            from selenium.webdriver.safari.webdriver import WebDriver as SafariDriver
+
             self.driver = SafariDriver(options=options)
         else:
+            from selenium.webdriver.chrome.service import Service as ChromeDriverService
+            from selenium.webdriver.chrome.webdriver import WebDriver as ChromeDriver
+
             if platform == "linux" or platform == "linux2":
                 options.add_argument("--disable-dev-shm-usage")
-                options.add_argument("--remote-debugging-port=9222")
+                # 并行会话时每个浏览器使用独立的调试端口，避免互相冲突
+                options.add_argument(f"--remote-debugging-port={find_free_port()}")
 
             options.add_argument("--no-sandbox")
             if config.selenium_headless:
                 options.add_argument("--headless=new")
                 options.add_argument("--disable-gpu")
 
-            # >>>>>>>>>>>>>>>>>>>>>>>>> DEBUG >>>>>>>>>>>>>>>>>>>>
-            # chromium_driver_path = Path("/usr/bin/chromedriver")
-            chromium_driver_path = Path(os.getenv("LOCAL_DRIVER_PATH"))
-
-            self.driver = ChromeDriver(
-                service=ChromeDriverService(str(chromium_driver_path))
-                if chromium_driver_path.exists()
-                else ChromeDriverService(ChromeDriverManager().install()),
-                options=options,
-            )
+            # 优先使用 LOCAL_DRIVER_PATH，其次是本地缓存中与浏览器版本匹配的驱动，见 driver_resolver
+            self.driver = ChromeDriver(service=ChromeDriverService(resolve_driver("chrome")), options=options)
         return self.driver
 
     def open_page_in_browser(self, url: str) -> WebDriver:
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.wait import WebDriverWait
+
         self.driver.get(url)
 
         WebDriverWait(self.driver, 10).until(
@@ -173,6 +166,49 @@ class DriverExecutor:
 
         return self.driver
 
+    def is_alive(self) -> bool:
+        """健康检查：浏览器进程与会话是否仍然可用"""
+        if self.driver is None:
+            return False
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def reset(self) -> None:
+        """
+        重置浏览器状态以便下一个会话复用：关闭多余窗口，清除cookie与storage，回到about:blank
+        """
+        handles = self.driver.window_handles
+        for handle in handles[1:]:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(handles[0])
+
+        try:
+            self.driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except WebDriverException:
+            # about:blank 等页面无法访问storage
+            pass
+
+        if hasattr(self.driver, "execute_cdp_cmd"):
+            # Chromium 内核可以一次清除所有域名下的cookie
+            self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        else:
+            self.driver.delete_all_cookies()
+
+        self.driver.get("about:blank")
+        if self.driver_watch is not None:
+            # 上一个会话的日志不带入下一个会话
+            self.driver_watch.clear()
+
+    def track_dom(self) -> DomTracker:
+        """
+        开启增量快照：在页面中安装 MutationObserver 跟踪器，之后读取页面只取回变化的子树，导航后重新获取完整快照
+        """
+        return track_dom(self.driver)
+
     def close_browser(self) -> None:
         """Close the browser
 
@@ -182,5 +218,7 @@ class DriverExecutor:
         Returns:
             None
         """
-        self.driver_watch.destory()
+        if self.driver_watch is not None:
+            self.driver_watch.stop()
+        untrack_dom(self.driver)
         self.driver.quit()
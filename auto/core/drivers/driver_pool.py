@@ -0,0 +1,193 @@
+"""
+驱动池
+
+预先启动并保持若干个经过健康检查的浏览器，会话开始时直接借出，会话结束后重置状态归还，
+避免每个会话都重新启动浏览器进程、查找驱动以及创建监听线程。
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from .driver_executor import DriverExecutor, DriverMetaData
+
+logger = logging.getLogger(__name__)
+
+
+class DriverPool:
+    """按 浏览器类型 + 是否无头 分组的 DriverExecutor 池"""
+
+    def __init__(self, size: int = 2, max_size: Optional[int] = None, warm_up: bool = True):
+        """
+        :param size: 每个分组保持的空闲浏览器数量
+        :param max_size: 每个分组最多同时存在的浏览器数量（空闲+借出），默认不限制
+        :param warm_up: 是否在首次使用某个分组时在后台补足空闲浏览器
+        """
+        self.size = size
+        self.max_size = max_size
+        self.warm_up = warm_up
+
+        self._idle: dict[tuple[str, bool], deque[DriverExecutor]] = {}
+        self._in_use: dict[tuple[str, bool], set[DriverExecutor]] = {}
+        self._launching: dict[tuple[str, bool], int] = {}
+        self._warming: dict[tuple[str, bool], int] = {}
+        """后台预热中的数量，借出时优先等待预热完成而不是再启动一个"""
+        self._waiting: dict[tuple[str, bool], int] = {}
+        self._lock = threading.Condition()
+        self._closed = False
+
+        self.checkout_latencies: deque[float] = deque(maxlen=1000)
+        """最近的借出耗时（秒）"""
+        self.launches = 0
+        self.reuses = 0
+        self.discards = 0
+
+    def _total(self, key) -> int:
+        return len(self._idle.get(key, ())) + len(self._in_use.get(key, ())) + self._launching.get(key, 0)
+
+    def _launch(self, meta_data: DriverMetaData) -> DriverExecutor:
+        executor = DriverExecutor().start(DriverMetaData(*meta_data.pool_key()))
+        with self._lock:
+            self.launches += 1
+        return executor
+
+    def _warm_one(self, meta_data: DriverMetaData):
+        """后台启动一个浏览器放入空闲队列"""
+        key = meta_data.pool_key()
+        executor = None
+        try:
+            executor = self._launch(meta_data)
+        except Exception as e:
+            logger.warning(f"Failed to pre-launch browser for pool {key}: {e}")
+
+        with self._lock:
+            self._launching[key] -= 1
+            self._warming[key] -= 1
+            self._lock.notify_all()
+            if executor is None:
+                return
+            if not self._closed:
+                self._idle.setdefault(key, deque()).append(executor)
+                return
+        executor.close_browser()
+
+    def prefill(self, meta_data: DriverMetaData = None):
+        """异步预热指定分组，补足空闲浏览器"""
+        meta_data = meta_data or DriverMetaData()
+        key = meta_data.pool_key()
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.size - len(self._idle.get(key, ())) - self._warming.get(key, 0)
+            if self.max_size is not None:
+                missing = min(missing, self.max_size - self._total(key))
+            missing = max(0, missing)
+            self._launching[key] = self._launching.get(key, 0) + missing
+            self._warming[key] = self._warming.get(key, 0) + missing
+
+        for _ in range(missing):
+            threading.Thread(target=self._warm_one, args=(meta_data,), daemon=True).start()
+
+    def acquire(self, meta_data: DriverMetaData = None) -> DriverExecutor:
+        """借出一个健康的浏览器，没有空闲浏览器时启动一个新的"""
+        meta_data = meta_data or DriverMetaData()
+        key = meta_data.pool_key()
+        started = time.perf_counter()
+
+        executor = None
+        while executor is None:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("DriverPool is closed")
+                idle = self._idle.setdefault(key, deque())
+                if not idle and self._warming.get(key, 0) > self._waiting.get(key, 0):
+                    # 已有浏览器在预热且尚未被其他等待者认领，等待其完成
+                    self._waiting[key] = self._waiting.get(key, 0) + 1
+                    self._lock.wait()
+                    self._waiting[key] -= 1
+                    continue
+                if not idle and self.max_size is not None and self._total(key) >= self.max_size:
+                    # 达到上限，等待其他会话归还
+                    self._lock.wait()
+                    continue
+                candidate = idle.popleft() if idle else None
+                if candidate is None:
+                    self._launching[key] = self._launching.get(key, 0) + 1
+
+            if candidate is None:
+                try:
+                    executor = self._launch(meta_data)
+                finally:
+                    with self._lock:
+                        self._launching[key] -= 1
+            elif candidate.is_alive():
+                executor = candidate
+                with self._lock:
+                    self.reuses += 1
+            else:
+                self._discard(candidate)
+
+        with self._lock:
+            self._in_use.setdefault(key, set()).add(executor)
+            self.checkout_latencies.append(time.perf_counter() - started)
+
+        if self.warm_up:
+            self.prefill(meta_data)
+        return executor
+
+    def release(self, executor: DriverExecutor):
+        """归还浏览器，重置失败或空闲数量已满时直接关闭"""
+        key = executor.meta_data.pool_key()
+        with self._lock:
+            self._in_use.get(key, set()).discard(executor)
+
+        keep = False
+        if not self._closed and executor.is_alive():
+            try:
+                executor.reset()
+                keep = True
+            except Exception as e:
+                logger.warning(f"Failed to reset browser, discarding it: {e}")
+
+        with self._lock:
+            if keep and not self._closed and len(self._idle.setdefault(key, deque())) < self.size:
+                self._idle[key].append(executor)
+                self._lock.notify_all()
+                return
+            self._lock.notify_all()
+        self._discard(executor)
+
+    def _discard(self, executor: DriverExecutor):
+        with self._lock:
+            self.discards += 1
+        try:
+            executor.close_browser()
+        except Exception as e:
+            logger.debug(f"Failed to close discarded browser: {e}")
+
+    def close(self):
+        """关闭池中所有空闲浏览器，借出中的浏览器在归还时关闭"""
+        with self._lock:
+            self._closed = True
+            idle = [executor for executors in self._idle.values() for executor in executors]
+            self._idle.clear()
+            self._lock.notify_all()
+        for executor in idle:
+            self._discard(executor)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latencies = sorted(self.checkout_latencies)
+            return {
+                "idle": {f"{k[0]}{'-headless' if k[1] else ''}": len(v) for k, v in self._idle.items()},
+                "in_use": {f"{k[0]}{'-headless' if k[1] else ''}": len(v) for k, v in self._in_use.items()},
+                "launches": self.launches,
+                "reuses": self.reuses,
+                "discards": self.discards,
+                "checkouts": len(latencies),
+                "checkout_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+                "checkout_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+            }
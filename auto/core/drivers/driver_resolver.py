@@ -0,0 +1,221 @@
+"""
+浏览器驱动解析
+
+启动浏览器前在本地查找与已安装浏览器版本匹配的驱动，不再每次都调用 webdriver_manager 探测版本：
+    1. LOCAL_DRIVER_PATH 指定且存在的 chromedriver
+    2. 版本化的本地缓存 {AIUM_DRIVER_CACHE}/{浏览器}/{主版本号}/{驱动文件}，默认位于 ~/.aium/drivers
+    3. webdriver_manager 以前下载到 ~/.wdm 的驱动
+    4. PATH 中版本匹配的驱动
+都找不到时，只有 AIUM_DRIVER_DOWNLOAD=on 才通过 webdriver_manager 下载并放入本地缓存，否则抛出 DriverNotFoundError，
+离线环境中可以预先把驱动放到缓存目录。
+
+解析结果在进程内缓存，同一进程中启动多个浏览器只解析一次。
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+from sys import platform
+from typing import Optional
+
+from auto.utils.env import load_env
+from auto.utils.exceptions import DriverNotFoundError
+
+logger = logging.getLogger(__name__)
+
+DRIVER_NAMES = {
+    "chrome": "chromedriver",
+    "edge": "msedgedriver",
+    "firefox": "geckodriver",
+}
+
+BROWSER_BINARIES = {
+    "chrome": {
+        "linux": ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser"],
+        "darwin": ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+                   "/Applications/Chromium.app/Contents/MacOS/Chromium"],
+        "win32": [r"%PROGRAMFILES%\Google\Chrome\Application\chrome.exe",
+                  r"%PROGRAMFILES(X86)%\Google\Chrome\Application\chrome.exe",
+                  r"%LOCALAPPDATA%\Google\Chrome\Application\chrome.exe"],
+    },
+    "edge": {
+        "linux": ["microsoft-edge", "microsoft-edge-stable"],
+        "darwin": ["/Applications/Microsoft Edge.app/Contents/MacOS/Microsoft Edge"],
+        "win32": [r"%PROGRAMFILES(X86)%\Microsoft\Edge\Application\msedge.exe",
+                  r"%PROGRAMFILES%\Microsoft\Edge\Application\msedge.exe"],
+    },
+    "firefox": {
+        "linux": ["firefox"],
+        "darwin": ["/Applications/Firefox.app/Contents/MacOS/firefox"],
+        "win32": [r"%PROGRAMFILES%\Mozilla Firefox\firefox.exe"],
+    },
+}
+"""各平台上浏览器可执行文件的常见位置"""
+
+WINDOWS_REGISTRY_KEYS = {
+    "chrome": r"HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon",
+    "edge": r"HKEY_CURRENT_USER\Software\Microsoft\Edge\BLBeacon",
+}
+
+_VERSION_RE = re.compile(r"(\d+)\.(\d+)(?:\.(\d+))?(?:\.(\d+))?")
+_ANY_VERSION = "any"
+"""geckodriver 不按浏览器主版本号发布，缓存在该目录下"""
+
+
+def _platform() -> str:
+    if platform.startswith("linux"):
+        return "linux"
+    return "win32" if platform.startswith("win") else platform
+
+
+def _run_version(binary: str) -> Optional[str]:
+    try:
+        output = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = _VERSION_RE.search(output or "")
+    return match.group(0) if match else None
+
+
+def detect_browser_version(browser: str) -> Optional[str]:
+    """在本地检测已安装浏览器的版本，不访问网络；检测不到时返回 None"""
+    current = _platform()
+    if current == "win32" and browser in WINDOWS_REGISTRY_KEYS:
+        try:
+            output = subprocess.run(["reg", "query", WINDOWS_REGISTRY_KEYS[browser], "/v", "version"],
+                                    capture_output=True, text=True, timeout=10).stdout
+            match = _VERSION_RE.search(output or "")
+            if match:
+                return match.group(0)
+        except (OSError, subprocess.SubprocessError):
+            pass
+
+    for candidate in BROWSER_BINARIES.get(browser, {}).get(current, []):
+        binary = os.path.expandvars(candidate)
+        if not os.path.isabs(binary):
+            binary = shutil.which(binary)
+        if binary and os.path.exists(binary):
+            version = _run_version(binary)
+            if version:
+                return version
+    return None
+
+
+def _major(version: Optional[str]) -> Optional[str]:
+    return version.split(".")[0] if version else None
+
+
+def _executable(name: str) -> str:
+    return f"{name}.exe" if _platform() == "win32" else name
+
+
+def driver_cache_dir() -> Path:
+    return Path(os.getenv("AIUM_DRIVER_CACHE") or Path.home() / ".aium" / "drivers")
+
+
+def _cache_slot(browser: str, browser_version: Optional[str]) -> str:
+    if browser == "firefox":
+        return _ANY_VERSION
+    return _major(browser_version) or _ANY_VERSION
+
+
+def _driver_matches(path: Path, browser: str, browser_version: Optional[str]) -> bool:
+    """chromedriver / msedgedriver 的主版本号需与浏览器一致"""
+    if browser == "firefox" or browser_version is None:
+        return True
+    return _major(_run_version(str(path))) == _major(browser_version)
+
+
+def _find_in_wdm_cache(driver_name: str, browser: str, browser_version: Optional[str]) -> Optional[Path]:
+    root = Path.home() / ".wdm" / "drivers" / driver_name
+    if not root.is_dir():
+        return None
+    major = _major(browser_version)
+    candidates = sorted(root.rglob(_executable(driver_name)), reverse=True)
+    for path in candidates:
+        if not path.is_file():
+            continue
+        # 路径中包含驱动版本，如 ~/.wdm/drivers/chromedriver/linux64/114.0.5735.90/chromedriver
+        if browser == "firefox" or major is None or any(part.split(".")[0] == major for part in path.parts):
+            return path
+    return None
+
+
+def resolve_driver_offline(browser: str) -> Optional[str]:
+    """只在本地查找驱动，找不到时返回 None"""
+    driver_name = DRIVER_NAMES[browser]
+    local = os.getenv("LOCAL_DRIVER_PATH")
+    if browser == "chrome" and local and Path(local).exists():
+        return local
+
+    browser_version = detect_browser_version(browser)
+    cached = driver_cache_dir() / browser / _cache_slot(browser, browser_version) / _executable(driver_name)
+    if cached.is_file():
+        return str(cached)
+
+    found = _find_in_wdm_cache(driver_name, browser, browser_version)
+    if found is None:
+        on_path = shutil.which(driver_name)
+        if on_path and _driver_matches(Path(on_path), browser, browser_version):
+            found = Path(on_path)
+    if found is not None:
+        _store(found, cached)
+        return str(cached) if cached.is_file() else str(found)
+    return None
+
+
+def _store(source: Path, target: Path):
+    """复制到版本化缓存，失败时不影响本次使用"""
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(source, target)
+        target.chmod(0o755)
+    except OSError as e:
+        logger.debug(f"Failed to cache driver {source} -> {target}: {e}")
+
+
+def _download(browser: str) -> str:
+    from webdriver_manager.chrome import ChromeDriverManager
+    from webdriver_manager.firefox import GeckoDriverManager
+    from webdriver_manager.microsoft import EdgeChromiumDriverManager
+
+    managers = {"chrome": ChromeDriverManager, "firefox": GeckoDriverManager, "edge": EdgeChromiumDriverManager}
+    path = Path(managers[browser]().install())
+    target = driver_cache_dir() / browser / _cache_slot(browser, detect_browser_version(browser)) / _executable(
+        DRIVER_NAMES[browser])
+    _store(path, target)
+    return str(target) if target.is_file() else str(path)
+
+
+def download_allowed() -> bool:
+    return os.getenv("AIUM_DRIVER_DOWNLOAD", "off").lower() in ("on", "1", "true", "yes")
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_driver(browser: str) -> str:
+    """
+    返回浏览器驱动的路径，结果在进程内缓存
+    :raises DriverNotFoundError: 本地没有匹配的驱动，且不允许下载
+    """
+    if browser not in DRIVER_NAMES:
+        raise DriverNotFoundError(f"No driver is needed or known for browser '{browser}'")
+
+    load_env()
+    path = resolve_driver_offline(browser)
+    if path is not None:
+        return path
+    if not download_allowed():
+        expected = driver_cache_dir() / browser / _cache_slot(browser, detect_browser_version(browser)) / _executable(
+            DRIVER_NAMES[browser])
+        hint = ", set LOCAL_DRIVER_PATH" if browser == "chrome" else ""
+        raise DriverNotFoundError(
+            f"No local {DRIVER_NAMES[browser]} matching the installed {browser} was found. "
+            f"Put one at {expected}{hint}, or set AIUM_DRIVER_DOWNLOAD=on to allow downloading it"
+        )
+    logger.info(f"Downloading {DRIVER_NAMES[browser]} for {browser}")
+    return _download(browser)
@@ -0,0 +1,233 @@
+"""
+浏览器日志收集
+
+Chromium 内核的浏览器通过 DevTools 协议（CDP）的 websocket 订阅控制台、JS 异常、浏览器日志与失败的网络请求，
+事件到达时写入有界的环形缓冲区，不占用 WebDriver 的 HTTP 连接；
+其他浏览器（或 CDP 连接失败时）退化为低频批量轮询 driver.get_log('browser')。
+
+缓冲区满时丢弃最旧的日志并计数，收集线程不会因为没有消费者而阻塞或无限占用内存；
+stop() 关闭连接并等待收集线程退出，close_browser 之后不再有残留线程。
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+ECHO_LEVELS = frozenset(["error", "warning"])
+"""实时打印的日志级别"""
+
+_LEVELS = {"severe": "error", "warn": "warning", "verbose": "debug", "log": "info"}
+
+
+@dataclass
+class LogEntry:
+    source: str
+    """console、exception、log（浏览器日志）或 network"""
+    level: str
+    """error、warning、info 或 debug"""
+    message: str
+    timestamp: float
+    url: Optional[str] = None
+
+
+def _level(value: Optional[str]) -> str:
+    value = (value or "info").lower()
+    return _LEVELS.get(value, value)
+
+
+class DriverWatch:
+    """
+    单个浏览器的日志收集器
+    """
+
+    def __init__(self, capacity: int = 1000, poll_interval: float = 5.0, echo: bool = True):
+        """
+        :param capacity: 环形缓冲区容量
+        :param poll_interval: 轮询模式下两次 get_log 的间隔（秒）
+        :param echo: 是否实时打印 error/warning 级别的日志
+        """
+        self.capacity = capacity
+        self.poll_interval = poll_interval
+        self.echo = echo
+        self.mode: Optional[str] = None
+        """cdp 或 poll，未开始监听时为 None"""
+        self.dropped = 0
+        """缓冲区满时被丢弃的日志数"""
+        self._entries: deque[LogEntry] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._connected = False
+
+    def listen(self, driver):
+        """开始收集，优先使用 CDP 事件"""
+        address = self._debugger_address(driver)
+        if address is not None:
+            self._start(self._run_cdp, (address, driver.current_window_handle), "cdp")
+            # 连接成功或失败都会很快返回
+            self._ready.wait(5)
+            if self._connected:
+                return
+            self.stop()
+            self._stop.clear()
+            self._ready.clear()
+        self._start(self._run_poll, (driver,), "poll")
+
+    def stop(self, timeout: float = 2.0):
+        """停止收集并等待收集线程退出，可重复调用"""
+        self._stop.set()
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None:
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                # 事件循环已结束
+                pass
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning("Browser log collector did not stop in time")
+        self._thread = None
+
+    # 兼容原有的拼写
+    destory = stop
+
+    def drain(self) -> list[LogEntry]:
+        """取出并清空已收集的日志"""
+        with self._lock:
+            entries = list(self._entries)
+            self._entries.clear()
+            return entries
+
+    def entries(self) -> list[LogEntry]:
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.dropped = 0
+
+    def _append(self, entry: LogEntry):
+        with self._lock:
+            if len(self._entries) == self.capacity:
+                self.dropped += 1
+            self._entries.append(entry)
+        if self.echo and entry.level in ECHO_LEVELS:
+            print("控制台输出:", entry.level, "-", entry.message)
+
+    def _start(self, target, args, mode: str):
+        self.mode = mode
+        self._thread = threading.Thread(target=target, args=args, name=f"aium-driver-watch-{mode}", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _debugger_address(driver) -> Optional[str]:
+        """chromedriver / msedgedriver 在 capabilities 中返回 DevTools 地址"""
+        capabilities = getattr(driver, "capabilities", None) or {}
+        for key in ("goog:chromeOptions", "ms:edgeOptions"):
+            address = (capabilities.get(key) or {}).get("debuggerAddress")
+            if address:
+                return address
+        return None
+
+    # CDP 模式
+
+    def _run_cdp(self, address: str, window_handle: str):
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        try:
+            self._task = loop.create_task(self._collect_cdp(address, window_handle))
+            loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"CDP log collector stopped: {e}")
+        finally:
+            self._ready.set()
+            self._task = None
+            self._loop = None
+            loop.close()
+
+    async def _collect_cdp(self, address: str, window_handle: str):
+        import aiohttp
+
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, connect=5)) as session:
+            async with session.get(f"http://{address}/json/list") as response:
+                targets = await response.json(content_type=None)
+            pages = [target for target in targets if target.get("type") == "page"]
+            # chromedriver 的窗口句柄就是 DevTools 的 targetId
+            target = next((page for page in pages if page.get("id") == window_handle), pages[0] if pages else None)
+            if target is None:
+                raise RuntimeError(f"No page target at {address}")
+
+            async with session.ws_connect(target["webSocketDebuggerUrl"], max_msg_size=0) as ws:
+                for message_id, method in enumerate(("Runtime.enable", "Log.enable", "Network.enable"), 1):
+                    await ws.send_str(json.dumps({"id": message_id, "method": method}))
+                self._connected = True
+                self._ready.set()
+
+                requests: OrderedDict[str, str] = OrderedDict()
+                """requestId -> url，只保留最近的请求用于失败时显示地址"""
+                async for message in ws:
+                    if message.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    event = json.loads(message.data)
+                    entry = self._parse_event(event.get("method"), event.get("params") or {}, requests)
+                    if entry is not None:
+                        self._append(entry)
+
+    def _parse_event(self, method: Optional[str], params: dict, requests: OrderedDict) -> Optional[LogEntry]:
+        now = time.time()
+        if method == "Runtime.consoleAPICalled":
+            message = " ".join(str(arg.get("value", arg.get("description", ""))) for arg in params.get("args", []))
+            return LogEntry("console", _level(params.get("type")), message, now)
+        if method == "Runtime.exceptionThrown":
+            details = params.get("exceptionDetails") or {}
+            description = (details.get("exception") or {}).get("description") or details.get("text", "")
+            return LogEntry("exception", "error", description, now, details.get("url"))
+        if method == "Log.entryAdded":
+            entry = params.get("entry") or {}
+            return LogEntry("log", _level(entry.get("level")), entry.get("text", ""), now, entry.get("url"))
+        if method == "Network.requestWillBeSent":
+            requests[params.get("requestId")] = (params.get("request") or {}).get("url")
+            if len(requests) > 512:
+                requests.popitem(last=False)
+        elif method == "Network.responseReceived":
+            response = params.get("response") or {}
+            requests.pop(params.get("requestId"), None)
+            if response.get("status", 0) >= 400:
+                return LogEntry("network", "error", f"{response.get('status')} {response.get('statusText', '')}",
+                                now, response.get("url"))
+        elif method == "Network.loadingFailed":
+            url = requests.pop(params.get("requestId"), None)
+            if not params.get("canceled"):
+                return LogEntry("network", "error", params.get("errorText", ""), now, url)
+        return None
+
+    # 轮询模式
+
+    def _run_poll(self, driver):
+        # 首次轮询前先等待一个间隔，避免与会话开始时的命令争用连接
+        while not self._stop.wait(self.poll_interval):
+            try:
+                logs = driver.get_log("browser")
+            except Exception as e:
+                # Firefox、Safari 等不支持 get_log，浏览器关闭后同样会失败
+                logger.debug(f"Browser log polling stopped: {e}")
+                return
+            now = time.time()
+            for log_entry in logs:
+                self._append(LogEntry("log", _level(log_entry.get("level")), log_entry.get("message", ""),
+                                      log_entry.get("timestamp", now * 1000) / 1000))
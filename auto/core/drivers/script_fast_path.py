@@ -0,0 +1,575 @@
+"""
+生成脚本的快速执行
+
+生成脚本中的每次 driver.find_element、click、send_keys 都是一次 WebDriver HTTP 往返，较慢的页面还会加上固定的 time.sleep。
+Chromium 内核的浏览器中，先把脚本解析为操作序列，再把连续的查找、点击、输入合并为一次 execute_async_script 在页面内执行：
+    - time.sleep(n) 改为等待页面稳定（文档加载完成、没有进行中的 fetch/XHR、一段时间内没有 DOM 变化），最长仍为 n 秒
+    - WebDriverWait(...).until(EC.xxx((by, value))) 在页面内轮询，超时时同样抛出 TimeoutException
+    - 点击前在元素中心依次派发 pointer/mouse 事件并聚焦，与 WebDriver 的点击一致
+    - 点击在回调返回之后才触发，点击引起的导航不会中断本次脚本调用；下一批操作、改由 WebDriver 执行的操作
+      以及脚本结束前先等待页面稳定，调用方随后读取的 URL 与页面已是点击之后的状态
+    - 一次页面内调用中的等待累计不超过 PAGE_BATCH_SECONDS，超出时拆分为多次调用
+
+脚本中包含无法转换的语句时整体退回 exec；页面内无法保证与 WebDriver 语义一致的操作（元素不存在、不可见、被遮挡、
+非文本输入框、Keys 按键、driver.get 等）从该操作开始改由 WebDriver 依次执行，已在页面内执行过的操作不会重复执行。
+"""
+from __future__ import annotations
+
+import ast
+import functools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from selenium.common.exceptions import JavascriptException, NoSuchElementException, TimeoutException, WebDriverException
+
+logger = logging.getLogger(__name__)
+
+CHROMIUM_BROWSERS = frozenset(["chrome", "chromium", "chrome-headless-shell", "msedge", "microsoftedge"])
+
+LOCATOR_STRATEGIES = {
+    "ID": "id",
+    "XPATH": "xpath",
+    "LINK_TEXT": "link text",
+    "PARTIAL_LINK_TEXT": "partial link text",
+    "NAME": "name",
+    "TAG_NAME": "tag name",
+    "CLASS_NAME": "class name",
+    "CSS_SELECTOR": "css selector",
+}
+"""By 常量 -> 定位方式"""
+
+WAIT_CONDITIONS = {
+    "presence_of_element_located": "present",
+    "visibility_of_element_located": "visible",
+    "element_to_be_clickable": "clickable",
+}
+"""支持的 expected_conditions -> 页面内的等待条件"""
+
+_ALLOWED_IMPORTS = ("selenium", "time")
+
+PAGE_OPS = frozenset(["find", "wait", "click", "send_keys", "clear", "sleep"])
+# 会改变页面状态的操作，脚本在这些操作之后失败时不能整体重新执行
+ACTION_OPS = frozenset(["click", "send_keys", "clear", "get", "back", "forward", "refresh"])
+"""可以在页面内执行的操作"""
+
+PAGE_MAX_SECONDS = 20
+"""单个操作在页面内等待的上限，更长的 sleep、wait 由 WebDriver 执行"""
+
+PAGE_BATCH_SECONDS = 20
+"""一次页面内调用中所有等待（开始前的页面稳定、sleep、wait）累计的上限，避免超过 WebDriver 默认 30 秒的脚本超时"""
+
+
+@dataclass(frozen=True)
+class ScriptOp:
+    kind: str
+    """find、wait、click、send_keys、clear、sleep、get、back、forward、refresh"""
+    target: Optional[str] = None
+    """元素变量名，链式调用使用生成的临时名称"""
+    by: Optional[str] = None
+    value: Optional[str] = None
+    """定位的值、输入的文本或要访问的地址"""
+    keys: tuple = ()
+    """send_keys 的参数，str 为文本，("key", 名称) 为 Keys 按键"""
+    seconds: float = 0.0
+    """sleep 的时长或 wait 的超时时间"""
+    condition: Optional[str] = None
+    """wait 的条件：present、visible、clickable"""
+
+    def in_page(self) -> bool:
+        if self.kind == "send_keys":
+            return all(isinstance(key, str) for key in self.keys)
+        return self.kind in PAGE_OPS and self.seconds <= PAGE_MAX_SECONDS
+
+    def to_js(self) -> dict:
+        return {
+            "kind": self.kind, "target": self.target, "by": self.by, "value": self.value,
+            "text": "".join(self.keys) if self.kind == "send_keys" else None,
+            "ms": int(self.seconds * 1000), "condition": self.condition,
+        }
+
+
+class _Untranslatable(Exception):
+    pass
+
+
+class _Translator:
+    """把生成脚本的 AST 转换为操作序列，只接受直线执行的简单语句"""
+
+    def __init__(self):
+        self.ops: list[ScriptOp] = []
+        self.elements: set[str] = set()
+        self.temporary = 0
+
+    def statement(self, node: ast.stmt):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names = [node.module or ""] if isinstance(node, ast.ImportFrom) else [alias.name for alias in node.names]
+            if not all(name.split(".")[0] in _ALLOWED_IMPORTS for name in names):
+                raise _Untranslatable("import")
+        elif isinstance(node, ast.Pass):
+            pass
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            # 字符串形式的注释
+            pass
+        elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            self.locate(node.value, node.targets[0].id)
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            self.call(node.value)
+        else:
+            raise _Untranslatable(type(node).__name__)
+
+    def locate(self, node: ast.expr, name: str):
+        """name = driver.find_element(...) 或 name = WebDriverWait(driver, n).until(EC.xxx((by, value)))"""
+        if not isinstance(node, ast.Call):
+            raise _Untranslatable("assign")
+        if _is_method(node, "driver", "find_element"):
+            by, value = self.locator(node.args, node.keywords)
+            self.ops.append(ScriptOp("find", name, by, value))
+        elif _is_wait(node):
+            self.ops.append(self.wait(node, name))
+        else:
+            raise _Untranslatable("assign")
+        self.elements.add(name)
+
+    def call(self, node: ast.Call):
+        func = node.func
+        if not isinstance(func, ast.Attribute):
+            raise _Untranslatable("call")
+
+        if _is_method(node, "time", "sleep"):
+            self.ops.append(ScriptOp("sleep", seconds=float(_constant(node.args, (int, float)))))
+            return
+        if _is_method(node, "driver", "get"):
+            self.ops.append(ScriptOp("get", value=_constant(node.args, str)))
+            return
+        if _is_method(node, "driver", "back") or _is_method(node, "driver", "forward") \
+                or _is_method(node, "driver", "refresh"):
+            if node.args or node.keywords:
+                raise _Untranslatable("call")
+            self.ops.append(ScriptOp(func.attr))
+            return
+        if _is_wait(node):
+            self.ops.append(self.wait(node, self.temporary_name()))
+            return
+
+        # 元素操作：变量.click() 或 driver.find_element(...).click()
+        owner = func.value
+        if isinstance(owner, ast.Name) and owner.id in self.elements:
+            target = owner.id
+        elif isinstance(owner, ast.Call):
+            target = self.temporary_name()
+            self.locate(owner, target)
+        else:
+            raise _Untranslatable("call")
+
+        if func.attr in ("click", "clear") and not node.args and not node.keywords:
+            self.ops.append(ScriptOp(func.attr, target))
+        elif func.attr == "send_keys" and node.args and not node.keywords:
+            self.ops.append(ScriptOp("send_keys", target, keys=tuple(_key(arg) for arg in node.args)))
+        else:
+            raise _Untranslatable(func.attr)
+
+    def wait(self, node: ast.Call, name: str) -> ScriptOp:
+        wait_call = node.func.value
+        # poll_frequency、ignored_exceptions 等参数在页面内无法保持语义，整体退回 exec
+        timeout = _constant(wait_call.args[1:2], (int, float)) if len(wait_call.args) == 2 else None
+        if timeout is None or wait_call.keywords or len(node.args) != 1 or node.keywords:
+            raise _Untranslatable("wait")
+        condition = node.args[0]
+        if not isinstance(condition, ast.Call) or len(condition.args) != 1 or condition.keywords:
+            raise _Untranslatable("wait")
+        condition_name = condition.func.attr if isinstance(condition.func, ast.Attribute) else getattr(
+            condition.func, "id", None)
+        if condition_name not in WAIT_CONDITIONS or not isinstance(condition.args[0], ast.Tuple):
+            raise _Untranslatable("wait")
+        by, value = self.locator(condition.args[0].elts, [])
+        return ScriptOp("wait", name, by, value, seconds=float(timeout), condition=WAIT_CONDITIONS[condition_name])
+
+    @staticmethod
+    def locator(args: list, keywords: list) -> tuple[str, str]:
+        values = list(args)
+        for keyword in keywords:
+            if keyword.arg not in ("by", "value"):
+                raise _Untranslatable("locator")
+            values.append(keyword.value)
+        if len(values) != 2:
+            raise _Untranslatable("locator")
+        by_node, value_node = values
+        if isinstance(by_node, ast.Attribute) and isinstance(by_node.value, ast.Name) and by_node.value.id == "By":
+            by = LOCATOR_STRATEGIES.get(by_node.attr)
+        elif isinstance(by_node, ast.Constant) and by_node.value in LOCATOR_STRATEGIES.values():
+            by = by_node.value
+        else:
+            by = None
+        if by is None or not isinstance(value_node, ast.Constant) or not isinstance(value_node.value, str):
+            raise _Untranslatable("locator")
+        return by, value_node.value
+
+    def temporary_name(self) -> str:
+        self.temporary += 1
+        return f"__element_{self.temporary}"
+
+
+def _is_method(node: ast.Call, owner: str, method: str) -> bool:
+    func = node.func
+    return isinstance(func, ast.Attribute) and func.attr == method \
+        and isinstance(func.value, ast.Name) and func.value.id == owner
+
+
+def _is_wait(node: ast.Call) -> bool:
+    func = node.func
+    return isinstance(func, ast.Attribute) and func.attr == "until" and isinstance(func.value, ast.Call) \
+        and isinstance(func.value.func, ast.Name) and func.value.func.id == "WebDriverWait" \
+        and bool(func.value.args) and isinstance(func.value.args[0], ast.Name) and func.value.args[0].id == "driver"
+
+
+def _constant(args: list, types):
+    if len(args) != 1 or not isinstance(args[0], ast.Constant) or not isinstance(args[0].value, types) \
+            or isinstance(args[0].value, bool):
+        raise _Untranslatable("constant")
+    return args[0].value
+
+
+def _key(node: ast.expr):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "Keys":
+        return "key", node.attr
+    raise _Untranslatable("send_keys")
+
+
+@functools.lru_cache(maxsize=256)
+def translate_script(script_code: str) -> Optional[tuple[ScriptOp, ...]]:
+    """
+    将生成脚本转换为操作序列
+    :return: 脚本包含无法转换的语句时返回 None
+    """
+    try:
+        tree = ast.parse(script_code)
+        translator = _Translator()
+        for node in tree.body:
+            translator.statement(node)
+    except (SyntaxError, _Untranslatable):
+        return None
+    return tuple(translator.ops)
+
+
+def is_chromium(driver) -> bool:
+    capabilities = getattr(driver, "capabilities", None) or {}
+    return str(capabilities.get("browserName", "")).lower() in CHROMIUM_BROWSERS
+
+
+# 参数：操作列表、开始前是否等待页面稳定、稳定所需的无变化时长（毫秒）、回调
+# 返回 {done: 已执行的操作数, elements: {变量名: 元素}, click: 点击是否已安排, error: 等待超时的说明}
+PAGE_SCRIPT = r"""
+var ops = arguments[0], settleFirst = arguments[1], quietMs = arguments[2], callback = arguments[arguments.length - 1];
+var elements = {};
+
+if (!window.__aiumPending) {
+  window.__aiumPending = {count: 0};
+  var pending = window.__aiumPending;
+  var release = function () { pending.count = Math.max(0, pending.count - 1); };
+  if (window.fetch) {
+    var fetch = window.fetch;
+    window.fetch = function () {
+      pending.count++;
+      return fetch.apply(this, arguments).then(function (r) { release(); return r; },
+                                                function (e) { release(); throw e; });
+    };
+  }
+  var send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function () {
+    pending.count++;
+    this.addEventListener('loadend', release);
+    return send.apply(this, arguments);
+  };
+}
+
+function locate(by, value) {
+  switch (by) {
+    case 'id': return document.getElementById(value);
+    case 'css selector': return document.querySelector(value);
+    case 'xpath':
+      var node = document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+      return node && node.nodeType === 1 ? node : null;
+    case 'name': return document.querySelector('[name="' + CSS.escape(value) + '"]');
+    case 'class name': return document.getElementsByClassName(value)[0] || null;
+    case 'tag name': return document.getElementsByTagName(value)[0] || null;
+    case 'link text':
+    case 'partial link text':
+      var links = document.getElementsByTagName('a');
+      for (var i = 0; i < links.length; i++) {
+        var text = links[i].innerText.trim();
+        if (by === 'link text' ? text === value : text.indexOf(value) >= 0) return links[i];
+      }
+      return null;
+  }
+  return null;
+}
+
+function visible(el) {
+  var rect = el.getBoundingClientRect(), style = getComputedStyle(el);
+  return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+}
+
+// 与 WebDriver 的点击一致：在元素中心依次派发 pointer/mouse 事件，mousedown 未被阻止时聚焦，最后触发 click
+function pointerClick(el) {
+  var rect = el.getBoundingClientRect();
+  var x = rect.left + rect.width / 2, y = rect.top + rect.height / 2;
+  var target = document.elementFromPoint(x, y) || el;
+  var mouse = {bubbles: true, cancelable: true, composed: true, view: window, clientX: x, clientY: y, button: 0};
+  var pointer = Object.assign({pointerId: 1, pointerType: 'mouse', isPrimary: true}, mouse);
+  var pressed = {buttons: 1, detail: 1};
+  target.dispatchEvent(new PointerEvent('pointerover', pointer));
+  target.dispatchEvent(new MouseEvent('mouseover', mouse));
+  target.dispatchEvent(new PointerEvent('pointermove', pointer));
+  target.dispatchEvent(new MouseEvent('mousemove', mouse));
+  target.dispatchEvent(new PointerEvent('pointerdown', Object.assign({}, pointer, pressed)));
+  if (target.dispatchEvent(new MouseEvent('mousedown', Object.assign({}, mouse, pressed)))) {
+    var focusable = target.closest('a[href], button, input, select, textarea, [tabindex], [contenteditable]');
+    if (focusable) focusable.focus({preventScroll: true});
+    else if (document.activeElement && document.activeElement !== document.body) document.activeElement.blur();
+  }
+  target.dispatchEvent(new PointerEvent('pointerup', Object.assign({}, pointer, {detail: 1})));
+  target.dispatchEvent(new MouseEvent('mouseup', Object.assign({}, mouse, {detail: 1})));
+  // mousedown/mouseup 的处理函数可能已移除该元素（如下拉菜单收起），此时与真实点击一样不再触发 click
+  if (target.isConnected) target.click();
+}
+
+function clickable(el) {
+  if (!el.isConnected || !visible(el) || el.disabled) return false;
+  el.scrollIntoView({block: 'center', inline: 'center'});
+  var rect = el.getBoundingClientRect();
+  var hit = document.elementFromPoint(rect.left + rect.width / 2, rect.top + rect.height / 2);
+  return hit !== null && (hit === el || el.contains(hit));
+}
+
+var TEXT_TYPES = ['text', 'search', 'email', 'url', 'tel', 'password', 'number', ''];
+
+function typeInto(el, text) {
+  var tag = el.tagName;
+  if (tag !== 'INPUT' && tag !== 'TEXTAREA') return false;
+  if (tag === 'INPUT' && TEXT_TYPES.indexOf((el.getAttribute('type') || '').toLowerCase()) < 0) return false;
+  if (!el.isConnected || el.disabled || el.readOnly || !visible(el)) return false;
+  var proto = tag === 'INPUT' ? HTMLInputElement.prototype : HTMLTextAreaElement.prototype;
+  var setter = Object.getOwnPropertyDescriptor(proto, 'value').set;
+  el.focus();
+  for (var i = 0; i < text.length; i++) {
+    var key = {key: text[i], bubbles: true, cancelable: true};
+    el.dispatchEvent(new KeyboardEvent('keydown', key));
+    // 受控组件（React 等）需要通过原型上的 setter 赋值才能感知变化
+    setter.call(el, el.value + text[i]);
+    el.dispatchEvent(new InputEvent('input', {data: text[i], inputType: 'insertText', bubbles: true}));
+    el.dispatchEvent(new KeyboardEvent('keyup', key));
+  }
+  el.dispatchEvent(new Event('change', {bubbles: true}));
+  return true;
+}
+
+function clear(el) {
+  if (el.tagName !== 'INPUT' && el.tagName !== 'TEXTAREA') return false;
+  if (!el.isConnected || el.disabled || el.readOnly) return false;
+  var proto = el.tagName === 'INPUT' ? HTMLInputElement.prototype : HTMLTextAreaElement.prototype;
+  Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, '');
+  el.dispatchEvent(new Event('input', {bubbles: true}));
+  el.dispatchEvent(new Event('change', {bubbles: true}));
+  return true;
+}
+
+function settle(maxMs, done) {
+  var started = Date.now(), last = started;
+  var observer = new MutationObserver(function () { last = Date.now(); });
+  observer.observe(document.documentElement, {subtree: true, childList: true, attributes: true, characterData: true});
+  (function check() {
+    var now = Date.now();
+    var idle = document.readyState === 'complete' && window.__aiumPending.count === 0 && now - last >= quietMs;
+    if (idle || now - started >= maxMs) {
+      observer.disconnect();
+      done();
+    } else {
+      setTimeout(check, Math.min(25, quietMs));
+    }
+  })();
+}
+
+function waitFor(op, done) {
+  var started = Date.now();
+  (function check() {
+    var el = locate(op.by, op.value);
+    var ready = el && (op.condition === 'present' || (op.condition === 'visible' ? visible(el) : clickable(el)));
+    if (ready) return done(el);
+    if (Date.now() - started >= op.ms) return done(null);
+    setTimeout(check, 25);
+  })();
+}
+
+function finish(index, result) {
+  result = result || {};
+  result.done = index;
+  result.elements = elements;
+  callback(result);
+}
+
+function run(index) {
+  if (index >= ops.length) return finish(index);
+  var op = ops[index];
+  if (op.kind === 'sleep') return settle(op.ms, function () { run(index + 1); });
+  if (op.kind === 'wait') {
+    return waitFor(op, function (el) {
+      if (!el) return finish(index, {error: 'Timed out waiting for ' + op.by + '=' + op.value});
+      elements[op.target] = el;
+      run(index + 1);
+    });
+  }
+  if (op.kind === 'find') {
+    var found = locate(op.by, op.value);
+    if (!found) return finish(index);
+    elements[op.target] = found;
+    return run(index + 1);
+  }
+  var el = elements[op.target];
+  if (!el) return finish(index);
+  if (op.kind === 'click') {
+    // 新窗口与文件选择框需要可信的点击事件
+    var link = el.closest('a[target]');
+    if (!clickable(el) || (link && link.target !== '_self') || (el.tagName === 'INPUT' && el.type === 'file')) {
+      return finish(index);
+    }
+    // 回调返回后再点击，点击引起的导航不会中断本次调用
+    setTimeout(function () { pointerClick(el); }, 0);
+    return finish(index + 1, {click: true});
+  }
+  if (op.kind === 'send_keys' ? !typeInto(el, op.text) : !clear(el)) return finish(index);
+  run(index + 1);
+}
+
+if (settleFirst) settle(settleFirst, function () { run(0); });
+else run(0);
+"""
+
+
+class ScriptFastPath:
+    """
+    生成脚本的执行后端：能在页面内执行的部分合并为一次 execute_async_script，其余部分通过 WebDriver 执行
+    """
+
+    def __init__(self, quiet_ms: int = 50, click_settle_ms: int = 2000):
+        """
+        :param quiet_ms: 页面稳定所需的无 DOM 变化时长（毫秒）
+        :param click_settle_ms: 点击之后还有后续操作时，等待页面稳定的最长时间（毫秒）
+        """
+        self.quiet_ms = quiet_ms
+        self.click_settle_ms = click_settle_ms
+        self.stats = {"scripts": 0, "fallbacks": 0, "page_calls": 0, "driver_ops": 0}
+        """scripts：快速执行的脚本数，fallbacks：整体退回 exec 的脚本数，page_calls：页面内执行次数，driver_ops：改由 WebDriver 执行的操作数"""
+
+    def run(self, driver, script_code: str) -> bool:
+        """
+        执行生成脚本
+        :return: False 表示脚本无法转换，需要调用方自行 exec
+        """
+        ops = translate_script(script_code)
+        if ops is None:
+            self.stats["fallbacks"] += 1
+            return False
+        self.stats["scripts"] += 1
+
+        try:
+            self.run_ops(driver, ops)
+        except (NoSuchElementException, TimeoutException) as e:
+            # 失败之前没有执行过改变页面状态的操作时，调用方可以重新定位后整体重试
+            position = getattr(e, "aium_position", len(ops))
+            e.aium_replayable = not any(op.kind in ACTION_OPS for op in ops[:position])
+            raise
+        return True
+
+    def run_ops(self, driver, ops: tuple[ScriptOp, ...]):
+        """依次执行操作；找不到元素或等待超时时在异常的 aium_position 上记录失败的操作序号"""
+        elements: dict = {}
+        index = 0
+        settle_first = 0
+        while index < len(ops):
+            if not ops[index].in_page():
+                if settle_first:
+                    self.settle(driver, settle_first)
+                    settle_first = 0
+                self.run_on_driver_at(driver, ops, index, elements)
+                index += 1
+                continue
+
+            end = index
+            budget = PAGE_BATCH_SECONDS - settle_first / 1000
+            while end < len(ops) and ops[end].in_page():
+                # sleep、wait 的 seconds 为最长等待时间，其余操作为 0；每批至少包含一个操作
+                if end > index and ops[end].seconds > budget:
+                    break
+                budget -= ops[end].seconds
+                end += 1
+            result = self.run_in_page(driver, ops[index:end], settle_first)
+            elements.update(result.get("elements") or {})
+            done = index + int(result.get("done", 0))
+            if result.get("error"):
+                error = TimeoutException(result["error"])
+                error.aium_position = done
+                raise error
+            settle_first = self.click_settle_ms if result.get("click") else 0
+            if done < end and not result.get("click"):
+                # 页面内无法执行的操作由 WebDriver 执行，例如元素不存在时抛出 NoSuchElementException
+                self.run_on_driver_at(driver, ops, done, elements)
+                done += 1
+            index = done
+        if settle_first:
+            # 脚本以点击结束：与 WebDriver 的 click 一样等待其结果，调用方随后读取 current_url 与页面状态
+            self.settle(driver, settle_first)
+
+    def run_on_driver_at(self, driver, ops: tuple[ScriptOp, ...], index: int, elements: dict):
+        try:
+            self.run_on_driver(driver, ops[index], elements)
+        except (NoSuchElementException, TimeoutException) as e:
+            e.aium_position = index
+            raise
+
+    def settle(self, driver, max_ms: int):
+        """只等待页面稳定的页面内调用；点击引起导航时旧页面的脚本可能被中断，此时新页面已开始加载，忽略即可"""
+        try:
+            self.run_in_page(driver, (), max_ms)
+        except WebDriverException as e:
+            logger.debug(f"Settle after click interrupted: {e}")
+
+    def run_in_page(self, driver, ops: tuple[ScriptOp, ...], settle_first: int) -> dict:
+        self.stats["page_calls"] += 1
+        try:
+            result = driver.execute_async_script(PAGE_SCRIPT, [op.to_js() for op in ops], settle_first, self.quiet_ms)
+        except JavascriptException as e:
+            # 页面的 CSP 或脚本环境异常，本批操作全部交给 WebDriver
+            logger.debug(f"Fast path script failed, falling back to WebDriver: {e}")
+            return {"done": 0}
+        return result or {"done": 0}
+
+    def run_on_driver(self, driver, op: ScriptOp, elements: dict):
+        """通过 WebDriver 执行单个操作，与原脚本的语义一致"""
+        self.stats["driver_ops"] += 1
+        if op.kind == "find":
+            elements[op.target] = driver.find_element(op.by, op.value)
+        elif op.kind == "wait":
+            from selenium.webdriver.support import expected_conditions as EC
+            from selenium.webdriver.support.wait import WebDriverWait
+
+            condition = next(name for name, value in WAIT_CONDITIONS.items() if value == op.condition)
+            elements[op.target] = WebDriverWait(driver, op.seconds).until(
+                getattr(EC, condition)((op.by, op.value)))
+        elif op.kind in ("click", "clear"):
+            getattr(elements[op.target], op.kind)()
+        elif op.kind == "send_keys":
+            from selenium.webdriver.common.keys import Keys
+
+            elements[op.target].send_keys(*(key if isinstance(key, str) else getattr(Keys, key[1]) for key in op.keys))
+        elif op.kind == "sleep":
+            time.sleep(op.seconds)
+        elif op.kind == "get":
+            driver.get(op.value)
+        elif op.kind in ("back", "forward", "refresh"):
+            getattr(driver, op.kind)()
+        else:
+            raise WebDriverException(f"Unsupported script operation: {op.kind}")
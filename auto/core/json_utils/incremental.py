@@ -0,0 +1,228 @@
+"""
+增量 JSON 解析
+
+流式接收 LLM 响应时逐段喂入文本，不必等待完整响应：
+被关注的字段（例如 command、data.locators）一闭合就通过回调交出解析后的值，
+出现不符合 JSON 语法的字符时立即抛出 InvalidAgentResponseError，调用方可以据此提前中止请求。
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional, Union
+
+from auto.utils.exceptions import InvalidAgentResponseError
+
+JSONPath = tuple[Union[str, int], ...]
+"""字段路径，例如 ("data", "locators")，数组元素用下标表示"""
+
+FieldCallback = Callable[[JSONPath, Any], None]
+
+_WHITESPACE = " \t\r\n"
+_LITERAL_CHARS = frozenset("0123456789+-.eEtruefalsn")
+
+
+@dataclass
+class _Frame:
+    kind: str
+    """{ 或 ["""
+    path: JSONPath
+    start: int
+    key: Union[str, int, None] = None
+    """对象中当前的键，或数组中当前的下标"""
+
+
+class IncrementalJSONParser:
+    """
+    逐字符的 JSON 状态机，只做语法检查与路径跟踪，字段的值在闭合时才用 json.loads 解析
+
+    允许响应被 ``` 代码块包裹（与 extract_dict_from_response 一致），顶层必须是对象
+    """
+
+    def __init__(self, watch: Iterable[JSONPath] = (), on_field: Optional[FieldCallback] = None):
+        """
+        :param watch: 关注的字段路径
+        :param on_field: 关注的字段闭合时的回调，参数为 (路径, 值)；回调抛出的异常会原样传给 feed 的调用方
+        """
+        self.watch = set(tuple(path) for path in watch)
+        self.on_field = on_field
+        self.fields: dict[JSONPath, Any] = {}
+        """已闭合的关注字段"""
+
+        self.text = ""
+        self.done = False
+        """顶层对象已闭合"""
+        self._position = 0
+        self._state = "start"
+        self._stack: list[_Frame] = []
+        self._value_start = 0
+        self._string_role = "value"
+        self._escaped = False
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+        text = self.text
+        while self._position < len(text):
+            char = text[self._position]
+            if not self._step(char):
+                # 字面量在遇到分隔符时结束，分隔符需要在新状态下重新处理
+                continue
+            self._position += 1
+
+    def _step(self, char: str) -> bool:
+        """处理一个字符，返回 False 表示该字符未被消费"""
+        state = self._state
+        if state == "string":
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._end_string()
+            elif char < " ":
+                self._fail("control character in string")
+            return True
+
+        if state == "literal":
+            if char in _LITERAL_CHARS:
+                return True
+            self._complete_value(self._value_start, self._position)
+            return False
+
+        if char in _WHITESPACE:
+            return True
+
+        if state == "start":
+            if char == "`":
+                self._state = "fence"
+            elif char == "{":
+                self._open("{")
+            else:
+                self._fail("response does not start with a JSON object")
+        elif state == "fence":
+            # ``` 之后是可选的语言标识，例如 ```json
+            if char == "{":
+                self._open("{")
+            elif not (char == "`" or char.isalpha()):
+                self._fail("unexpected text before the JSON object")
+        elif state == "value":
+            self._start_value(char)
+        elif state == "key_or_end":
+            if char == "}":
+                self._close("}")
+            elif char == '"':
+                self._start_string("key")
+            else:
+                self._fail("expected a property name")
+        elif state == "key":
+            if char == '"':
+                self._start_string("key")
+            else:
+                self._fail("expected a property name")
+        elif state == "colon":
+            if char != ":":
+                self._fail("expected ':'")
+            self._state = "value"
+        elif state == "value_or_end":
+            if char == "]":
+                self._close("]")
+            else:
+                self._start_value(char)
+        elif state == "after_value":
+            frame = self._stack[-1]
+            if char == ",":
+                if frame.kind == "{":
+                    self._state = "key"
+                else:
+                    frame.key += 1
+                    self._state = "value"
+            elif char in "}]":
+                self._close(char)
+            else:
+                self._fail("expected ',' or the end of the container")
+        elif state == "end":
+            if char != "`":
+                self._fail("unexpected text after the JSON object")
+        return True
+
+    def _start_value(self, char: str):
+        if char in "{[":
+            self._open(char)
+        elif char == '"':
+            self._start_string("value")
+        elif char in _LITERAL_CHARS:
+            self._value_start = self._position
+            self._state = "literal"
+        else:
+            self._fail(f"unexpected character {char!r}")
+
+    def _start_string(self, role: str):
+        self._value_start = self._position
+        self._string_role = role
+        self._state = "string"
+
+    def _end_string(self):
+        if self._string_role == "key":
+            self._stack[-1].key = json.loads(self.text[self._value_start:self._position + 1])
+            self._state = "colon"
+        else:
+            self._complete_value(self._value_start, self._position + 1)
+
+    def _current_path(self) -> JSONPath:
+        if not self._stack:
+            return ()
+        frame = self._stack[-1]
+        return frame.path + (frame.key,)
+
+    def _open(self, kind: str):
+        self._stack.append(_Frame(kind, self._current_path(), self._position, None if kind == "{" else 0))
+        self._state = "key_or_end" if kind == "{" else "value_or_end"
+
+    def _close(self, char: str):
+        frame = self._stack[-1]
+        if (frame.kind == "{") != (char == "}"):
+            self._fail(f"mismatched '{char}'")
+        self._stack.pop()
+        self._emit(frame.path, frame.start, self._position + 1)
+        self._after_value()
+
+    def _complete_value(self, start: int, end: int):
+        path = self._current_path()
+        if path in self.watch:
+            self._emit(path, start, end)
+        else:
+            try:
+                # 字面量只能在结束时检查，例如 tru 或 1.2.3
+                if self._state == "literal":
+                    json.loads(self.text[start:end])
+            except json.JSONDecodeError:
+                self._fail(f"invalid literal {self.text[start:end]!r}")
+        self._after_value()
+
+    def _after_value(self):
+        if self._stack:
+            self._state = "after_value"
+        else:
+            self.done = True
+            self._state = "end"
+
+    def _emit(self, path: JSONPath, start: int, end: int):
+        if path not in self.watch:
+            return
+        try:
+            value = json.loads(self.text[start:end])
+        except json.JSONDecodeError as e:
+            self._fail(f"invalid value for '{'.'.join(map(str, path))}': {e}")
+        self.fields[path] = value
+        if self.on_field is not None:
+            self.on_field(path, value)
+
+    def _fail(self, reason: str):
+        raise InvalidAgentResponseError(
+            f"Malformed JSON in streamed response at offset {self._position}: {reason}"
+        )
+
+    def close(self) -> None:
+        """响应接收完毕，检查顶层对象是否完整"""
+        if not self.done:
+            self._fail("response ended before the JSON object was closed")
@@ -1,15 +1,20 @@
 """Utilities for the json_fixes package."""
 import ast
+import copy
 import json
 import logging
 import os.path
-from typing import Any, Literal
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Literal
 
-from jsonschema import Draft7Validator
+import orjson
 
 from auto.config import Config
 from auto.utils.exceptions import InvalidAgentResponseError
 
+if TYPE_CHECKING:
+    from jsonschema import Draft7Validator
+
 logger = logging.getLogger(__name__)
 
 LLM_DEFAULT_RESPONSE_FORMAT = "llm_response_format_1"
@@ -28,8 +33,11 @@ def extract_dict_from_response(response_content: str) -> dict[str, Any]:
         # Remove leading and trailing whitespace
         response_content = response_content.strip()
 
-        # Parse the JSON data using json.loads
-        return json.loads(response_content)
+        # Parse the JSON data using orjson, falling back to json.loads for inputs orjson rejects (e.g. NaN)
+        try:
+            return orjson.loads(response_content)
+        except orjson.JSONDecodeError:
+            return json.loads(response_content)
     except BaseException as e:
         logger.info(f"Error parsing JSON response with literal_eval {e}")
         logger.debug(f"Invalid JSON received in response: {response_content}")
@@ -37,21 +45,39 @@ def extract_dict_from_response(response_content: str) -> dict[str, Any]:
         return {}
 
 
-def llm_response_schema(
-    config: Config, schema_name: str = LLM_DEFAULT_RESPONSE_FORMAT
-) -> dict[str, Any]:
+@lru_cache(maxsize=None)
+def _load_schema(schema_name: str, openai_functions: bool) -> dict[str, Any]:
     filename = os.path.join(os.path.dirname(__file__), f"{schema_name}.json")
     with open(filename, "r") as f:
         try:
             json_schema = json.load(f)
         except Exception as e:
             raise RuntimeError(f"Failed to load JSON schema: {e}")
-    if config.openai_functions:
+    if openai_functions:
         del json_schema["properties"]["command"]
         json_schema["required"].remove("command")
     return json_schema
 
 
+@lru_cache(maxsize=None)
+def get_validator(schema_name: str = LLM_DEFAULT_RESPONSE_FORMAT, openai_functions: bool = False) -> "Draft7Validator":
+    """
+    每个 schema 变体在进程内只加载、校验并编译一次，jsonschema 在首次校验时才导入
+    """
+    from jsonschema import Draft7Validator
+
+    schema = _load_schema(schema_name, openai_functions)
+    Draft7Validator.check_schema(schema)
+    return Draft7Validator(schema)
+
+
+def llm_response_schema(
+    config: Config, schema_name: str = LLM_DEFAULT_RESPONSE_FORMAT
+) -> dict[str, Any]:
+    # 返回副本，避免调用方修改缓存中的 schema
+    return copy.deepcopy(_load_schema(schema_name, config.openai_functions))
+
+
 def validate_dict(
     object: object, config: Config, schema_name: str = LLM_DEFAULT_RESPONSE_FORMAT
 ) -> tuple[Literal[True], None] | tuple[Literal[False], list]:
@@ -64,8 +90,11 @@ def validate_dict(
         bool: Whether the json_object is valid or not
         list: Errors found in the json_object, or None if the object is valid
     """
-    schema = llm_response_schema(config, schema_name)
-    validator = Draft7Validator(schema)
+    validator = get_validator(schema_name, config.openai_functions)
+    # 绝大多数响应是合法的，is_valid 在第一个错误处即停止，只有不合法时才收集全部错误
+    if validator.is_valid(object):
+        logger.debug("The JSON object is valid.")
+        return True, None
 
     if errors := sorted(validator.iter_errors(object), key=lambda e: e.path):
         for error in errors:
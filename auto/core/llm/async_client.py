@@ -0,0 +1,269 @@
+"""
+异步 Chat Completion 客户端
+
+基于 aiohttp 的共享长连接池，直接调用 chat-completions 接口，支持并发上限与单请求超时。
+同步的 Agent 通过 create_chat_completion_sync 在后台事件循环中复用同一个连接池，
+流式请求通过 stream_chat_completion_sync 逐段获取内容。
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import concurrent.futures
+import json
+import logging
+import queue
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, List, Optional, TypeVar
+
+import aiohttp
+import openai
+from openai import error as openai_error
+from openai.openai_object import OpenAIObject
+from openai.util import convert_to_openai_object
+
+from auto.core.llm.base import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncChatClient:
+    """asyncio 原生的 chat-completions 客户端"""
+
+    def __init__(
+            self,
+            api_base: Optional[str] = None,
+            api_key: Optional[str] = None,
+            max_concurrency: int = 64,
+            pool_size: int = 100,
+            timeout: float = 120,
+            keepalive_timeout: float = 30,
+    ):
+        """
+        :param api_base: 接口地址，默认使用 openai.api_base，可以指向本地桩服务
+        :param api_key: 默认使用 openai.api_key
+        :param max_concurrency: 同时进行中的请求上限
+        :param pool_size: 连接池大小
+        :param timeout: 单个请求的默认超时时间（秒），可通过 request_timeout 参数覆盖
+        :param keepalive_timeout: 空闲连接保持时间（秒）
+        """
+        self.api_base = api_base
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+
+        self._sessions: dict[asyncio.AbstractEventLoop, tuple[aiohttp.ClientSession, asyncio.Semaphore]] = {}
+        """aiohttp 的会话与事件循环绑定，每个事件循环各自维护连接池"""
+
+    def _get_session(self) -> tuple[aiohttp.ClientSession, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        if loop not in self._sessions or self._sessions[loop][0].closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=self.keepalive_timeout)
+            session = aiohttp.ClientSession(connector=connector, trust_env=True)
+            self._sessions[loop] = (session, asyncio.Semaphore(self.max_concurrency))
+        return self._sessions[loop]
+
+    def _headers(self) -> dict[str, str]:
+        headers = {
+            "Authorization": f"Bearer {self.api_key or openai.api_key}",
+            "Content-Type": "application/json",
+        }
+        if openai.organization:
+            headers["OpenAI-Organization"] = openai.organization
+        return headers
+
+    async def create_chat_completion(
+            self,
+            messages: List[ChatMessage],
+            *_,
+            request_timeout: Optional[float] = None,
+            **kwargs,
+    ) -> OpenAIObject:
+        """Create a chat completion over the shared connection pool
+
+        Args:
+            messages: A list of messages to feed to the chatbot.
+            request_timeout: Timeout in seconds for this request.
+            kwargs: Other arguments to pass to the chat completion endpoint.
+        Returns:
+            OpenAIObject: The ChatCompletion response, same shape as openai.ChatCompletion.create
+        """
+        session, semaphore = self._get_session()
+        url = f"{(self.api_base or openai.api_base).rstrip('/')}/chat/completions"
+        payload = json.dumps({"messages": messages, **kwargs})
+        timeout = aiohttp.ClientTimeout(total=request_timeout or self.timeout)
+
+        async with semaphore:
+            try:
+                async with session.post(url, data=payload, headers=self._headers(), timeout=timeout) as response:
+                    body = await response.text()
+                    status = response.status
+            except asyncio.TimeoutError as e:
+                raise openai_error.Timeout(f"Request timed out after {timeout.total}s") from e
+            except aiohttp.ClientError as e:
+                raise openai_error.APIConnectionError(f"Error communicating with chat completion API: {e}") from e
+
+        return convert_to_openai_object(_parse_body(body, status))
+
+    async def stream_chat_completion(
+            self,
+            messages: List[ChatMessage],
+            *_,
+            request_timeout: Optional[float] = None,
+            **kwargs,
+    ) -> AsyncIterator[str]:
+        """以 stream=True 请求接口，逐段返回 assistant 消息的内容
+
+        提前结束迭代（例如解析出错）会关闭连接，服务端随之停止生成。
+        request_timeout 限制的是两段内容之间的最长间隔，而不是整个响应的耗时。
+        """
+        session, semaphore = self._get_session()
+        url = f"{(self.api_base or openai.api_base).rstrip('/')}/chat/completions"
+        payload = json.dumps({"messages": messages, **kwargs, "stream": True})
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=request_timeout or self.timeout)
+
+        async with semaphore:
+            try:
+                async with session.post(url, data=payload, headers=self._headers(), timeout=timeout) as response:
+                    if response.status != 200:
+                        _parse_body(await response.text(), response.status)
+                    # Server-Sent Events：每个事件一行 data: {...}，以 data: [DONE] 结束
+                    async for line in response.content:
+                        line = line.strip()
+                        if not line.startswith(b"data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == b"[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        if chunk.get("error"):
+                            raise openai_error.APIError(chunk["error"].get("message", data.decode()), http_body=data.decode())
+                        for choice in chunk.get("choices", []):
+                            content = (choice.get("delta") or {}).get("content")
+                            if content:
+                                yield content
+            except asyncio.TimeoutError as e:
+                raise openai_error.Timeout(f"No data received for {timeout.sock_read}s") from e
+            except aiohttp.ClientError as e:
+                raise openai_error.APIConnectionError(f"Error communicating with chat completion API: {e}") from e
+
+    async def close(self):
+        """关闭当前事件循环上的连接池"""
+        entry = self._sessions.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].close()
+
+
+def _parse_body(body: str, status: int) -> dict:
+    """解析响应体，按状态码转换为 openai 的异常类型"""
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise openai_error.APIError(f"Invalid response body from API: {body[:200]}", http_body=body, http_status=status) from e
+
+    if status != 200:
+        message = data.get("error", {}).get("message", body) if isinstance(data, dict) else body
+        if status == 429:
+            raise openai_error.RateLimitError(message, http_body=body, http_status=status)
+        if status == 401:
+            raise openai_error.AuthenticationError(message, http_body=body, http_status=status)
+        if status in (400, 404, 409, 422):
+            raise openai_error.InvalidRequestError(message, None, http_body=body, http_status=status)
+        raise openai_error.APIError(message, http_body=body, http_status=status)
+    return data
+
+
+class _BackgroundLoop:
+    """在后台线程运行的事件循环，供同步代码提交协程"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="aium-llm-loop", daemon=True).start()
+            return self._loop
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        return self.submit(coro).result()
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    @property
+    def started(self) -> bool:
+        return self._loop is not None
+
+
+_client: Optional[AsyncChatClient] = None
+_client_lock = threading.Lock()
+_background_loop = _BackgroundLoop()
+
+
+def get_async_client() -> AsyncChatClient:
+    """进程内共享的客户端"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = AsyncChatClient()
+        return _client
+
+
+def configure_async_client(**kwargs) -> AsyncChatClient:
+    """替换共享客户端的配置，例如指向本地桩服务或调整并发上限"""
+    global _client
+    with _client_lock:
+        _client = AsyncChatClient(**kwargs)
+        return _client
+
+
+@atexit.register
+def close_async_client():
+    """关闭共享客户端的连接池，进程退出时自动调用；需要跳过退出处理（os._exit）时由调用方先行调用"""
+    if _client is not None and _background_loop.started:
+        _background_loop.run(_client.close())
+
+
+def create_chat_completion_sync(messages: List[ChatMessage], *_, **kwargs) -> OpenAIObject:
+    """同步包装：在后台事件循环中执行请求，多个线程共享同一个连接池"""
+    return _background_loop.run(get_async_client().create_chat_completion(messages, **kwargs))
+
+
+_STREAM_END = object()
+
+
+def stream_chat_completion_sync(messages: List[ChatMessage], *_, **kwargs) -> Iterator[str]:
+    """
+    同步包装的流式请求：在后台事件循环中接收，在调用方线程中逐段返回内容，
+    调用方提前关闭迭代器（或迭代中抛出异常）时取消请求
+    """
+    chunks: queue.Queue = queue.Queue()
+
+    async def pump():
+        try:
+            async for content in get_async_client().stream_chat_completion(messages, **kwargs):
+                chunks.put(content)
+        except BaseException as e:
+            chunks.put(e)
+            raise
+        chunks.put(_STREAM_END)
+
+    future = _background_loop.submit(pump())
+    try:
+        while True:
+            item = chunks.get()
+            if item is _STREAM_END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        if not future.done():
+            future.cancel()
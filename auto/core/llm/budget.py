@@ -0,0 +1,350 @@
+"""
+Token 与费用账本
+
+记录每次 chat completion 的 token 数与费用（按 ChatModelInfo 的单价），归属到 会话 / Agent / 步骤。
+实际发出请求前（命中缓存的请求不检查）按 prompt token 数 + max_tokens 预估本次最多消耗多少并预留，
+并行的会话之间不会因为先检查后记录而超出上限；会话或整个批次（进程）的 token / 费用将超出上限时，
+按配置改用更便宜的模型或缩小 max_tokens，或者抛出 BudgetExceededError 中止。
+运行结束时输出汇总报告，批量回归时可以据此发现 prompt 变更导致的费用异常。
+"""
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+from auto.core.llm.base import ChatMessage
+from auto.core.tracing import current_session
+from auto.utils.exceptions import BudgetExceededError
+
+logger = logging.getLogger(__name__)
+
+_scope: contextvars.ContextVar[dict[str, Any]] = contextvars.ContextVar("aium_usage_scope", default={})
+
+
+@contextlib.contextmanager
+def usage_scope(**attributes):
+    """
+    在当前上下文中标记用量的归属，例如 with usage_scope(agent="LocationAgent", step="1")
+    """
+    token = _scope.set({**_scope.get(), **attributes})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def completion_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """按模型单价（每 1K tokens）计算费用，未知模型记为 0"""
+    from auto.core.llm.models import OPEN_AI_CHAT_MODELS
+    from auto.core.llm.token_counter import resolve_model
+
+    info = OPEN_AI_CHAT_MODELS.get(resolve_model(model))
+    if info is None:
+        return 0.0
+    return (prompt_tokens * info.prompt_token_cost + completion_tokens * info.completion_token_cost) / 1000
+
+
+@dataclass
+class UsageRecord:
+    session_id: Optional[str]
+    agent: Optional[str]
+    step: Optional[str]
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+    cache_hit: bool
+    created_at: float
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+MIN_COMPLETION_TOKENS = 256
+"""降级时 max_tokens 最少缩小到的值，剩余预算更少时直接中止"""
+
+
+@dataclass
+class Reservation:
+    """admit 为一次请求预留的用量，record 或 release 时归还"""
+
+    session_id: Optional[str]
+    model: str
+    """实际使用的模型"""
+    max_tokens: Optional[int]
+    """实际使用的 max_tokens"""
+    tokens: int = 0
+    cost: float = 0.0
+    released: bool = False
+
+
+@dataclass
+class _Totals:
+    requests: int = 0
+    cache_hits: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, record: UsageRecord):
+        self.requests += 1
+        if record.cache_hit:
+            # 命中缓存的请求不产生费用，也不计入上限
+            self.cache_hits += 1
+            return
+        self.prompt_tokens += record.prompt_tokens
+        self.completion_tokens += record.completion_tokens
+        self.cost += record.cost
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "tokens": self.tokens, "cost": round(self.cost, 6)}
+
+
+class BudgetLedger:
+    """进程内的用量账本"""
+
+    def __init__(
+            self,
+            session_tokens: Optional[int] = None,
+            session_cost: Optional[float] = None,
+            suite_tokens: Optional[int] = None,
+            suite_cost: Optional[float] = None,
+            on_exceed: Literal["abort", "downgrade"] = "abort",
+            downgrade_model: Optional[str] = None,
+    ):
+        """
+        :param session_tokens: 单个会话的 token 上限，None 表示不限制
+        :param session_cost: 单个会话的费用上限（美元）
+        :param suite_tokens: 整个批次（进程）的 token 上限
+        :param suite_cost: 整个批次（进程）的费用上限（美元）
+        :param on_exceed: 将超出上限时的处理方式：abort 中止；downgrade 先尝试改用更便宜的 downgrade_model，
+            仍超出时把 max_tokens 缩小到剩余预算（不少于 MIN_COMPLETION_TOKENS）
+        """
+        self.session_tokens = session_tokens
+        self.session_cost = session_cost
+        self.suite_tokens = suite_tokens
+        self.suite_cost = suite_cost
+        self.on_exceed = on_exceed
+        self.downgrade_model = downgrade_model
+
+        self.records: list[UsageRecord] = []
+        self.downgrades = 0
+        self.rejections = 0
+        self._suite = _Totals()
+        self._sessions: dict[Optional[str], _Totals] = {}
+        self._reserved: dict[Optional[str], list] = {}
+        """各会话已预留、尚未记录的 [tokens, cost]"""
+        self._suite_reserved = [0, 0.0]
+        self._lock = threading.Lock()
+
+    @property
+    def limited(self) -> bool:
+        return any(limit is not None for limit in (self.session_tokens, self.session_cost, self.suite_tokens, self.suite_cost))
+
+    def _usage(self, session_id: Optional[str]) -> tuple[int, float, int, float]:
+        """已用加已预留的 (会话 tokens, 会话费用, 批次 tokens, 批次费用)"""
+        session = self._sessions.get(session_id) or _Totals()
+        reserved = self._reserved.get(session_id) or [0, 0.0]
+        return (session.tokens + reserved[0], session.cost + reserved[1],
+                self._suite.tokens + self._suite_reserved[0], self._suite.cost + self._suite_reserved[1])
+
+    def _exceeded(self, session_id: Optional[str], tokens: int, cost: float) -> Optional[str]:
+        session_tokens, session_cost, suite_tokens, suite_cost = self._usage(session_id)
+        checks = (
+            ("session tokens", self.session_tokens, session_tokens + tokens),
+            ("session cost", self.session_cost, session_cost + cost),
+            ("suite tokens", self.suite_tokens, suite_tokens + tokens),
+            ("suite cost", self.suite_cost, suite_cost + cost),
+        )
+        for name, limit, projected in checks:
+            if limit is not None and projected > limit:
+                return f"{name} limit {limit} would be exceeded (projected {projected:.6g})"
+        return None
+
+    def _completion_room(self, session_id: Optional[str], model: str, prompt_tokens: int) -> Optional[int]:
+        """在剩余预算内最多还能生成多少 completion tokens，None 表示不限制"""
+        session_tokens, session_cost, suite_tokens, suite_cost = self._usage(session_id)
+        prompt_cost = completion_cost(model, prompt_tokens, 0)
+        unit_cost = completion_cost(model, 0, 1000) / 1000
+        rooms = []
+        for limit, used in ((self.session_tokens, session_tokens), (self.suite_tokens, suite_tokens)):
+            if limit is not None:
+                rooms.append(limit - used - prompt_tokens)
+        for limit, used in ((self.session_cost, session_cost), (self.suite_cost, suite_cost)):
+            if limit is not None and unit_cost > 0:
+                rooms.append(int((limit - used - prompt_cost) / unit_cost))
+        return min(rooms) if rooms else None
+
+    def admit(self, messages: list[ChatMessage], model: str, max_tokens: Optional[int] = None) -> Reservation:
+        """
+        实际发出请求前检查预算并预留本次最多的消耗，返回实际使用的模型与 max_tokens；
+        请求结束后必须调用 record（传入该预留）或 release 归还
+        :raises BudgetExceededError: 按最大可能消耗计算会超出上限，且无法通过降级避免
+        """
+        session_id = current_session()
+        if not self.limited:
+            return Reservation(session_id, model, max_tokens)
+        from auto.core.llm.token_counter import count_messages_tokens
+
+        prompt_tokens = count_messages_tokens(messages, model)
+        with self._lock:
+            reason = self._exceeded(
+                session_id, prompt_tokens + (max_tokens or 0), completion_cost(model, prompt_tokens, max_tokens or 0)
+            )
+            if reason is None:
+                return self._reserve(session_id, model, max_tokens, prompt_tokens)
+            if self.on_exceed == "downgrade":
+                candidates = [model]
+                if self.downgrade_model and self.downgrade_model != model and (
+                        completion_cost(self.downgrade_model, prompt_tokens, max_tokens or 0)
+                        < completion_cost(model, prompt_tokens, max_tokens or 0)):
+                    candidates.insert(0, self.downgrade_model)
+                for candidate in candidates:
+                    room = self._completion_room(session_id, candidate, prompt_tokens)
+                    limit = max_tokens if room is None else min(room, max_tokens or room)
+                    if limit is not None and limit < min(MIN_COMPLETION_TOKENS, max_tokens or MIN_COMPLETION_TOKENS):
+                        continue
+                    self.downgrades += 1
+                    logger.warning(f"Budget: {reason}, downgrading {model} to {candidate} with max_tokens={limit}")
+                    return self._reserve(session_id, candidate, limit, prompt_tokens)
+            self.rejections += 1
+        raise BudgetExceededError(f"LLM budget exhausted for session {session_id}: {reason}")
+
+    def _reserve(self, session_id: Optional[str], model: str, max_tokens: Optional[int],
+                 prompt_tokens: int) -> Reservation:
+        reservation = Reservation(session_id, model, max_tokens, prompt_tokens + (max_tokens or 0),
+                                  completion_cost(model, prompt_tokens, max_tokens or 0))
+        reserved = self._reserved.setdefault(session_id, [0, 0.0])
+        for totals in (reserved, self._suite_reserved):
+            totals[0] += reservation.tokens
+            totals[1] += reservation.cost
+        return reservation
+
+    def release(self, reservation: Optional[Reservation]):
+        """归还预留的用量（请求失败，或已由 record 记录实际用量）"""
+        if reservation is None:
+            return
+        with self._lock:
+            self._release(reservation)
+
+    def _release(self, reservation: Reservation):
+        if reservation.released:
+            return
+        reservation.released = True
+        reserved = self._reserved.get(reservation.session_id)
+        for totals in (reserved, self._suite_reserved):
+            if totals is not None:
+                totals[0] -= reservation.tokens
+                totals[1] -= reservation.cost
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int, cache_hit: bool = False,
+               reservation: Optional[Reservation] = None) -> UsageRecord:
+        scope = _scope.get()
+        record = UsageRecord(
+            session_id=current_session(),
+            agent=scope.get("agent"),
+            step=scope.get("step"),
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=0.0 if cache_hit else completion_cost(model, prompt_tokens, completion_tokens),
+            cache_hit=cache_hit,
+            created_at=time.time(),
+        )
+        with self._lock:
+            # 记录实际用量与归还预留在同一把锁内完成
+            if reservation is not None:
+                self._release(reservation)
+            self.records.append(record)
+            self._suite.add(record)
+            self._sessions.setdefault(record.session_id, _Totals()).add(record)
+        return record
+
+    def session_totals(self, session_id: Optional[str]) -> dict[str, Any]:
+        with self._lock:
+            return (self._sessions.get(session_id) or _Totals()).to_dict()
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            records = list(self.records)
+            suite = self._suite.to_dict()
+            sessions = {str(k): v.to_dict() for k, v in self._sessions.items()}
+
+        grouped: dict[str, dict[str, _Totals]] = {"agents": {}, "steps": {}, "models": {}}
+        for record in records:
+            grouped["agents"].setdefault(record.agent or "-", _Totals()).add(record)
+            grouped["steps"].setdefault(f"{record.session_id}/{record.step or '-'}", _Totals()).add(record)
+            grouped["models"].setdefault(record.model, _Totals()).add(record)
+
+        costs = sorted(session["cost"] for session in sessions.values())
+        return {
+            "suite": suite,
+            "limits": {
+                "session_tokens": self.session_tokens,
+                "session_cost": self.session_cost,
+                "suite_tokens": self.suite_tokens,
+                "suite_cost": self.suite_cost,
+                "on_exceed": self.on_exceed,
+            },
+            "downgrades": self.downgrades,
+            "rejections": self.rejections,
+            "session_cost_avg": sum(costs) / len(costs) if costs else 0.0,
+            "session_cost_max": costs[-1] if costs else 0.0,
+            "sessions": sessions,
+            **{name: {k: v.to_dict() for k, v in group.items()} for name, group in grouped.items()},
+        }
+
+    def report(self) -> str:
+        summary = self.summary()
+        suite = summary["suite"]
+        lines = [
+            f"LLM用量：请求 {suite['requests']} 次（命中缓存 {suite['cache_hits']} 次），"
+            f"prompt {suite['prompt_tokens']} / completion {suite['completion_tokens']} tokens，"
+            f"费用 ${suite['cost']:.4f}，会话平均 ${summary['session_cost_avg']:.4f} / 最高 ${summary['session_cost_max']:.4f}"
+        ]
+        for agent, totals in sorted(summary["agents"].items(), key=lambda item: item[1]["cost"], reverse=True):
+            lines.append(f"  {agent}: {totals['requests']} 次，{totals['tokens']} tokens，${totals['cost']:.4f}")
+        if summary["downgrades"] or summary["rejections"]:
+            lines.append(f"  预算限制：降级 {summary['downgrades']} 次，拒绝 {summary['rejections']} 次")
+        return "\n".join(lines)
+
+    def export(self, path: str):
+        """把汇总与每次请求的明细写入 JSON 文件"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            records = [asdict(record) for record in self.records]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({**self.summary(), "records": records}, f, ensure_ascii=False, indent=2)
+
+
+_LIMIT_OPTIONS = ("session_tokens", "session_cost", "suite_tokens", "suite_cost", "on_exceed", "downgrade_model")
+
+_ledger = BudgetLedger()
+_ledger_lock = threading.Lock()
+
+
+def get_budget_ledger() -> BudgetLedger:
+    """进程内共享的账本"""
+    return _ledger
+
+
+def configure_budget_ledger(**limits) -> BudgetLedger:
+    """设置上限与超出时的处理方式，已记录的用量保留"""
+    with _ledger_lock:
+        for name, value in limits.items():
+            if name not in _LIMIT_OPTIONS:
+                raise TypeError(f"Unknown budget option '{name}'")
+            setattr(_ledger, name, value)
+        return _ledger
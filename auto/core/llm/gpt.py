@@ -1,93 +1,174 @@
 import json
 import os
-from typing import List
+import time
+import uuid
+from typing import Callable, Iterator, List, Optional
 
 import openai
 from openai.openai_object import OpenAIObject
+from openai.util import convert_to_openai_object
 
-from auto.core.llm.base import ChatMessage, ChatModelInfo
-from dotenv import load_dotenv
+from auto.core.llm.async_client import create_chat_completion_sync, stream_chat_completion_sync
+from auto.core.llm.base import ChatMessage
+from auto.core.llm.budget import Reservation, get_budget_ledger
+from auto.core.llm.models import OPEN_AI_CHAT_MODELS, chat_model_mapping
+from auto.core.llm.response_cache import get_response_cache
+from auto.core.tracing import NOOP_SPAN, Span, get_tracer
+from auto.utils.env import load_env
 
-load_dotenv()
+load_env()
 openai.api_key = os.getenv("OPENAI_API_KEY")
+openai.api_base = os.getenv("OPENAI_API_BASE") or openai.api_base
 
-OPEN_AI_CHAT_MODELS = {
-    info.name: info
-    for info in [
-        ChatModelInfo(
-            name="gpt-3.5-turbo-0301",
-            prompt_token_cost=0.0015,
-            completion_token_cost=0.002,
-            max_tokens=4096,
-        ),
-        ChatModelInfo(
-            name="gpt-3.5-turbo-0613",
-            prompt_token_cost=0.0015,
-            completion_token_cost=0.002,
-            max_tokens=4096,
-            supports_functions=True,
-        ),
-        ChatModelInfo(
-            name="gpt-3.5-turbo-16k-0613",
-            prompt_token_cost=0.003,
-            completion_token_cost=0.004,
-            max_tokens=16384,
-            supports_functions=True,
-        ),
-        ChatModelInfo(
-            name="gpt-4-0314",
-            prompt_token_cost=0.03,
-            completion_token_cost=0.06,
-            max_tokens=8192,
-        ),
-        ChatModelInfo(
-            name="gpt-4-0613",
-            prompt_token_cost=0.03,
-            completion_token_cost=0.06,
-            max_tokens=8191,
-            supports_functions=True,
-        ),
-        ChatModelInfo(
-            name="gpt-4-32k-0314",
-            prompt_token_cost=0.06,
-            completion_token_cost=0.12,
-            max_tokens=32768,
-        ),
-        ChatModelInfo(
-            name="gpt-4-32k-0613",
-            prompt_token_cost=0.06,
-            completion_token_cost=0.12,
-            max_tokens=32768,
-            supports_functions=True,
-        ),
-    ]
-}
-# Set aliases for rolling model IDs
-chat_model_mapping = {
-    "gpt-3.5-turbo": "gpt-3.5-turbo-0613",
-    "gpt-3.5-turbo-16k": "gpt-3.5-turbo-16k-0613",
-    "gpt-4": "gpt-4-0613",
-    "gpt-4-32k": "gpt-4-32k-0613",
-}
+# async：共享连接池的异步客户端；openai：直接使用 openai.ChatCompletion.create
+LLM_CLIENT = os.getenv("AIUM_LLM_CLIENT", "async")
 
 def create_chat_completion(
     messages: List[ChatMessage],
     *_,
+    cache_pending: Optional[List[str]] = None,
     **kwargs,
 ) -> OpenAIObject:
     """Create a chat completion using the OpenAI API
 
     Args:
         messages: A list of messages to feed to the chatbot.
+        cache_pending: If given, a fresh response is only cached after the caller commits its key (see ResponseCache).
         kwargs: Other arguments to pass to the OpenAI API chat completion call.
     Returns:
         OpenAIObject: The ChatCompletion response from OpenAI
 
     """
-    completion: OpenAIObject = openai.ChatCompletion.create(
-        messages=messages,
-        **kwargs,
+    reservation: Optional[Reservation] = None
+
+    def create() -> OpenAIObject:
+        nonlocal reservation
+        reservation = _admit(messages, kwargs)
+        try:
+            if LLM_CLIENT == "async":
+                return create_chat_completion_sync(messages, **kwargs)
+            return openai.ChatCompletion.create(
+                messages=messages,
+                **kwargs,
+            )
+        except BaseException:
+            get_budget_ledger().release(reservation)
+            raise
+
+    with get_tracer().span("llm.chat_completion", model=kwargs.get("model")) as span:
+        completion: OpenAIObject = get_response_cache().fetch(messages, kwargs, create, cache_pending)
+        _record_usage(span, messages, kwargs.get("model"), completion, reservation)
+    return completion
+
+
+def _admit(messages: List[ChatMessage], kwargs: dict) -> Reservation:
+    """只对实际发出的请求检查预算，命中缓存与 replay 不受限制；降级时改写 kwargs 中的模型与 max_tokens"""
+    reservation = get_budget_ledger().admit(messages, kwargs.get("model"), kwargs.get("max_tokens"))
+    kwargs["model"] = reservation.model
+    if reservation.max_tokens is not None:
+        kwargs["max_tokens"] = reservation.max_tokens
+    return reservation
+
+
+def _record_usage(span: Span, messages: List[ChatMessage], model: str, completion: OpenAIObject,
+                  reservation: Optional[Reservation]):
+    """把 token 数与费用记入账本和 span（没有预留即命中缓存），流式响应没有 usage 时按消息内容计数"""
+    from auto.core.llm.token_counter import count_messages_tokens, count_string_tokens
+
+    usage = completion.get("usage")
+    if usage:
+        prompt_tokens, completion_tokens = usage["prompt_tokens"], usage["completion_tokens"]
+    else:
+        prompt_tokens = count_messages_tokens(messages, model)
+        completion_tokens = count_string_tokens(completion.choices[0].message.content or "", model)
+
+    cache_hit = reservation is None
+    record = get_budget_ledger().record(model, prompt_tokens, completion_tokens, cache_hit, reservation)
+    if span is not NOOP_SPAN:
+        span.set(model=model, cache_hit=cache_hit, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, cost=record.cost)
+
+
+def _record_aborted(messages: List[ChatMessage], model: str, content: str, reservation: Reservation):
+    """中途取消的流式请求没有 usage，按已发送的消息与已收到的内容计数记入账本"""
+    from auto.core.llm.token_counter import count_messages_tokens, count_string_tokens
+
+    get_budget_ledger().record(
+        model, count_messages_tokens(messages, model), count_string_tokens(content, model), reservation=reservation
     )
+
+
+def _stream_contents(messages: List[ChatMessage], **kwargs) -> Iterator[str]:
+    if LLM_CLIENT == "async":
+        yield from stream_chat_completion_sync(messages, **kwargs)
+        return
+    chunks = openai.ChatCompletion.create(messages=messages, stream=True, **kwargs)
+    try:
+        for chunk in chunks:
+            for choice in chunk.choices:
+                content = choice.get("delta", {}).get("content")
+                if content:
+                    yield content
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def create_chat_completion_stream(
+    messages: List[ChatMessage],
+    on_delta: Callable[[str], None],
+    *_,
+    cache_pending: Optional[List[str]] = None,
+    **kwargs,
+) -> OpenAIObject:
+    """Create a chat completion with stream=True
+
+    Args:
+        messages: A list of messages to feed to the chatbot.
+        on_delta: Called with each piece of content as it arrives. Raising from it cancels the request.
+        cache_pending: If given, a fresh response is only cached after the caller commits its key (see ResponseCache).
+        kwargs: Other arguments to pass to the OpenAI API chat completion call.
+    Returns:
+        OpenAIObject: The assembled response, same shape as create_chat_completion
+    """
+    reservation: Optional[Reservation] = None
+
+    def create() -> OpenAIObject:
+        nonlocal reservation
+        reservation = _admit(messages, kwargs)
+        contents = []
+        deltas = _stream_contents(messages, **kwargs)
+        try:
+            for delta in deltas:
+                contents.append(delta)
+                on_delta(delta)
+        except BaseException:
+            if contents:
+                # 已经开始返回内容（例如 on_delta 提前中止格式错误的回复）：prompt 与已生成的部分同样计费
+                _record_aborted(messages, kwargs.get("model"), "".join(contents), reservation)
+            else:
+                get_budget_ledger().release(reservation)
+            raise
+        finally:
+            deltas.close()
+        return convert_to_openai_object({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": kwargs.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(contents)},
+                "finish_reason": "stop",
+            }],
+        })
+
+    with get_tracer().span("llm.chat_completion", model=kwargs.get("model"), stream=True) as span:
+        # 流式与非流式请求共用缓存：stream 参数不进入缓存键，命中时整段内容一次性交给 on_delta
+        completion: OpenAIObject = get_response_cache().fetch(messages, kwargs, create, cache_pending)
+        _record_usage(span, messages, kwargs.get("model"), completion, reservation)
+        if reservation is None:
+            on_delta(completion.choices[0].message.content or "")
     return completion
 
 
@@ -0,0 +1,63 @@
+"""
+对话模型的单价与上下文长度，token 计数与费用计算只依赖这里，不需要导入 openai
+"""
+from auto.core.llm.base import ChatModelInfo
+
+OPEN_AI_CHAT_MODELS = {
+    info.name: info
+    for info in [
+        ChatModelInfo(
+            name="gpt-3.5-turbo-0301",
+            prompt_token_cost=0.0015,
+            completion_token_cost=0.002,
+            max_tokens=4096,
+        ),
+        ChatModelInfo(
+            name="gpt-3.5-turbo-0613",
+            prompt_token_cost=0.0015,
+            completion_token_cost=0.002,
+            max_tokens=4096,
+            supports_functions=True,
+        ),
+        ChatModelInfo(
+            name="gpt-3.5-turbo-16k-0613",
+            prompt_token_cost=0.003,
+            completion_token_cost=0.004,
+            max_tokens=16384,
+            supports_functions=True,
+        ),
+        ChatModelInfo(
+            name="gpt-4-0314",
+            prompt_token_cost=0.03,
+            completion_token_cost=0.06,
+            max_tokens=8192,
+        ),
+        ChatModelInfo(
+            name="gpt-4-0613",
+            prompt_token_cost=0.03,
+            completion_token_cost=0.06,
+            max_tokens=8191,
+            supports_functions=True,
+        ),
+        ChatModelInfo(
+            name="gpt-4-32k-0314",
+            prompt_token_cost=0.06,
+            completion_token_cost=0.12,
+            max_tokens=32768,
+        ),
+        ChatModelInfo(
+            name="gpt-4-32k-0613",
+            prompt_token_cost=0.06,
+            completion_token_cost=0.12,
+            max_tokens=32768,
+            supports_functions=True,
+        ),
+    ]
+}
+# Set aliases for rolling model IDs
+chat_model_mapping = {
+    "gpt-3.5-turbo": "gpt-3.5-turbo-0613",
+    "gpt-3.5-turbo-16k": "gpt-3.5-turbo-16k-0613",
+    "gpt-4": "gpt-4-0613",
+    "gpt-4-32k": "gpt-4-32k-0613",
+}
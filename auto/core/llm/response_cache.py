@@ -0,0 +1,207 @@
+"""
+LLM 响应缓存
+
+以 模型 + 消息 + 其他请求参数 的哈希为键缓存 chat completion 的响应，按总大小淘汰最久未使用的条目。
+通过环境变量 AIUM_LLM_CACHE 选择模式：
+    on      命中则直接返回，未命中请求接口并缓存（仅缓存 temperature 为 0 的请求）；
+            调用方传入 pending 时新响应先暂存在内存中，校验通过后由调用方 commit，校验失败则 discard，避免缓存无效的响应
+    record  总是请求接口，并记录（覆盖）响应
+    replay  只从已记录的响应返回，未命中直接报错，无需网络即可复现完整执行过程
+    off     不使用缓存
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import orjson
+from openai.openai_object import OpenAIObject
+from openai.util import convert_to_openai_object
+
+from auto.utils.env import load_env
+from auto.utils.exceptions import LLMCacheMissError
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ("on", "record", "replay", "off")
+
+# 不影响响应内容的请求参数不参与计算缓存键
+_IGNORED_KWARGS = ("request_timeout",)
+
+
+class ResponseCache:
+    """基于内容寻址的 chat completion 响应缓存"""
+
+    def __init__(self, cache_path: str = "cache_data/llm", max_bytes: int = 256 * 1024 * 1024, mode: str = "on"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode '{mode}', expected one of {CACHE_MODES}")
+        self.mode = mode
+        self.cache_path = Path(cache_path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.tokens_saved = 0
+        self.evictions = 0
+
+        self._uncommitted: dict[str, dict] = {}
+        """等待调用方校验的响应"""
+
+        self._total_bytes = 0
+        if self.mode != "off":
+            self.cache_path.mkdir(parents=True, exist_ok=True)
+            self._total_bytes = sum(f.stat().st_size for f in self.cache_path.glob("*/*.json"))
+
+    @staticmethod
+    def make_key(messages: list, kwargs: dict[str, Any]) -> str:
+        kwargs = {k: v for k, v in kwargs.items() if k not in _IGNORED_KWARGS}
+        payload = orjson.dumps({"messages": messages, **kwargs}, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(payload).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_path / key[:2] / f"{key}.json"
+
+    def cacheable(self, kwargs: dict[str, Any]) -> bool:
+        if self.mode in ("record", "replay"):
+            return True
+        return self.mode == "on" and kwargs.get("temperature", 1) == 0
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        response = orjson.loads(raw)
+        # 更新访问时间，淘汰时按最久未使用的顺序删除
+        os.utime(path, None)
+        usage = response.get("usage") or {}
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(raw)
+            self.tokens_saved += usage.get("total_tokens") or len(raw) // 4
+        return response
+
+    def put(self, key: str, response: dict):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        raw = orjson.dumps(response)
+        previous = path.stat().st_size if path.exists() else 0
+
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(raw)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total_bytes += len(raw) - previous
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def evict(self):
+        """删除最久未使用的条目，直到总大小回到上限的 90% 以下"""
+        files = sorted(self.cache_path.glob("*/*.json"), key=lambda f: f.stat().st_mtime)
+        with self._lock:
+            for file in files:
+                if self._total_bytes <= self.max_bytes * 0.9:
+                    break
+                try:
+                    size = file.stat().st_size
+                    file.unlink()
+                except FileNotFoundError:
+                    continue
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def fetch(self, messages: list, kwargs: dict[str, Any], create: Callable[[], OpenAIObject],
+              pending: Optional[list[str]] = None) -> OpenAIObject:
+        """
+        按当前模式返回缓存的响应，或调用 create 请求接口
+        :param pending: on 模式下新请求到的响应不立即写入缓存，缓存键追加到该列表，由调用方 commit 或 discard；
+            record 模式总是立即记录，保证 replay 能复现包括无效响应在内的完整过程
+        """
+        if not self.cacheable(kwargs):
+            return create()
+
+        key = self.make_key(messages, kwargs)
+        if self.mode != "record":
+            cached = self.get(key)
+            if cached is not None:
+                return convert_to_openai_object(cached)
+            if self.mode == "replay":
+                raise LLMCacheMissError(
+                    f"No recorded response for request {key[:12]} (model={kwargs.get('model')}) in replay mode"
+                )
+
+        completion = create()
+        # create 可能改写请求参数（预算降级改用其他模型），按实际请求的参数写入缓存
+        key = self.make_key(messages, kwargs)
+        if pending is not None and self.mode == "on":
+            with self._lock:
+                self._uncommitted[key] = completion.to_dict_recursive()
+            pending.append(key)
+        else:
+            self.put(key, completion.to_dict_recursive())
+        return completion
+
+    def commit(self, keys: list[str]):
+        """响应通过校验，写入缓存"""
+        for key in keys:
+            with self._lock:
+                response = self._uncommitted.pop(key, None)
+            if response is not None:
+                self.put(key, response)
+
+    def discard(self, keys: list[str]):
+        """响应未通过校验，丢弃暂存的响应，下次重新请求接口"""
+        with self._lock:
+            for key in keys:
+                self._uncommitted.pop(key, None)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "mode": self.mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "tokens_saved": self.tokens_saved,
+                "evictions": self.evictions,
+                "size_bytes": self._total_bytes,
+            }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (
+            f"LLM缓存（{stats['mode']}）：命中 {stats['hits']} 次，未命中 {stats['misses']} 次，"
+            f"命中率 {stats['hit_rate']:.0%}，节省 {stats['bytes_saved'] / 1024:.1f} KB / 约 {stats['tokens_saved']} tokens"
+        )
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """进程内共享的响应缓存，配置来自环境变量"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            load_env()
+            _cache = ResponseCache(
+                cache_path=os.getenv("AIUM_LLM_CACHE_PATH", "cache_data/llm"),
+                max_bytes=int(os.getenv("AIUM_LLM_CACHE_MAX_MB", "256")) * 1024 * 1024,
+                mode=os.getenv("AIUM_LLM_CACHE", "on"),
+            )
+        return _cache
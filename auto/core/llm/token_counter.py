@@ -0,0 +1,106 @@
+"""
+Token 计数
+
+优先使用 tiktoken 按模型的编码计数，tiktoken 未安装或无法加载编码文件（例如离线环境）时退化为字符数估算。
+单条消息的计数结果会被缓存，重复组装上下文时不会反复编码同一条消息。
+"""
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from auto.core.llm.base import ChatMessage
+from auto.core.llm.models import OPEN_AI_CHAT_MODELS, chat_model_mapping
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT_WINDOW = 4096
+
+
+def resolve_model(model: str) -> str:
+    """把 gpt-3.5-turbo 一类滚动更新的模型名映射为具体版本"""
+    return chat_model_mapping.get(model, model)
+
+
+def context_window(model: str) -> int:
+    """模型的上下文长度（prompt + completion）"""
+    info = OPEN_AI_CHAT_MODELS.get(resolve_model(model))
+    return info.max_tokens if info is not None else DEFAULT_CONTEXT_WINDOW
+
+
+@lru_cache(maxsize=None)
+def _load_encoding(name: str):
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except ImportError:
+        logger.warning("tiktoken is not installed, token counts are estimated")
+    except Exception as e:
+        # 编码文件需要联网下载
+        logger.warning(f"Could not load tiktoken encoding {name}, token counts are estimated: {e}")
+    return None
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    try:
+        import tiktoken
+        name = tiktoken.encoding_name_for_model(model)
+    except ImportError:
+        name = "cl100k_base"
+    except (KeyError, AttributeError):
+        # 未知模型以及旧版本 tiktoken 都按 gpt-3.5 / gpt-4 的编码处理
+        name = "cl100k_base"
+    return _load_encoding(name)
+
+
+def estimate_tokens(text: str) -> int:
+    """无法使用 tiktoken 时的估算：ASCII 约 4 个字符一个 token，其他字符各算一个"""
+    ascii_chars = sum(1 for c in text if c < "\x80")
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """统计字符串的 token 数，不缓存结果，用于页面源码、页面片段等一次性的长文本"""
+    if not text:
+        return 0
+    encoding = _get_encoding(resolve_model(model))
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text))
+
+
+@lru_cache(maxsize=8192)
+def count_string_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """统计字符串的 token 数，结果按 (文本, 模型) 缓存"""
+    return count_tokens(text, model)
+
+
+def count_message_tokens(message: ChatMessage, model: str = "gpt-3.5-turbo") -> int:
+    """单条消息占用的 token 数，包含消息格式本身的开销"""
+    model = resolve_model(model)
+    # https://github.com/openai/openai-cookbook/blob/main/examples/How_to_count_tokens_with_tiktoken.ipynb
+    tokens_per_message, tokens_per_name = (4, -1) if model == "gpt-3.5-turbo-0301" else (3, 1)
+    tokens = tokens_per_message
+    for key, value in message.items():
+        if isinstance(value, str):
+            tokens += count_string_tokens(value, model)
+        if key == "name":
+            tokens += tokens_per_name
+    return tokens
+
+
+def count_messages_tokens(messages: Iterable[ChatMessage], model: str = "gpt-3.5-turbo") -> int:
+    """一组消息作为 prompt 时的 token 数（含回复的起始标记）"""
+    return sum(count_message_tokens(message, model) for message in messages) + 3
+
+
+def prompt_budget(model: str, completion_tokens: int, reserved: Optional[Iterable[ChatMessage]] = None) -> int:
+    """
+    可用于历史消息的 token 数：上下文长度 - 预留给回复的 token - 必须发送的消息（例如 system prompt）
+    """
+    budget = context_window(model) - completion_tokens - 3
+    if reserved:
+        budget -= sum(count_message_tokens(message, model) for message in reserved)
+    return budget
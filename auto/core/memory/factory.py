@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from auto.core.memory.base import MemoryProvider
+from auto.core.memory.json_file import JSONFileMemory
+from auto.core.memory.jsonl_journal import JSONLJournalMemory
+from auto.core.memory.sqlite import SQLiteMemory
+
+if TYPE_CHECKING:
+    from auto.config import Config
+
+
+def create_memory(config: Config, global_id: str, prefix: str = "default") -> MemoryProvider:
+    """
+    按配置的存储后端创建 Agent 的上下文存储
+    """
+    if config.memory_backend == "sqlite":
+        return SQLiteMemory(global_id, prefix, config.memory_path, batch_size=config.memory_batch_size)
+    if config.memory_backend == "jsonl":
+        return JSONLJournalMemory(global_id, prefix, config.memory_path, fsync_every=config.memory_fsync_every)
+    return JSONFileMemory(global_id, prefix, config.memory_path)
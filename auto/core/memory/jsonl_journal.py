@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Iterator, Optional
+
+import orjson
+
+from auto.core.llm.base import ChatMessage
+from auto.core.memory.base import MemoryProvider
+
+logger = logging.getLogger(__name__)
+
+
+class JSONLJournalMemory(MemoryProvider):
+    """
+    追加写的 JSON-lines 日志存储
+
+    每次变更只在 {prefix}_context.jsonl 末尾追加一行操作记录（add / head_add / clear），
+    而不是像 JSONFileMemory 那样每条消息都重写整个文件；进程在写入过程中崩溃最多损坏最后一行。
+    历史记录在第一次读取时才加载，操作记录远多于有效消息时重写文件进行压缩。
+    """
+
+    SAVE_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SERIALIZE_DATACLASS
+
+    file_path: Path
+
+    def __init__(
+            self,
+            global_id: str,
+            prefix: str = "default",
+            memory_path: str = "memory_data",
+            fsync_every: int = 0,
+            compact_min_ops: int = 256,
+    ) -> None:
+        """
+        :param fsync_every: 每追加多少条记录执行一次 fsync，0 表示只刷新到操作系统缓冲区
+        :param compact_min_ops: 日志至少包含多少条记录时才考虑压缩
+        """
+        session_path = Path(memory_path) / global_id
+        session_path.mkdir(parents=True, exist_ok=True)
+
+        self.file_path = session_path / f"{prefix}_context.jsonl"
+        self.legacy_path = session_path / f"{prefix}_context.json"
+        """JSONFileMemory 的文件，首次加载时迁移"""
+        self.fsync_every = fsync_every
+        self.compact_min_ops = compact_min_ops
+
+        self._memories: Optional[list[ChatMessage]] = None
+        """已加载的消息，None 表示尚未加载"""
+        self._ops = 0
+        """日志中的记录数，加载后才准确"""
+        self._unsynced = 0
+        self._tail_checked = False
+        self._lock = threading.RLock()
+        logger.debug(f"Initialized {__class__.__name__} with journal path {self.file_path}")
+
+    @property
+    def memories(self) -> list[ChatMessage]:
+        with self._lock:
+            if self._memories is None:
+                self.load_index()
+            return self._memories
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        return iter(self.memories)
+
+    def __contains__(self, x: ChatMessage) -> bool:
+        return x in self.memories
+
+    def __len__(self) -> int:
+        return len(self.memories)
+
+    def head_add(self, item: ChatMessage):
+        """
+        头插入，尚未加载历史记录时不触发加载，返回 None
+        """
+        with self._lock:
+            self._before_write()
+            if self._memories is not None:
+                self._memories.insert(0, item)
+            self._append({"op": "head_add", "m": item})
+            return len(self._memories) if self._memories is not None else None
+
+    def add(self, item: ChatMessage):
+        """
+        追加，尚未加载历史记录时不触发加载，返回 None
+        """
+        with self._lock:
+            self._before_write()
+            if self._memories is not None:
+                self._memories.append(item)
+            self._append({"op": "add", "m": item})
+            return len(self._memories) if self._memories is not None else None
+
+    def discard(self, item: ChatMessage):
+        try:
+            self.remove(item)
+        except:
+            pass
+
+    def clear(self):
+        """Clears the data in memory."""
+        with self._lock:
+            self._before_write()
+            self._memories = []
+            self._append({"op": "clear"})
+
+    def load_index(self):
+        """回放日志得到当前的消息列表，忽略崩溃时写了一半的记录"""
+        with self._lock:
+            if not self.file_path.exists() and self.legacy_path.is_file():
+                self._migrate_legacy()
+                return
+
+            memories: list[ChatMessage] = []
+            ops = 0
+            if self.file_path.is_file():
+                with self.file_path.open("rb") as f:
+                    for line_number, line in enumerate(f, 1):
+                        if not line.strip():
+                            continue
+                        try:
+                            record = orjson.loads(line)
+                        except orjson.JSONDecodeError:
+                            logger.warning(f"Skipping corrupt record at {self.file_path}:{line_number}")
+                            continue
+                        ops += 1
+                        op = record.get("op")
+                        if op == "add":
+                            memories.append(ChatMessage(**record["m"]))
+                        elif op == "head_add":
+                            memories.insert(0, ChatMessage(**record["m"]))
+                        elif op == "clear":
+                            memories.clear()
+            self._memories = memories
+            self._ops = ops
+            logger.debug(f"Loaded {len(memories)} MemoryItems from {ops} journal records")
+
+    def _migrate_legacy(self):
+        try:
+            self._memories = [ChatMessage(**item) for item in orjson.loads(self.legacy_path.read_bytes() or b"[]")]
+        except Exception as e:
+            logger.warning(f"Could not load legacy memory file {self.legacy_path}: {e}")
+            self._memories = []
+        self.compact()
+
+    def _before_write(self):
+        if self._memories is None and not self.file_path.exists() and self.legacy_path.is_file():
+            # 先迁移旧文件，避免新建的日志遮盖旧的历史记录
+            self.load_index()
+
+    def _append(self, record: dict):
+        with self.file_path.open("ab") as f:
+            if not self._tail_checked:
+                # 上次写入可能中断，另起一行避免与残缺记录拼接
+                if f.tell() > 0 and not self._ends_with_newline():
+                    f.write(b"\n")
+                self._tail_checked = True
+            f.write(orjson.dumps(record, option=self.SAVE_OPTIONS) + b"\n")
+            f.flush()
+            self._unsynced += 1
+            if self.fsync_every and self._unsynced >= self.fsync_every:
+                os.fsync(f.fileno())
+                self._unsynced = 0
+        self._ops += 1
+
+        if self._memories is not None and self._ops >= self.compact_min_ops and self._ops > 2 * len(self._memories):
+            self.compact()
+
+    def _ends_with_newline(self) -> bool:
+        with self.file_path.open("rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def compact(self):
+        """把日志重写为只包含当前消息的 add 记录"""
+        with self._lock:
+            memories = self.memories
+            tmp_path = self.file_path.with_suffix(".jsonl.tmp")
+            with tmp_path.open("wb") as f:
+                f.writelines(orjson.dumps({"op": "add", "m": item}, option=self.SAVE_OPTIONS) + b"\n"
+                             for item in memories)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.file_path)
+            self._ops = len(memories)
+            self._unsynced = 0
+
+    def flush(self):
+        """确保已追加的记录落盘"""
+        with self._lock:
+            if self._unsynced and self.file_path.exists():
+                with self.file_path.open("rb") as f:
+                    os.fsync(f.fileno())
+                self._unsynced = 0
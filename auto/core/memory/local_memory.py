@@ -1,8 +1,24 @@
-from typing import Iterator
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
 
 from auto.core.llm.base import ChatMessage
+from auto.core.llm.token_counter import count_message_tokens, prompt_budget
 from auto.core.memory.base import MemoryProvider
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ContextReport:
+    """最近一次组装上下文的结果"""
+
+    kept: int
+    dropped: int
+    tokens: int
+    dropped_tokens: int
+    budget: int
+
 
 class LocalMemory(MemoryProvider):
     """ 临时存储 """
@@ -10,11 +26,37 @@ class LocalMemory(MemoryProvider):
 
     def __init__(self):
         self.memories = []
+        self.last_report: Optional[ContextReport] = None
+
+    def get_memories(
+            self,
+            model: str = "gpt-3.5-turbo",
+            completion_tokens: int = 0,
+            reserved: Iterable[ChatMessage] = (),
+    ) -> list[ChatMessage]:
+        """
+        按 token 预算从最新的消息开始往前选取上下文，保持原有顺序返回
+        :param model: 请求使用的模型，决定上下文长度与计数方式
+        :param completion_tokens: 预留给回复的 token 数，即请求的 max_tokens
+        :param reserved: 调用方还会加入请求的消息（例如 system prompt），同样占用预算
+        """
+        budget = prompt_budget(model, completion_tokens, reserved)
+        used = 0
+        start = len(self.memories)
+        for message in reversed(self.memories):
+            tokens = count_message_tokens(message, model)
+            if used + tokens > budget:
+                break
+            used += tokens
+            start -= 1
 
-    def get_memories(self):
-        # TODO 限制长度当前只限制10条
-        # 返回self.memories中的最后10条记录
-        return list(self.memories[-10:])
+        dropped_tokens = sum(count_message_tokens(message, model) for message in self.memories[:start])
+        self.last_report = ContextReport(len(self.memories) - start, start, used, dropped_tokens, budget)
+        if start:
+            print(f"【Aium】上下文超出预算（{budget} tokens），丢弃最早的 {start} 条消息，约 {dropped_tokens} tokens")
+        else:
+            logger.debug(f"Context uses {used}/{budget} tokens with {len(self.memories)} messages")
+        return list(self.memories[start:])
 
     def __iter__(self) -> Iterator[ChatMessage]:
         return iter(self.memories)
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+import weakref
+from pathlib import Path
+from typing import Iterator, Optional
+
+from auto.core.llm.base import ChatMessage
+from auto.core.memory.base import MemoryProvider
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_NAME = "memory.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session_agent_seq ON messages (session_id, agent, seq);
+CREATE INDEX IF NOT EXISTS idx_messages_agent_created_at ON messages (agent, created_at);
+CREATE INDEX IF NOT EXISTS idx_messages_created_at ON messages (created_at);
+"""
+
+_connections: dict[str, tuple[sqlite3.Connection, threading.RLock]] = {}
+_connections_lock = threading.Lock()
+_instances: "weakref.WeakValueDictionary[int, SQLiteMemory]" = weakref.WeakValueDictionary()
+"""用于跨会话查询前写入缓冲的消息，MemoryProvider 不可哈希，按 id 记录"""
+
+
+def get_connection(db_path: str) -> tuple[sqlite3.Connection, threading.RLock]:
+    """进程内每个数据库文件共享一个连接，写入通过锁串行"""
+    key = str(Path(db_path).resolve())
+    with _connections_lock:
+        if key not in _connections:
+            Path(key).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(key, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            _connections[key] = (connection, threading.RLock())
+        return _connections[key]
+
+
+def _write_rows(connection: sqlite3.Connection, lock: threading.RLock, pending: list[tuple]):
+    """把缓冲的消息在一个事务中批量写入，写入成功才清空缓冲（原地修改 pending）"""
+    with lock:
+        if not pending:
+            return
+        rows = pending[:]
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(
+                "INSERT INTO messages (session_id, agent, seq, role, content, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        del pending[:len(rows)]
+
+
+def _flush_on_collect(connection: sqlite3.Connection, lock: threading.RLock, pending: list[tuple], label: str):
+    try:
+        _write_rows(connection, lock, pending)
+    except Exception as e:
+        logger.warning(f"Failed to flush memory {label}: {e}")
+
+
+def _flush_all():
+    for memory in list(_instances.values()):
+        try:
+            memory.flush()
+        except Exception as e:
+            logger.warning(f"Failed to flush memory {memory.session_id}/{memory.agent}: {e}")
+
+
+class SQLiteMemory(MemoryProvider):
+    """
+    单文件 SQLite 存储
+
+    所有会话、所有 Agent 的上下文都保存在同一个数据库文件中（WAL 模式），
+    按 会话id + Agent名称 + 顺序 建立索引，读取某个会话最近的 N 条消息为一次索引范围扫描。
+    新消息先在内存中缓冲，达到 batch_size 条或读取时批量写入。
+    """
+
+    def __init__(
+            self,
+            global_id: str,
+            prefix: str = "default",
+            memory_path: str = "memory_data",
+            batch_size: int = 16,
+            db_name: str = DEFAULT_DB_NAME,
+    ) -> None:
+        self.session_id = global_id
+        self.agent = prefix
+        self.db_path = str(Path(memory_path) / db_name)
+        self.batch_size = max(1, batch_size)
+        self._connection, self._lock = get_connection(self.db_path)
+
+        self._pending: list[tuple] = []
+        """尚未写入数据库的消息"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT MIN(seq), MAX(seq) FROM messages WHERE session_id = ? AND agent = ?",
+                (self.session_id, self.agent),
+            ).fetchone()
+        self._head_seq = row[0] if row[0] is not None else 0
+        self._next_seq = row[1] + 1 if row[1] is not None else 0
+        _instances[id(self)] = self
+        # 实例被回收（例如管家为新会话替换上下文）或进程退出时写入缓冲的消息；回调不能引用 self
+        weakref.finalize(self, _flush_on_collect, self._connection, self._lock, self._pending,
+                         f"{self.session_id}/{self.agent}")
+        logger.debug(f"Initialized {__class__.__name__} for {self.session_id}/{self.agent} in {self.db_path}")
+
+    @property
+    def memories(self) -> list[ChatMessage]:
+        self.flush()
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? AND agent = ? ORDER BY seq, id",
+                (self.session_id, self.agent),
+            ).fetchall()
+        return [ChatMessage(role=role, content=content) for role, content in rows]
+
+    def recent(self, limit: int) -> list[ChatMessage]:
+        """按时间顺序返回最近的 limit 条消息"""
+        self.flush()
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? AND agent = ? "
+                "ORDER BY seq DESC, id DESC LIMIT ?",
+                (self.session_id, self.agent, limit),
+            ).fetchall()
+        return [ChatMessage(role=role, content=content) for role, content in reversed(rows)]
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        return iter(self.memories)
+
+    def __contains__(self, x: ChatMessage) -> bool:
+        self.flush()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM messages WHERE session_id = ? AND agent = ? AND role = ? AND content IS ? LIMIT 1",
+                (self.session_id, self.agent, x.get("role"), x.get("content")),
+            ).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ? AND agent = ?",
+                (self.session_id, self.agent),
+            ).fetchone()
+        return row[0] + len(self._pending)
+
+    def _row(self, item: ChatMessage, seq: int) -> tuple:
+        return self.session_id, self.agent, seq, item["role"], item.get("content"), time.time()
+
+    def head_add(self, item: ChatMessage):
+        """
+        头插入
+        """
+        with self._lock:
+            self._head_seq -= 1
+            self._pending.append(self._row(item, self._head_seq))
+            self.flush()
+        return len(self)
+
+    def add(self, item: ChatMessage):
+        with self._lock:
+            self._pending.append(self._row(item, self._next_seq))
+            self._next_seq += 1
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+        return len(self)
+
+    def discard(self, item: ChatMessage):
+        self.flush()
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM messages WHERE id = (SELECT id FROM messages WHERE session_id = ? AND agent = ? "
+                "AND role = ? AND content IS ? ORDER BY seq, id LIMIT 1)",
+                (self.session_id, self.agent, item.get("role"), item.get("content")),
+            )
+
+    def clear(self):
+        """Clears the data in memory."""
+        with self._lock:
+            self._pending.clear()
+            self._connection.execute(
+                "DELETE FROM messages WHERE session_id = ? AND agent = ?", (self.session_id, self.agent)
+            )
+            self._head_seq = 0
+            self._next_seq = 0
+
+    def flush(self):
+        """把缓冲的消息在一个事务中批量写入"""
+        _write_rows(self._connection, self._lock, self._pending)
+
+
+def query_messages(
+        memory_path: str = "memory_data",
+        session_id: Optional[str] = None,
+        agent: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: Optional[int] = None,
+        db_name: str = DEFAULT_DB_NAME,
+) -> list[dict]:
+    """
+    跨会话查询消息，例如某个 Agent 最近一天的全部对话
+    """
+    _flush_all()
+    conditions, params = [], []
+    for column, value in (("session_id", session_id), ("agent", agent)):
+        if value is not None:
+            conditions.append(f"{column} = ?")
+            params.append(value)
+    if since is not None:
+        conditions.append("created_at >= ?")
+        params.append(since)
+
+    sql = "SELECT session_id, agent, role, content, created_at FROM messages"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY created_at DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    connection, lock = get_connection(str(Path(memory_path) / db_name))
+    with lock:
+        rows = connection.execute(sql, params).fetchall()
+    return [
+        {"session_id": s, "agent": a, "role": r, "content": c, "created_at": t}
+        for s, a, r, c, t in rows
+    ]
@@ -0,0 +1,3 @@
+from .tracer import NOOP_SPAN, Span, Tracer, configure_tracer, current_session, get_tracer, percentile, traced
+
+__all__ = ["NOOP_SPAN", "Span", "Tracer", "configure_tracer", "current_session", "get_tracer", "percentile", "traced"]
@@ -0,0 +1,224 @@
+"""
+执行链路追踪
+
+以 span 记录管家流水线中每个环节的耗时（读取页面、精简页面、定位、生成脚本、执行脚本、LLM 请求等），
+LLM 请求的 span 额外记录 prompt/completion token 数与费用。
+每个会话的 span 以 JSON-lines 写入 {trace_path}/{会话id}.jsonl，会话结束时按环节汇总 p50/p95。
+
+父子关系与所属会话通过 contextvars 传递，多个会话在不同线程中执行时互不影响；
+未开启时 span() 返回共享的空实现，几乎没有额外开销。
+"""
+from __future__ import annotations
+
+import contextvars
+import functools
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("aium_span", default=None)
+_current_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("aium_trace_session", default=None)
+_span_ids = itertools.count(1)
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: int
+    parent_id: Optional[int]
+    started_at: float
+    """开始时间（unix 时间戳）"""
+    attributes: dict[str, Any] = field(default_factory=dict)
+    duration: float = 0.0
+    error: Optional[str] = None
+    session_id: Optional[str] = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "error": self.error,
+            **self.attributes,
+        }
+
+
+def current_session() -> Optional[str]:
+    """当前上下文所属的会话，见 Tracer.bind_session；未开启追踪时同样有效"""
+    return _current_session.get()
+
+
+class _SpanContext:
+    __slots__ = ("tracer", "span", "_started", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict[str, Any]):
+        parent = _current_span.get()
+        self.tracer = tracer
+        self.span = Span(name, next(_span_ids), parent.span_id if parent else None, time.time(), attributes)
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self.span)
+        self._started = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.duration = time.perf_counter() - self._started
+        if exc_type is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self._token)
+        self.tracer.record(self.span)
+        return False
+
+
+class _NoopSpan:
+    """未开启追踪时使用的空实现"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def percentile(values: list[float], q: float) -> float:
+    """最近秩百分位，values 需已排序"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+class Tracer:
+    """按会话记录 span 并写入追踪文件"""
+
+    def __init__(self, enabled: bool = False, trace_path: str = "trace_data"):
+        self.enabled = enabled
+        self.trace_path = Path(trace_path)
+        self._lock = threading.Lock()
+        self._spans: dict[Optional[str], list[Span]] = {}
+        """各会话已结束的 span，会话结束时汇总后清除"""
+
+    def span(self, name: str, **attributes):
+        """
+        with tracer.span("locate", step=step_name) as span:
+            ...
+            span.set(cache_hit=True)
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        return _SpanContext(self, name, attributes)
+
+    @staticmethod
+    def bind_session(session_id: str):
+        """之后在当前上下文中结束的 span 都归属于该会话"""
+        _current_session.set(session_id)
+
+    def record(self, span: Span):
+        span.session_id = _current_session.get()
+        with self._lock:
+            self._spans.setdefault(span.session_id, []).append(span)
+            if span.session_id is None:
+                return
+            try:
+                self.trace_path.mkdir(parents=True, exist_ok=True)
+                with (self.trace_path / f"{span.session_id}.jsonl").open("ab") as f:
+                    f.write(orjson.dumps(span.to_dict(), default=str) + b"\n")
+            except OSError as e:
+                logger.warning(f"Failed to write trace for session {span.session_id}: {e}")
+
+    def summary(self, session_id: str, clear: bool = True) -> dict[str, dict[str, Any]]:
+        """按 span 名称汇总：次数、总耗时、p50、p95、token 数与费用"""
+        with self._lock:
+            spans = self._spans.pop(session_id, []) if clear else list(self._spans.get(session_id, []))
+            if clear:
+                # 会话 id 生成之前结束的 span 无法归属，一并丢弃
+                self._spans.pop(None, None)
+
+        grouped: dict[str, list[Span]] = {}
+        for span in spans:
+            grouped.setdefault(span.name, []).append(span)
+
+        result = {}
+        for name, items in grouped.items():
+            durations = sorted(span.duration for span in items)
+            result[name] = {
+                "count": len(items),
+                "errors": sum(1 for span in items if span.error),
+                "total": sum(durations),
+                "p50": percentile(durations, 0.5),
+                "p95": percentile(durations, 0.95),
+                "prompt_tokens": sum(span.attributes.get("prompt_tokens", 0) for span in items),
+                "completion_tokens": sum(span.attributes.get("completion_tokens", 0) for span in items),
+                "cost": sum(span.attributes.get("cost", 0.0) for span in items),
+            }
+        return result
+
+    def report(self, session_id: str) -> str:
+        summary = self.summary(session_id)
+        if not summary:
+            return ""
+        lines = [f"{'stage':<24}{'count':>6}{'total':>10}{'p50':>10}{'p95':>10}{'tokens':>10}{'cost($)':>10}"]
+        for name, stats in sorted(summary.items(), key=lambda item: item[1]["total"], reverse=True):
+            tokens = stats["prompt_tokens"] + stats["completion_tokens"]
+            cost = f"{stats['cost']:.4f}" if stats["cost"] else ""
+            lines.append(
+                f"{name:<24}{stats['count']:>6}{stats['total']:>9.3f}s{stats['p50']:>9.3f}s{stats['p95']:>9.3f}s"
+                f"{tokens or '':>10}{cost:>10}"
+            )
+        return "\n".join(lines)
+
+
+_tracer = Tracer()
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """进程内共享的追踪器"""
+    return _tracer
+
+
+def configure_tracer(enabled: bool, trace_path: str = "trace_data") -> Tracer:
+    """开启或关闭追踪，已记录但尚未汇总的 span 会被保留"""
+    with _tracer_lock:
+        _tracer.enabled = enabled
+        _tracer.trace_path = Path(trace_path)
+        return _tracer
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """把整个函数调用记录为一个 span"""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return func(*args, **kwargs)
+            with _tracer.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
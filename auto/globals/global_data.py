@@ -6,7 +6,15 @@ class IsolateGlobalData:
     rootPath: str = ""
     currentPath: str = ""
     sessionId: str = None
-    _id: str = str(uuid.uuid4()).replace('-', '')
+    _id: str = None
+
+    def __init__(self):
+        # 每个会话独立的数据，避免并行会话之间共享类属性
+        self.browser = "chrome"
+        self.rootPath = ""
+        self.currentPath = ""
+        self.sessionId = None
+        self._id = str(uuid.uuid4()).replace('-', '')
 
 
 class IsolateSteps:
@@ -16,13 +24,21 @@ class IsolateSteps:
         步骤列表
     """
 
+    def __init__(self):
+        self._id = None
+        self.steps = []
+
 
 class LocationItem:
-    def __init__(self, name, locator, value, desc):
+    def __init__(self, name, locator, value, desc, alternatives=None, signature=None):
         self.name = name
         self.locator = locator
         self.value = value
         self.desc = desc
+        self.alternatives = alternatives
+        """定位时记录的备选定位 [[定位方式, 定位的值], ...]，用于本地自愈"""
+        self.signature = signature
+        """定位时记录的元素特征，用于本地自愈"""
 
 
 class LocationItems:
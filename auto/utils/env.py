@@ -0,0 +1,9 @@
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def load_env():
+    """读取 .env 中的环境变量，进程内只执行一次；在首次需要环境变量时调用，而不是导入模块时"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
@@ -18,6 +18,18 @@ class ConfigurationError(AgentException):
     """Error caused by invalid, incompatible or otherwise incorrect configuration"""
 
 
+class DriverNotFoundError(ConfigurationError):
+    """No local browser driver matches the installed browser and downloading is not allowed"""
+
+
+class LLMCacheMissError(AgentException):
+    """The LLM response cache is in replay mode and has no recorded response for the request"""
+
+
+class BudgetExceededError(AgentException):
+    """The LLM token or cost budget would be exceeded by the next request"""
+
+
 class InvalidAgentResponseError(AgentException):
     """The LLM deviated from the prescribed response format"""
 
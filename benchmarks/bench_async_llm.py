@@ -0,0 +1,55 @@
+"""
+异步 LLM 客户端并发测试
+
+对本地桩服务并发发起大量 chat completion，比较 asyncio 直接调用与同步包装（多线程）两种方式的吞吐。
+
+    python -m benchmarks.bench_async_llm --requests 500 --delay 0.2
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from auto.core.llm.async_client import configure_async_client, create_chat_completion_sync
+from benchmarks.stub_llm_server import start_stub_server
+
+MESSAGES = [{"role": "system", "content": "stub"}, {"role": "user", "content": "hello"}]
+
+
+async def run_async(client, requests: int):
+    completions = await asyncio.gather(*[
+        client.create_chat_completion(MESSAGES, model="gpt-3.5-turbo", temperature=0)
+        for _ in range(requests)
+    ])
+    await client.close()
+    return completions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.1, help="桩服务每个请求的模拟延迟（秒）")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=16, help="同步包装方式使用的线程数")
+    args = parser.parse_args()
+
+    server = start_stub_server(delay=args.delay)
+    client = configure_async_client(api_base=server.url, api_key="stub", max_concurrency=args.concurrency)
+
+    started = time.perf_counter()
+    completions = asyncio.run(run_async(client, args.requests))
+    elapsed = time.perf_counter() - started
+    assert all(c.choices[0].message.content for c in completions)
+    print(f"async  : {args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s)")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(lambda _: create_chat_completion_sync(MESSAGES, model="gpt-3.5-turbo"), range(args.requests)))
+    elapsed = time.perf_counter() - started
+    print(f"sync x{args.threads}: {args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s)")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+增量 DOM 快照对比
+
+在 Python 中模拟页面内的 MutationObserver 跟踪器（与 mutation_tracker 中的脚本协议一致），
+每个步骤只展开/收起一个下拉菜单或修改一段文本，对比每次重新获取整页源码并 reduce_dom 与 DomTracker 增量读取的
+传输字符数与 Python 侧耗时，并校验两者输出一致。
+
+    python -m benchmarks.bench_dom_incremental --steps 50 --size-mb 1
+"""
+from __future__ import annotations
+
+import argparse
+import html
+import random
+import time
+from html.parser import HTMLParser
+
+from auto.core.dom import DomTracker, reduce_dom
+from auto.core.dom.mutation_tracker import DIFF_SCRIPT, ID_ATTRIBUTE
+from auto.core.dom.reducer import VOID_ELEMENTS
+
+from benchmarks.bench_dom_reduce import generate_page
+
+
+class Element:
+    def __init__(self, tag: str, attrs: list[tuple[str, str]], parent: "Element" = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: list = []
+        self.parent = parent
+        self.node_id: int = None
+
+
+class TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Element("[document]", [])
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        element = Element(tag, [(k, v or "") for k, v in attrs], self.current)
+        self.current.children.append(element)
+        if tag not in VOID_ELEMENTS:
+            self.current = element
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+class SimulatedPage:
+    """模拟浏览器：序列化规则与跟踪器脚本一致，记录被修改的元素"""
+
+    def __init__(self, source: str):
+        builder = TreeBuilder()
+        builder.feed(source)
+        builder.close()
+        self.html = next(node for node in builder.root.children if isinstance(node, Element))
+        self.body = next(node for node in self.html.children if isinstance(node, Element) and node.tag == "body")
+        self.sequence = 0
+        self.dirty: set[Element] = set()
+        self.installed = False
+
+    def serialize(self, root: Element, with_ids: bool = True) -> str:
+        out = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                out.append(node)
+                continue
+            if isinstance(node, tuple):
+                # 文本节点
+                parent, text = node
+                out.append(text if parent.tag in ("script", "style") else html.escape(text, quote=False))
+                continue
+            if node.node_id is None:
+                self.sequence += 1
+                node.node_id = self.sequence
+            attrs = "".join(f' {k}="{v.replace("&", "&amp;").replace(chr(34), "&quot;")}"' for k, v in node.attrs)
+            out.append(f'<{node.tag} {ID_ATTRIBUTE}="{node.node_id}"{attrs}>' if with_ids else f"<{node.tag}{attrs}>")
+            if node.tag in VOID_ELEMENTS:
+                continue
+            stack.append(f"</{node.tag}>")
+            for child in reversed(node.children):
+                stack.append((node, child) if isinstance(child, str) else child)
+        return "".join(out)
+
+    def page_source(self) -> str:
+        return "<!DOCTYPE html>" + self.serialize(self.html, with_ids=False)
+
+    def execute_script(self, script: str):
+        if script == DIFF_SCRIPT:
+            if not self.installed:
+                return None
+            changes = [{"id": str(el.node_id), "html": self.serialize(el)} for el in self.dirty]
+            self.dirty.clear()
+            return {"token": "bench", "url": "http://bench/", "changes": changes}
+        self.installed = True
+        self.dirty.clear()
+        return {"token": "bench", "url": "http://bench/", "full": self.serialize(self.html)}
+
+    def containers(self) -> list[Element]:
+        result = []
+        stack = [self.body]
+        while stack:
+            node = stack.pop()
+            for child in node.children:
+                if isinstance(child, Element) and child.tag == "div" and "style" not in dict(child.attrs):
+                    result.append(child)
+                    stack.append(child)
+        return result
+
+
+def mutate(page: SimulatedPage, containers: list[Element], rng: random.Random, dropdowns: dict):
+    """展开或收起一个下拉菜单，或修改一段文本"""
+    target = rng.choice(containers)
+    if target in dropdowns:
+        target.children.remove(dropdowns.pop(target))
+    elif rng.random() < 0.7:
+        menu = Element("ul", [("class", "dropdown-menu")], target)
+        for i in range(5):
+            item = Element("li", [("role", "option")], menu)
+            item.children.append(f"选项 {i}")
+            menu.children.append(item)
+        target.children.append(menu)
+        dropdowns[target] = menu
+    else:
+        target.children.append(f" 已更新 {rng.randint(0, 999)}")
+    # 跟踪器只返回最上层的变化元素
+    page.dirty = {el for el in page.dirty | {target} if not any(a in page.dirty | {target} for a in ancestors(el))}
+
+
+def ancestors(el: Element):
+    node = el.parent
+    while node is not None:
+        yield node
+        node = node.parent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental DOM snapshots")
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--size-mb", type=float, default=1.0, help="生成页面的大小")
+    args = parser.parse_args()
+
+    page = SimulatedPage(generate_page(int(args.size_mb * 1024 * 1024)))
+    containers = page.containers()
+    rng = random.Random(11)
+    dropdowns = {}
+    tracker = DomTracker()
+    tracker.read(page)
+
+    full_chars = incremental_chars = 0
+    full_time = incremental_time = 0.0
+    mismatches = 0
+    for _ in range(args.steps):
+        mutate(page, containers, rng, dropdowns)
+
+        started = time.perf_counter()
+        before = tracker.transferred_chars
+        incremental = tracker.read(page)
+        incremental_time += time.perf_counter() - started
+        incremental_chars += tracker.transferred_chars - before
+
+        source = page.page_source()
+        started = time.perf_counter()
+        full = reduce_dom(source)
+        full_time += time.perf_counter() - started
+        full_chars += len(source)
+        mismatches += full != incremental
+
+    print(f"{args.steps} 步，页面 {len(page.page_source()) / 1024:.0f} KB")
+    print(f"  整页读取：传输 {full_chars / 1024:.0f} KB，reduce_dom {full_time * 1000:.0f} ms")
+    print(f"  增量读取：传输 {incremental_chars / 1024:.0f} KB，精简与替换 {incremental_time * 1000:.0f} ms，"
+          f"加速 {full_time / incremental_time:.1f}x")
+    print(f"  输出{'一致' if not mismatches else f'不一致 {mismatches} 次'}")
+    raise SystemExit(0 if not mismatches else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+DOM 精简性能对比
+
+对比原先基于 BeautifulSoup(html.parser) 的 LocationAgent.prepare 与流式的 reduce_dom，
+校验两者输出一致并给出耗时。未指定页面时生成约 3 MB 的单页应用风格页面。
+
+    python -m benchmarks.bench_dom_reduce
+    python -m benchmarks.bench_dom_reduce saved_page.html other_page.html --rounds 3
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from bs4 import BeautifulSoup
+
+from auto.core.dom import reduce_dom
+
+
+def legacy_prepare(html_source_code: str) -> str:
+    """原 LocationAgent.prepare 的实现"""
+    soup = BeautifulSoup(html_source_code, 'html.parser')
+    for img_tag in soup.find_all('img'):
+        src_attribute = img_tag.get('src')
+        if src_attribute and src_attribute.startswith('data:image/'):
+            img_tag.extract()
+
+    body_tag = soup.body
+    for script_tag in body_tag.find_all('script'):
+        script_tag.extract()
+    for script_tag in body_tag.find_all('style'):
+        script_tag.extract()
+    for element in body_tag.find_all(style="display: none;"):
+        element.extract()
+    for element in body_tag.find_all(style="display:none;"):
+        element.extract()
+
+    # 逐层处理，避免深层页面触发递归深度限制
+    stack = [body_tag]
+    while stack:
+        for element in list(stack.pop()):
+            if isinstance(element, str):
+                element.replace_with(re.sub(r'\n\s+', '\n', element))
+            else:
+                stack.append(element)
+    return str(body_tag)
+
+
+def generate_page(target_bytes: int = 3 * 1024 * 1024, seed: int = 7) -> str:
+    """生成带有内联脚本、样式、base64 图片、隐藏元素与深层嵌套的页面"""
+    rng = random.Random(seed)
+    words = ["订单", "用户", "提交", "搜索", "login", "submit", "cart", "设置", "more", "detail", "&amp;", "&#169;"]
+    base64_image = "data:image/png;base64," + "iVBORw0KGgo" * 200
+
+    def block(depth: int) -> str:
+        indent = "\n" + "    " * depth
+        kind = rng.random()
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+        if kind < 0.05:
+            return f"{indent}<script>var state = {{'id': {rng.randint(0, 10 ** 6)}, 'html': '<div>'}};</script>"
+        if kind < 0.08:
+            return f"{indent}<style>.c{rng.randint(0, 999)} {{ display: none; }}</style>"
+        if kind < 0.12:
+            return f'{indent}<img src="{base64_image}" alt="icon">'
+        if kind < 0.16:
+            return f'{indent}<div style="display: none;">{indent}  <span>{text}</span>{indent}</div>'
+        if kind < 0.40 and depth < 24:
+            children = "".join(block(depth + 1) for _ in range(rng.randint(1, 4)))
+            return (f'{indent}<div class="col  row-{rng.randint(0, 99)} " data-v-{rng.randint(0, 9999):04x}="">'
+                    f'{children}{indent}</div>')
+        if kind < 0.55:
+            return (f'{indent}<input type="text" name="f{rng.randint(0, 999)}" placeholder="{text}" '
+                    f'value="a &quot;b&quot; \'c\'">')
+        if kind < 0.70:
+            return f'{indent}<a href="/item/{rng.randint(0, 10 ** 6)}?x=1&y=2" rel="nofollow  noopener">{text}</a>'
+        if kind < 0.75:
+            return f"{indent}<!-- {text} -->{indent}<br>"
+        return f"{indent}<p>{text}<b>{rng.choice(words)}</b> &lt;{text}&gt;</p>"
+
+    parts = ['<!DOCTYPE html>\n<html>\n<head><title>bench</title>\n<script src="/app.js"></script></head>\n<body>']
+    size = 0
+    while size < target_bytes:
+        chunk = block(1)
+        parts.append(chunk)
+        size += len(chunk.encode("utf-8"))
+    parts.append("\n</body>\n</html>")
+    return "".join(parts)
+
+
+def measure(func, html: str, rounds: int) -> tuple[float, str]:
+    best = float("inf")
+    result = ""
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = func(html)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def bench(name: str, html: str, rounds: int):
+    legacy_time, legacy_result = measure(legacy_prepare, html, rounds)
+    fast_time, fast_result = measure(reduce_dom, html, rounds)
+    status = "一致" if legacy_result == fast_result else "不一致"
+    print(f"{name}: {len(html.encode('utf-8')) / 1024 / 1024:.1f} MB -> {len(fast_result) / 1024:.0f} KB, "
+          f"BeautifulSoup {legacy_time * 1000:.0f} ms, reduce_dom {fast_time * 1000:.0f} ms, "
+          f"加速 {legacy_time / fast_time:.1f}x，输出{status}")
+    return legacy_result == fast_result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark DOM preprocessing")
+    parser.add_argument("pages", nargs="*", help="保存的页面源码文件")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--size-mb", type=float, default=3.0, help="生成页面的大小")
+    args = parser.parse_args()
+
+    ok = True
+    if args.pages:
+        for path in args.pages:
+            with open(path, "r", encoding="utf-8") as f:
+                ok &= bench(path, f.read(), args.rounds)
+    else:
+        ok &= bench("generated", generate_page(int(args.size_mb * 1024 * 1024)), args.rounds)
+    raise SystemExit(0 if ok else 1)
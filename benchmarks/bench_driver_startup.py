@@ -0,0 +1,77 @@
+"""
+浏览器冷启动耗时
+
+对比启动路径上的驱动解析：原先每次启动都调用 webdriver_manager 的 install()（联网探测版本），
+与 driver_resolver 的本地解析（首次检测浏览器版本并查找缓存，之后命中进程内缓存）。
+指定 --launch 时再测量完整的会话冷启动（DriverExecutor().start() 到浏览器可用）。
+
+    python -m benchmarks.bench_driver_startup --browser chrome --rounds 5
+    python -m benchmarks.bench_driver_startup --launch --headless
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from auto.core.drivers import DriverExecutor, DriverMetaData
+from auto.core.drivers.driver_resolver import resolve_driver
+
+
+def legacy_install(browser: str) -> str:
+    """原 init_browser 中的驱动获取方式"""
+    from webdriver_manager.chrome import ChromeDriverManager
+    from webdriver_manager.firefox import GeckoDriverManager
+    from webdriver_manager.microsoft import EdgeChromiumDriverManager
+
+    managers = {"chrome": ChromeDriverManager, "firefox": GeckoDriverManager, "edge": EdgeChromiumDriverManager}
+    return managers[browser]().install()
+
+
+def timed(func, rounds: int) -> tuple[list[float], str]:
+    durations = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            return durations, f"失败：{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+        durations.append(time.perf_counter() - started)
+    return durations, ""
+
+
+def describe(name: str, durations: list[float], error: str):
+    if error:
+        print(f"  {name}: {error}")
+        return
+    print(f"  {name}: 首次 {durations[0] * 1000:.1f} ms，之后平均 "
+          f"{sum(durations[1:]) / max(1, len(durations) - 1) * 1000:.3f} ms（{len(durations)} 次）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark browser cold start")
+    parser.add_argument("--browser", default="chrome", choices=["chrome", "edge", "firefox"])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--launch", action="store_true", help="同时测量完整的浏览器启动")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--skip-legacy", action="store_true", help="跳过 webdriver_manager（离线环境中可能长时间等待）")
+    args = parser.parse_args()
+
+    print(f"驱动解析（{args.browser}）")
+    if not args.skip_legacy:
+        describe("webdriver_manager.install()", *timed(lambda: legacy_install(args.browser), args.rounds))
+
+    resolve_driver.cache_clear()
+    describe("resolve_driver()", *timed(lambda: resolve_driver(args.browser), args.rounds))
+
+    if args.launch:
+        def launch():
+            executor = DriverExecutor().start(DriverMetaData(args.browser, args.headless))
+            executor.close_browser()
+
+        resolve_driver.cache_clear()
+        print("会话冷启动（启动到关闭）")
+        describe("DriverExecutor().start()", *timed(launch, args.rounds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""
+管家流水线端到端基准
+
+在本地测试站点（fixture_site）与按用例回放的 LLM（scripted_llm + stub_llm_server）上，用真实浏览器完整执行
+recognitionIntention -> startSession（doStep）-> stopSession，记录每个用例各阶段的耗时、内存与 LLM 请求次数，
+并校验执行后的页面结果。结果以 JSON 输出，便于在不同提交之间对比。
+
+    python -m benchmarks.bench_e2e --repeat 3 --output e2e.json
+    python -m benchmarks.bench_e2e --set step_mode=batch --set script_fast_path=true --llm-delay 0.5
+    python -m benchmarks.bench_e2e --baseline e2e.json --tracemalloc
+
+--set 覆盖 Config 中的字段；缓存、上下文与追踪文件写入临时目录，每次运行互不影响。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Optional
+
+from benchmarks.fixture_site import FIXTURES_PATH, start_fixture_site
+from benchmarks.scripted_llm import ScriptedLLM
+from benchmarks.stub_llm_server import start_stub_server
+
+STAGES = ("recognitionIntention", "startSession", "stopSession")
+
+
+def max_rss_mb() -> Optional[float]:
+    """进程的峰值常驻内存，不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                                cwd=Path(__file__).parent)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def parse_overrides(values: list[str]) -> dict[str, str]:
+    overrides = {}
+    for value in values:
+        key, sep, raw = value.partition("=")
+        if not sep:
+            raise SystemExit(f"--set expects key=value, got {value}")
+        overrides[key.strip()] = raw.strip()
+    return overrides
+
+
+def wait_for_text(driver, expect: dict, timeout: float = 5.0) -> tuple[bool, Optional[str]]:
+    """页面结果可能在最后一个步骤之后异步更新，轮询到超时为止"""
+    deadline = time.time() + timeout
+    text = None
+    while True:
+        try:
+            text = driver.find_element(expect["locator"], expect["value"]).text
+        except Exception:
+            text = None
+        if text == expect["text"] or time.time() >= deadline:
+            return text == expect["text"], text
+        time.sleep(0.05)
+
+
+def run_case(case: dict, command_registry, config, llm: ScriptedLLM, server, trace: bool) -> dict[str, Any]:
+    from auto.agents.housekeeper import Housekeeper
+    from auto.core.llm.budget import get_budget_ledger
+    from auto.core.tracing import get_tracer
+
+    result: dict[str, Any] = {"case": case["intention"], "status": "success", "error": None, "stages": {}}
+    requests_before = server.requests
+    calls_before = dict(llm.calls)
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+    housekeeper = Housekeeper(command_registry, config)
+    _id = None
+    try:
+        started = time.perf_counter()
+        _id, isolate_global, isolate_steps = housekeeper.recognitionIntention(case["intention"])
+        result["stages"]["recognitionIntention"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        housekeeper.startSession(_id, isolate_global, isolate_steps)
+        result["stages"]["startSession"] = time.perf_counter() - started
+
+        if case.get("expect"):
+            passed, actual = wait_for_text(housekeeper.get_executor(_id).driver, case["expect"])
+            if not passed:
+                result["status"] = "failed"
+                result["error"] = f"Expected {case['expect']['text']!r}, got {actual!r}"
+        if trace:
+            # stopSession 打印追踪报告时会清除汇总，先复制一份
+            result["spans"] = get_tracer().summary(_id, clear=False)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        started = time.perf_counter()
+        try:
+            if _id is not None and housekeeper.get_executor(_id) is not None:
+                housekeeper.stopSession(_id)
+            housekeeper.shutdown()
+        except Exception as e:
+            result["error"] = result["error"] or f"{type(e).__name__}: {e}"
+        result["stages"]["stopSession"] = time.perf_counter() - started
+
+    result["wall_time"] = sum(result["stages"].values())
+    result["llm_requests"] = server.requests - requests_before
+    result["llm_calls"] = {kind: count - calls_before.get(kind, 0) for kind, count in llm.calls.items()
+                           if count - calls_before.get(kind, 0)}
+    if result["llm_calls"].get("unknown"):
+        result["status"] = "failed"
+        result["error"] = result["error"] or "LLM requests did not match the scripted cases"
+    usage = get_budget_ledger().session_totals(_id)
+    result["tokens"] = usage["tokens"]
+    result["python_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024 if tracemalloc.is_tracing() else None
+    result["max_rss_mb"] = max_rss_mb()
+    return result
+
+
+def summarize(results: list[dict]) -> dict[str, Any]:
+    summary: dict[str, Any] = {
+        "cases": len(results),
+        "success": sum(1 for r in results if r["status"] == "success"),
+        "llm_requests": sum(r["llm_requests"] for r in results),
+        "wall_time": sum(r["wall_time"] for r in results),
+        "stages": {},
+    }
+    for stage in (*STAGES, "wall_time"):
+        # 出错的用例没有后续阶段的耗时
+        values = sorted(r["wall_time"] if stage == "wall_time" else r["stages"][stage]
+                        for r in results if stage == "wall_time" or stage in r["stages"])
+        if values:
+            summary["stages"][stage] = {
+                "p50": statistics.median(values),
+                "max": values[-1],
+                "mean": statistics.mean(values),
+            }
+    spans: dict[str, list[float]] = {}
+    for r in results:
+        for name, stats in (r.get("spans") or {}).items():
+            spans.setdefault(name, []).append(stats["total"])
+    summary["spans"] = {name: {"mean": statistics.mean(values), "max": max(values)} for name, values in spans.items()}
+    return summary
+
+
+def compare(summary: dict, baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["summary"]
+    print(f"与 {baseline_path} 对比（p50）：", file=sys.stderr)
+    for stage, stats in summary["stages"].items():
+        before = baseline["stages"].get(stage, {}).get("p50")
+        if before:
+            print(f"  {stage:<22}{before * 1000:9.1f} ms -> {stats['p50'] * 1000:9.1f} ms  "
+                  f"{(stats['p50'] - before) / before:+.1%}", file=sys.stderr)
+    print(f"  {'llm_requests':<22}{baseline['llm_requests']:>9} -> {summary['llm_requests']:>9}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the Housekeeper pipeline")
+    parser.add_argument("--cases", default=str(FIXTURES_PATH / "cases.json"), help="用例文件，格式见 scripted_llm")
+    parser.add_argument("--repeat", type=int, default=1, help="每个用例的执行次数")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="每个 LLM 请求的模拟延迟（秒）")
+    parser.add_argument("--api-delay", type=float, default=0.2, help="测试站点接口的响应延迟（秒）")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="覆盖 Config 中的字段，可重复指定")
+    parser.add_argument("--no-headless", action="store_true")
+    parser.add_argument("--tracemalloc", action="store_true", help="记录 Python 内存分配峰值（会拖慢执行）")
+    parser.add_argument("--output", help="结果 JSON 的输出文件，不指定时输出到标准输出")
+    parser.add_argument("--baseline", help="与之前输出的结果 JSON 对比")
+    args = parser.parse_args()
+
+    with open(args.cases, "r", encoding="utf-8") as f:
+        cases = json.load(f)
+
+    site = start_fixture_site(delay=args.api_delay)
+    llm = ScriptedLLM(cases, site.url)
+    server = start_stub_server(llm.respond, delay=args.llm_delay)
+
+    # LLM 客户端在导入时读取这些环境变量；响应缓存会让第二轮之后的请求不再到达桩服务，默认关闭
+    os.environ["OPENAI_API_BASE"] = server.url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ.setdefault("AIUM_LLM_CACHE", "off")
+
+    from auto.commands import COMMAND_CATEGORIES
+    from auto.config import Config
+    from auto.core.models.command_registry import CommandRegistry
+    from auto.core.tracing import configure_tracer
+
+    overrides = parse_overrides(args.overrides)
+    workdir = tempfile.mkdtemp(prefix="aium-e2e-")
+    settings = {
+        "cache_path": os.path.join(workdir, "cache"),
+        "memory_path": os.path.join(workdir, "memory"),
+        "trace_path": os.path.join(workdir, "trace"),
+        "trace_enabled": True,
+        "selenium_headless": not args.no_headless,
+        **overrides,
+    }
+    config = Config(**settings)
+    configure_tracer(config.trace_enabled, config.trace_path)
+    command_registry = CommandRegistry.with_command_modules(COMMAND_CATEGORIES, config)
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    results = []
+    started = time.perf_counter()
+    try:
+        for _ in range(args.repeat):
+            for case in cases:
+                results.append(run_case(case, command_registry, config, llm, server, config.trace_enabled))
+    finally:
+        if args.tracemalloc:
+            tracemalloc.stop()
+        server.shutdown()
+        site.shutdown()
+
+    summary = summarize(results)
+    summary["elapsed"] = time.perf_counter() - started
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "cases_file": args.cases,
+            "repeat": args.repeat,
+            "llm_delay": args.llm_delay,
+            "api_delay": args.api_delay,
+            "overrides": overrides,
+        },
+        "summary": summary,
+        "results": results,
+    }
+
+    print(f"\n{summary['success']}/{summary['cases']} 个用例成功，LLM 请求 {summary['llm_requests']} 次，"
+          f"总耗时 {summary['elapsed']:.1f}s", file=sys.stderr)
+    for stage, stats in summary["stages"].items():
+        print(f"  {stage:<22}p50 {stats['p50'] * 1000:9.1f} ms  max {stats['max'] * 1000:9.1f} ms", file=sys.stderr)
+    for result in results:
+        if result["status"] != "success":
+            print(f"  {result['status']}: {result['case']}：{result['error']}", file=sys.stderr)
+    if args.baseline:
+        compare(summary, args.baseline)
+
+    payload = json.dumps(output, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+    raise SystemExit(0 if summary["success"] == summary["cases"] else 1)
+
+
+if __name__ == '__main__':
+    main()
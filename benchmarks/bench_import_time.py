@@ -0,0 +1,78 @@
+"""
+启动导入耗时
+
+在子进程中以 python -X importtime 导入命令行入口，统计总耗时与最慢的模块，
+并检查 --help / validate 路径上没有导入 selenium、openai 等较重的依赖。超出预算或导入了这些依赖时以 1 退出，可用于 CI。
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --module main --max-ms 150 --top 15
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+FORBIDDEN = ("selenium", "openai", "aiohttp", "jsonschema", "webdriver_manager", "pydantic", "bs4", "tiktoken")
+"""命令行入口不应在导入时加载的依赖"""
+
+
+def measure(module: str) -> tuple[float, list[tuple[str, float, float]]]:
+    """
+    :return: 总耗时（毫秒），以及每个模块的 (模块名, 自身耗时, 累计耗时)
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if output.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{output.stderr}")
+
+    modules = []
+    total = 0.0
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+        # 顶层导入的缩进为一个空格
+        if name.startswith(" ") and not name.startswith("  "):
+            total += int(cumulative_us) / 1000
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI import time")
+    parser.add_argument("--module", default="auto.cli", help="要导入的模块")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="输出累计耗时最高的模块数")
+    parser.add_argument("--max-ms", type=float, default=None, help="导入耗时预算（毫秒），取中位数比较")
+    args = parser.parse_args()
+
+    totals = []
+    modules = []
+    for _ in range(args.rounds):
+        total, modules = measure(args.module)
+        totals.append(total)
+    median = statistics.median(totals)
+
+    print(f"import {args.module}：中位数 {median:.1f} ms（{args.rounds} 次，最快 {min(totals):.1f} ms）")
+    own = [item for item in modules if item[0].split(".")[0] in ("auto", args.module.split(".")[0])]
+    for name, self_ms, cumulative_ms in sorted(own, key=lambda item: -item[2])[:args.top]:
+        print(f"  {cumulative_ms:8.1f} ms  {self_ms:7.1f} ms  {name}")
+
+    loaded = sorted({name.split(".")[0] for name, _, _ in modules} & set(FORBIDDEN))
+    failed = False
+    if loaded:
+        print(f"  导入了较重的依赖：{', '.join(loaded)}")
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"  超出预算 {args.max_ms:.0f} ms")
+        failed = True
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
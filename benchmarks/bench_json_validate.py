@@ -0,0 +1,76 @@
+"""
+响应解析与校验吞吐测试
+
+对比每次重新读取 schema 并构建 Draft7Validator 的旧实现与缓存编译后的校验器，
+并测量 BaseAgent.extract_and_validate 的整体吞吐。
+
+    python -m benchmarks.bench_json_validate --responses 5000
+"""
+import argparse
+import json
+import os
+import time
+
+from jsonschema import Draft7Validator
+
+from auto.agents.base import BaseAgent
+from auto.config import Config
+from auto.core.json_utils import utilities
+from auto.core.json_utils.utilities import extract_dict_from_response, validate_dict
+
+RESPONSE = json.dumps({
+    "data": {"locators": [{"name": "搜索框", "desc": "百度搜索输入框", "locator": "id", "value": "kw"}]},
+    "thoughts": "找到搜索框",
+    "command": {"name": "taskComplete", "args": {"reason": "提取定位信息完成"}},
+    "next": False,
+}, ensure_ascii=False)
+
+
+def legacy_validate_dict(obj: object, config: Config, schema_name: str = utilities.LLM_DEFAULT_RESPONSE_FORMAT):
+    """原实现：每次都从磁盘读取 schema 并构建校验器"""
+    filename = os.path.join(os.path.dirname(utilities.__file__), f"{schema_name}.json")
+    with open(filename, "r") as f:
+        schema = json.load(f)
+    if config.openai_functions:
+        del schema["properties"]["command"]
+        schema["required"].remove("command")
+    validator = Draft7Validator(schema)
+    errors = sorted(validator.iter_errors(obj), key=lambda e: e.path)
+    return (False, errors) if errors else (True, None)
+
+
+class BenchAgent(BaseAgent):
+    def get_memory(self):
+        return None
+
+    def execute(self, command_name, command_args={}, user_input=""):
+        return None
+
+
+def rate(func, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        func()
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--responses", type=int, default=5000)
+    args = parser.parse_args()
+
+    config = Config()
+    reply = extract_dict_from_response(RESPONSE)
+    agent = BenchAgent(None, config)
+
+    legacy = rate(lambda: legacy_validate_dict(reply, config), args.responses)
+    cached = rate(lambda: validate_dict(reply, config), args.responses)
+    legacy_pipeline = rate(lambda: legacy_validate_dict(json.loads(RESPONSE), config), args.responses)
+    pipeline = rate(lambda: agent.extract_and_validate(RESPONSE), args.responses)
+
+    print(f"validate_dict:        旧实现 {legacy:,.0f}/s，缓存校验器 {cached:,.0f}/s（{cached / legacy:.1f}x）")
+    print(f"extract_and_validate: 旧实现 {legacy_pipeline:,.0f}/s，当前 {pipeline:,.0f}/s（{pipeline / legacy_pipeline:.1f}x）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+流式响应解析测试
+
+桩服务逐段返回内容，比较非流式请求与流式请求 + 增量解析下
+拿到 data.locators 的耗时，以及格式错误的响应被发现的耗时。
+
+    python -m benchmarks.bench_llm_streaming --chunk-delay 0.01
+"""
+import argparse
+import json
+import os
+import time
+
+from auto.core.json_utils.incremental import IncrementalJSONParser
+from auto.core.json_utils.utilities import extract_dict_from_response
+from auto.core.llm.async_client import configure_async_client
+from auto.core.llm.gpt import create_chat_completion, create_chat_completion_stream
+from auto.utils.exceptions import InvalidAgentResponseError
+from benchmarks.stub_llm_server import start_stub_server
+
+MESSAGES = [{"role": "system", "content": "stub"}, {"role": "user", "content": "定位搜索框"}]
+
+VALID = json.dumps({
+    "data": {"locators": [{"name": "搜索框", "desc": "百度搜索输入框", "locator": "id", "value": "kw"}]},
+    "thoughts": "页面中 id 为 kw 的 input 是搜索框，" * 8,
+    "command": {"name": "taskComplete", "args": {"reason": "提取定位信息完成"}},
+    "next": False,
+}, ensure_ascii=False)
+
+MALFORMED = "好的，下面是定位信息：" + VALID
+
+
+def responder(request: dict) -> str:
+    return MALFORMED if "malformed" in request["messages"][-1]["content"] else VALID
+
+
+def non_streaming(messages) -> tuple[float, float]:
+    """返回 (拿到 locators 或发现错误的耗时, 请求总耗时)"""
+    started = time.perf_counter()
+    completion = create_chat_completion(messages, model="gpt-3.5-turbo", temperature=0)
+    extract_dict_from_response(completion.choices[0].message.content)
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+
+def streaming(messages) -> tuple[float, float]:
+    started = time.perf_counter()
+    first = None
+
+    def on_field(path, value):
+        nonlocal first
+        first = time.perf_counter() - started
+
+    parser = IncrementalJSONParser([("data", "locators")], on_field)
+    try:
+        create_chat_completion_stream(messages, parser.feed, model="gpt-3.5-turbo", temperature=0)
+        parser.close()
+    except InvalidAgentResponseError:
+        first = time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="桩服务每段内容之间的间隔（秒）")
+    parser.add_argument("--delay", type=float, default=0.05, help="桩服务返回首个字节前的延迟（秒）")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ["AIUM_LLM_CACHE"] = "off"
+    server = start_stub_server(responder, delay=args.delay, chunk_chars=8, chunk_delay=args.chunk_delay)
+    configure_async_client(api_base=server.url, api_key="stub")
+
+    for name, messages in (("合法响应", MESSAGES), ("格式错误", MESSAGES[:1] + [{"role": "user", "content": "malformed"}])):
+        results = {}
+        for label, run in (("非流式", non_streaming), ("流式", streaming)):
+            samples = [run(messages) for _ in range(args.rounds)]
+            results[label] = (sum(s[0] for s in samples) / len(samples), sum(s[1] for s in samples) / len(samples))
+        (full, full_total), (stream, stream_total) = results["非流式"], results["流式"]
+        print(f"{name}：非流式 {full * 1000:.0f} ms，流式 {stream * 1000:.0f} ms 拿到结果"
+              f"（请求总耗时 {stream_total * 1000:.0f} ms），首个结果提前 {(full - stream) * 1000:.0f} ms")
+    print(f"提前中止的流式请求：{server.aborted_streams}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+生成脚本快速执行对比
+
+在本地测试站点上用真实浏览器执行几组生成脚本风格的步骤，对比原先逐条 WebDriver 命令 + 固定 time.sleep 的 exec 执行，
+与 ScriptFastPath 合并为页面内调用并等待页面稳定的执行，输出每个步骤的平均耗时，并校验两者执行后的页面结果一致。
+
+    python -m benchmarks.bench_script_fast_path --rounds 3 --delay 0.3
+    python -m benchmarks.bench_script_fast_path --browser edge --no-headless
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from auto.core.cache.script_cache import SCRIPT_FILENAME
+from auto.core.drivers import DriverExecutor, DriverMetaData, ScriptFastPath
+
+from benchmarks.fixture_site import start_fixture_site
+
+SCENARIOS = {
+    "search": ("search.html", [
+        'box = driver.find_element("id", "kw")\nbox.send_keys("aium")\n'
+        'button = driver.find_element("id", "su")\nbutton.click()\ntime.sleep(2)',
+        'driver.find_element("css selector", "#results li a").click()\ntime.sleep(1)',
+    ], ("id", "title"), "aium 结果 1"),
+    "form": ("form.html", [
+        'driver.find_element("id", "name").send_keys("张三")\n'
+        'driver.find_element("id", "email").send_keys("zhangsan@example.com")\n'
+        'driver.find_element("id", "bio").send_keys("自动化测试")',
+        'agree = driver.find_element("id", "agree")\nagree.click()',
+        'driver.find_element("id", "submit").click()\ntime.sleep(1)',
+    ], ("id", "summary"), "张三 <zhangsan@example.com> 注册成功"),
+}
+"""场景 -> (页面, 每个步骤的脚本, 结果元素定位, 预期文本)"""
+
+
+def exec_legacy(driver, script_code: str):
+    """原 ScriptAgent.exec_script 的执行方式"""
+    exec(compile(script_code, SCRIPT_FILENAME, "exec"), {"driver": driver, "time": time, "n": 0})
+
+
+def run_scenario(driver, site, scenario: str, backend, rounds: int) -> tuple[list[list[float]], bool]:
+    page, steps, (by, value), expected = SCENARIOS[scenario]
+    durations = [[] for _ in steps]
+    correct = True
+    for _ in range(rounds):
+        driver.get(site.page(page))
+        for index, script_code in enumerate(steps):
+            started = time.perf_counter()
+            backend(driver, script_code)
+            durations[index].append(time.perf_counter() - started)
+        # 两种执行方式结束后都应已是最后一个步骤之后的页面，不再额外等待
+        correct &= driver.find_element(by, value).text == expected
+    return durations, correct
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the script fast path against WebDriver exec")
+    parser.add_argument("--browser", default="chrome", choices=["chrome", "edge"])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=0.3, help="测试站点接口的响应延迟（秒）")
+    parser.add_argument("--no-headless", action="store_true")
+    args = parser.parse_args()
+
+    site = start_fixture_site(delay=args.delay)
+    executor = DriverExecutor().start(DriverMetaData(args.browser, not args.no_headless))
+    driver = executor.driver
+    fast_path = ScriptFastPath()
+
+    failed = False
+    try:
+        for scenario, (_, steps, _, _) in SCENARIOS.items():
+            legacy, legacy_correct = run_scenario(driver, site, scenario, exec_legacy, args.rounds)
+            fast, fast_correct = run_scenario(
+                driver, site, scenario, lambda d, code: fast_path.run(d, code) or exec_legacy(d, code), args.rounds)
+            print(f"{scenario}（{args.rounds} 轮，接口延迟 {args.delay:.1f}s）")
+            for index, script_code in enumerate(steps):
+                legacy_ms = statistics.mean(legacy[index]) * 1000
+                fast_ms = statistics.mean(fast[index]) * 1000
+                summary = script_code.splitlines()[-1]
+                print(f"  步骤 {index + 1}：exec {legacy_ms:7.1f} ms，快速执行 {fast_ms:7.1f} ms，"
+                      f"{legacy_ms / fast_ms:5.1f}x  {summary}")
+            print(f"  结果：exec {'正确' if legacy_correct else '错误'}，快速执行 {'正确' if fast_correct else '错误'}")
+            failed |= not (legacy_correct and fast_correct)
+        stats = fast_path.stats
+        print(f"快速执行 {stats['scripts']} 个脚本，退回 exec {stats['fallbacks']} 个，"
+              f"页面内调用 {stats['page_calls']} 次，WebDriver 执行 {stats['driver_ops']} 个操作")
+    finally:
+        executor.close_browser()
+        site.shutdown()
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
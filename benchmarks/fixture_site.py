@@ -0,0 +1,102 @@
+"""
+本地测试站点
+
+提供 benchmarks/fixtures 下的静态页面，以及页面中调用的模拟接口（按 delay 延迟返回），用于在无网络环境下驱动真实浏览器。
+
+    python -m benchmarks.fixture_site --port 8766 --delay 0.3
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_PATH = Path(__file__).parent / "fixtures"
+
+
+class FixtureSite(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, delay: float = 0.0):
+        super().__init__(address, partial(FixtureHandler, directory=str(FIXTURES_PATH)))
+        self.delay = delay
+        """模拟接口的响应延迟（秒）"""
+        self.api_requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def page(self, name: str) -> str:
+        return f"{self.url}/{name}"
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FixtureSite
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/api/search":
+            query = parse_qs(parts.query).get("q", [""])[0]
+            self._api({"results": [{"id": i, "title": f"{query} 结果 {i}"} for i in range(1, 6)]})
+            return
+        if parts.path == "/api/todos":
+            self._api({"todos": ["阅读需求", "编写用例", "执行回归"]})
+            return
+        super().do_GET()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if urlsplit(self.path).path == "/api/signup":
+            data = json.loads(body or b"{}")
+            self._api({"message": f"{data.get('name', '')} <{data.get('email', '')}> 注册成功"})
+            return
+        self.send_error(404)
+
+    def _api(self, body: dict):
+        with self.server._lock:
+            self.server.api_requests += 1
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def end_headers(self):
+        # 每次都读取最新的页面，避免浏览器缓存影响测量
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_site(host: str = "127.0.0.1", port: int = 0, delay: float = 0.0) -> FixtureSite:
+    """在后台线程启动测试站点，port 为 0 时自动分配端口"""
+    server = FixtureSite((host, port), delay)
+    threading.Thread(target=server.serve_forever, name="aium-fixture-site", daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local fixture site")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--delay", type=float, default=0.0, help="模拟接口的响应延迟（秒）")
+    args = parser.parse_args()
+
+    server = FixtureSite((args.host, args.port), args.delay)
+    print(f"Fixture site listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,107 @@
+"""
+按用例回放的 LLM
+
+作为 stub_llm_server 的 responder，根据系统提示词判断请求来自哪个环节（意图识别、元素定位、脚本生成、批量规划），
+按用例文件中预先写好的步骤、定位与脚本返回固定内容，结果不依赖网络与模型，可重复执行。
+
+用例文件为数组，每个用例包含 intention、rootPath、steps（name、locators、script_code）以及可选的 expect；
+rootPath 与 script_code 中的 {site} 替换为测试站点的地址。步骤名称在所有用例中唯一。
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+from collections import Counter
+from typing import Optional
+
+from auto.core.prompt.prompts import BATCH_PLAN, GENERATE_SCRIPT, INTENTION, LOCATOR
+
+_STEP_NAME = re.compile(r"需要定位的元素:(.*?); ")
+_PLAN_STEP = re.compile(r"^\s*(\d+)\. (.+?)\s*$", re.MULTILINE)
+
+
+def _prefix(prompt: str) -> str:
+    """提示词中第一个占位符之前的部分"""
+    return prompt.split("[[", 1)[0]
+
+
+def reply(data: dict) -> str:
+    return json.dumps({
+        "data": data,
+        "thoughts": "scripted",
+        "command": {"name": "taskComplete", "args": {"reason": "scripted"}},
+        "next": False,
+    }, ensure_ascii=False)
+
+
+class ScriptedLLM:
+    """
+    server = start_stub_server(ScriptedLLM(cases, site.url).respond)
+    """
+
+    def __init__(self, cases: list[dict], site_url: str = ""):
+        self.site_url = site_url
+        self.intentions: dict[str, dict] = {}
+        self.steps: dict[str, dict] = {}
+        for case in cases:
+            self.intentions[case["intention"]] = case
+            for step in case["steps"]:
+                self.steps[step["name"]] = step
+        self.calls: Counter[str] = Counter()
+        """各环节的请求次数，unknown 为无法匹配到用例的请求"""
+        self._lock = threading.Lock()
+
+    def fill(self, text: str) -> str:
+        return text.replace("{site}", self.site_url)
+
+    def respond(self, request: dict) -> str:
+        messages = request.get("messages", [])
+        system = messages[0].get("content", "") if messages else ""
+        user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+
+        if system == INTENTION:
+            kind, content = "intention", self.intention(user)
+        elif system.startswith(LOCATOR):
+            match = _STEP_NAME.search(system)
+            kind, content = "locate", self.locate(match.group(1) if match else None)
+        elif system.startswith(_prefix(GENERATE_SCRIPT)):
+            kind, content = "script", self.script(user)
+        elif system.startswith(_prefix(BATCH_PLAN)):
+            kind, content = "plan", self.plan(user)
+        else:
+            kind, content = "unknown", reply({})
+
+        with self._lock:
+            self.calls[kind] += 1
+            if content is None:
+                self.calls["unknown"] += 1
+        return content if content is not None else reply({})
+
+    def intention(self, intention: str) -> Optional[str]:
+        case = self.intentions.get(intention.strip())
+        if case is None:
+            return None
+        root_path = self.fill(case["rootPath"])
+        return reply({
+            "_global": {"browser": 0, "rootPath": root_path, "currentPath": root_path,
+                        "pageSource": None, "sessionId": None, "_id": None},
+            "steps": [{"num": str(num), "name": step["name"]} for num, step in enumerate(case["steps"], 1)],
+        })
+
+    def locate(self, step_name: Optional[str]) -> Optional[str]:
+        step = self.steps.get((step_name or "").strip())
+        return None if step is None else reply({"locators": step["locators"]})
+
+    def script(self, step_name: str) -> Optional[str]:
+        step = self.steps.get(step_name.strip())
+        return None if step is None else reply({"script_code": self.fill(step["script_code"])})
+
+    def plan(self, prompt: str) -> Optional[str]:
+        plans = []
+        for num, name in _PLAN_STEP.findall(prompt):
+            step = self.steps.get(name)
+            if step is None:
+                return None
+            plans.append({"num": num, "locators": step["locators"], "script_code": self.fill(step["script_code"])})
+        return reply({"plans": plans})
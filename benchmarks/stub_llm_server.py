@@ -0,0 +1,172 @@
+"""
+本地 chat-completions 桩服务
+
+按照 OpenAI chat-completions 的接口格式返回预设内容，用于在无网络环境下验证 LLM 客户端与整条执行链路。
+
+    python -m benchmarks.stub_llm_server --port 8765 --delay 0.2
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python main.py
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+Responder = Callable[[dict], str]
+"""根据请求体返回 assistant 消息内容"""
+
+DEFAULT_CONTENT = json.dumps({
+    "data": {"locators": [], "script_code": ""},
+    "thoughts": "stub",
+    "command": {"name": "taskComplete", "args": {"reason": "stub"}},
+    "next": False,
+}, ensure_ascii=False)
+
+
+def default_responder(request: dict) -> str:
+    return DEFAULT_CONTENT
+
+
+def build_completion(request: dict, content: str) -> dict:
+    prompt_tokens = sum(len(str(m.get("content") or "")) for m in request.get("messages", [])) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "gpt-3.5-turbo"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, responder: Responder, delay: float = 0.0, chunk_chars: int = 8, chunk_delay: float = 0.0):
+        super().__init__(address, StubHandler)
+        self.responder = responder
+        self.delay = delay
+        self.chunk_chars = chunk_chars
+        """stream 请求每个事件包含的字符数"""
+        self.chunk_delay = chunk_delay
+        """模拟模型逐段生成的耗时（秒）：stream 请求每个事件之间的间隔，非流式请求按段数累计"""
+        self.requests = 0
+        self.aborted_streams = 0
+        """客户端提前断开的流式请求数"""
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 才能保持长连接，用于验证客户端的连接复用
+    protocol_version = "HTTP/1.1"
+    # 流式返回的每个事件都很小，关闭 Nagle 算法避免被合并延迟发送
+    disable_nagle_algorithm = True
+    server: StubLLMServer
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.server._lock:
+            self.server.requests += 1
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        try:
+            content = self.server.responder(request)
+        except Exception as e:
+            self._reply(500, {"error": {"message": str(e)}})
+            return
+        if request.get("stream"):
+            self._stream(request, content)
+            return
+        if self.server.chunk_delay:
+            # 非流式请求要等全部内容生成完毕才返回
+            time.sleep(self.server.chunk_delay * -(-len(content) // max(1, self.server.chunk_chars)))
+        self._reply(200, build_completion(request, content))
+
+    def _stream(self, request: dict, content: str):
+        """以 Server-Sent Events 逐段返回内容，客户端断开时停止"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        size = max(1, self.server.chunk_chars)
+        try:
+            for start in range(0, len(content), size):
+                if self.server.chunk_delay:
+                    time.sleep(self.server.chunk_delay)
+                event = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "model": request.get("model", "gpt-3.5-turbo"),
+                    "choices": [{"index": 0, "delta": {"content": content[start:start + size]}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            with self.server._lock:
+                self.server.aborted_streams += 1
+
+    def _reply(self, status: int, body: dict):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(
+        responder: Optional[Responder] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        delay: float = 0.0,
+        chunk_chars: int = 8,
+        chunk_delay: float = 0.0,
+) -> StubLLMServer:
+    """在后台线程启动桩服务，port 为 0 时自动分配端口"""
+    server = StubLLMServer((host, port), responder or default_responder, delay, chunk_chars, chunk_delay)
+    threading.Thread(target=server.serve_forever, name="aium-stub-llm", daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local chat-completions stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="每个请求的模拟延迟（秒）")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="流式请求每段内容之间的间隔（秒）")
+    args = parser.parse_args()
+
+    server = StubLLMServer((args.host, args.port), default_responder, args.delay, chunk_delay=args.chunk_delay)
+    print(f"Stub LLM server listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,98 @@
+import contextvars
+
+import pytest
+
+from auto.core.llm.base import ChatMessage, ChatRole
+from auto.core.llm.budget import MIN_COMPLETION_TOKENS, BudgetLedger, completion_cost
+from auto.core.llm.token_counter import count_messages_tokens
+from auto.core.tracing import get_tracer
+from auto.utils.exceptions import BudgetExceededError
+
+MODEL = "gpt-3.5-turbo"
+MESSAGES = [ChatMessage(role=ChatRole.SYSTEM, content="定位元素"), ChatMessage(role=ChatRole.USER, content="点击搜索按钮")]
+PROMPT_TOKENS = count_messages_tokens(MESSAGES, MODEL)
+
+
+def in_session(session_id: str, func, *args, **kwargs):
+    """在独立的上下文中绑定会话后调用"""
+
+    def run():
+        get_tracer().bind_session(session_id)
+        return func(*args, **kwargs)
+
+    return contextvars.copy_context().run(run)
+
+
+def test_unlimited_ledger_admits_everything():
+    ledger = BudgetLedger()
+    reservation = ledger.admit(MESSAGES, MODEL, 100_000)
+    assert (reservation.model, reservation.max_tokens, reservation.tokens) == (MODEL, 100_000, 0)
+
+
+def test_abort_when_the_request_could_exceed_the_limit():
+    ledger = BudgetLedger(session_tokens=PROMPT_TOKENS + 100)
+    assert ledger.admit(MESSAGES, MODEL, 100).tokens == PROMPT_TOKENS + 100
+    with pytest.raises(BudgetExceededError):
+        BudgetLedger(session_tokens=PROMPT_TOKENS + 100).admit(MESSAGES, MODEL, 101)
+
+
+def test_reservations_count_until_released():
+    ledger = BudgetLedger(suite_tokens=2 * PROMPT_TOKENS + 300)
+    first = ledger.admit(MESSAGES, MODEL, 200)
+    # 第一个请求尚未结束，按最大消耗预留的用量让第二个请求超出上限
+    with pytest.raises(BudgetExceededError):
+        ledger.admit(MESSAGES, MODEL, 200)
+    assert ledger.rejections == 1
+    ledger.release(first)
+    ledger.release(first)
+    second = ledger.admit(MESSAGES, MODEL, 200)
+    assert second.tokens == PROMPT_TOKENS + 200
+
+
+def test_record_replaces_the_reservation_with_actual_usage():
+    ledger = BudgetLedger(session_tokens=10_000)
+    reservation = in_session("s1", ledger.admit, MESSAGES, MODEL, 1000)
+    record = in_session("s1", ledger.record, MODEL, PROMPT_TOKENS, 50, reservation=reservation)
+    assert reservation.released
+    assert record.cost == pytest.approx(completion_cost(MODEL, PROMPT_TOKENS, 50))
+    assert ledger.session_totals("s1")["tokens"] == PROMPT_TOKENS + 50
+    assert ledger._reserved["s1"][0] == 0
+    assert ledger._suite_reserved[0] == 0
+
+
+def test_cache_hits_are_free_and_not_limited():
+    ledger = BudgetLedger(session_tokens=1)
+    record = in_session("s1", ledger.record, MODEL, 1000, 1000, cache_hit=True)
+    assert record.cost == 0.0
+    totals = ledger.session_totals("s1")
+    assert (totals["requests"], totals["cache_hits"], totals["tokens"]) == (1, 1, 0)
+
+
+def test_session_limits_are_per_session():
+    ledger = BudgetLedger(session_tokens=PROMPT_TOKENS + 100)
+    reservation = in_session("s1", ledger.admit, MESSAGES, MODEL, 100)
+    in_session("s1", ledger.record, MODEL, PROMPT_TOKENS, 100, reservation=reservation)
+    with pytest.raises(BudgetExceededError):
+        in_session("s1", ledger.admit, MESSAGES, MODEL, 100)
+    assert in_session("s2", ledger.admit, MESSAGES, MODEL, 100).session_id == "s2"
+
+
+def test_downgrade_shrinks_max_tokens_to_the_remaining_budget():
+    ledger = BudgetLedger(session_tokens=PROMPT_TOKENS + 500, on_exceed="downgrade")
+    reservation = ledger.admit(MESSAGES, MODEL, 2048)
+    assert reservation.max_tokens == 500
+    assert ledger.downgrades == 1
+
+
+def test_downgrade_does_not_go_below_the_minimum_completion():
+    ledger = BudgetLedger(session_tokens=PROMPT_TOKENS + MIN_COMPLETION_TOKENS - 1, on_exceed="downgrade")
+    with pytest.raises(BudgetExceededError):
+        ledger.admit(MESSAGES, MODEL, 2048)
+
+
+def test_downgrade_prefers_the_cheaper_model():
+    limit = completion_cost(MODEL, PROMPT_TOKENS, 1000) * 2
+    assert completion_cost("gpt-4", PROMPT_TOKENS, 1000) > limit
+    ledger = BudgetLedger(session_cost=limit, on_exceed="downgrade", downgrade_model=MODEL)
+    reservation = ledger.admit(MESSAGES, "gpt-4", 1000)
+    assert (reservation.model, reservation.max_tokens) == (MODEL, 1000)
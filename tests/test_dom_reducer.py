@@ -0,0 +1,38 @@
+from pathlib import Path
+
+import pytest
+
+from auto.core.dom import reduce_dom
+from benchmarks.bench_dom_reduce import generate_page, legacy_prepare
+
+FIXTURES = Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures"
+
+
+@pytest.mark.parametrize("name", sorted(path.name for path in FIXTURES.glob("*.html")))
+def test_fixture_pages_match_legacy_output(name):
+    html = (FIXTURES / name).read_text(encoding="utf-8")
+    assert reduce_dom(html) == legacy_prepare(html)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_generated_pages_match_legacy_output(seed):
+    html = generate_page(target_bytes=64 * 1024, seed=seed)
+    assert reduce_dom(html) == legacy_prepare(html)
+
+
+@pytest.mark.parametrize("html", [
+    # 隐藏元素、内联脚本与样式、base64 图片
+    '<html><body><div style="display: none;"><a>x</a></div><div style="display:none;">y</div>'
+    '<script>var a = "</div>";</script><style>p {}</style><img src="data:image/png;base64,AAAA"><img src="/a.png">'
+    '<p>ok</p></body></html>',
+    # 缩进的文本、实体与属性中的引号
+    '<body>\n    <p title="a &quot;b&quot; \'c\'">x &lt; y &amp;&#169;</p>\n\n    <br>\n</body>',
+    # 未闭合与多余的结束标签、自闭合标签
+    '<body><ul><li>1<li>2</ul></span><input type="text"/><p>a<b>b</p>c</body>',
+    # 注释与 doctype
+    '<!DOCTYPE html><body><!-- note --><p>a</p></body>',
+    # 很深的嵌套
+    "<body>" + "<div>" * 2000 + "deep" + "</div>" * 2000 + "</body>",
+])
+def test_edge_cases_match_legacy_output(html):
+    assert reduce_dom(html) == legacy_prepare(html)
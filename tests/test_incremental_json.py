@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from auto.core.json_utils.incremental import IncrementalJSONParser
+from auto.utils.exceptions import InvalidAgentResponseError
+
+RESPONSE = {
+    "thoughts": "定位搜索框，\"kw\" 是其 id",
+    "data": {"locators": [{"name": "搜索框", "locator": "id", "value": "kw", "desc": "输入框"}]},
+    "command": {"name": "taskComplete", "args": {"reason": "done"}},
+    "next": False,
+    "score": -1.5e3,
+}
+
+
+def feed_in_pieces(parser: IncrementalJSONParser, text: str, size: int):
+    for i in range(0, len(text), size):
+        parser.feed(text[i:i + size])
+    parser.close()
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_watched_fields_are_parsed_regardless_of_chunking(size):
+    text = json.dumps(RESPONSE, ensure_ascii=False, indent=2)
+    seen = []
+    parser = IncrementalJSONParser(
+        watch=[("data", "locators"), ("command",), ("next",), ("score",)],
+        on_field=lambda path, value: seen.append(path),
+    )
+    feed_in_pieces(parser, text, size)
+    assert parser.done
+    assert seen == [("data", "locators"), ("command",), ("next",), ("score",)]
+    assert parser.fields[("data", "locators")] == RESPONSE["data"]["locators"]
+    assert parser.fields[("command",)] == RESPONSE["command"]
+    assert parser.fields[("next",)] is False
+    assert parser.fields[("score",)] == -1500.0
+
+
+def test_array_elements_are_addressed_by_index():
+    parser = IncrementalJSONParser(watch=[("steps", 1, "name")])
+    feed_in_pieces(parser, '{"steps": [{"name": "a"}, {"name": "b"}]}', 4)
+    assert parser.fields == {("steps", 1, "name"): "b"}
+
+
+def test_code_fence_is_allowed():
+    parser = IncrementalJSONParser(watch=[("next",)])
+    feed_in_pieces(parser, '```json\n{"next": true}\n```', 2)
+    assert parser.fields[("next",)] is True
+
+
+def test_field_is_reported_as_soon_as_it_closes():
+    seen = []
+    parser = IncrementalJSONParser(watch=[("command",)], on_field=lambda path, value: seen.append(value))
+    parser.feed('{"command": {"name": "x"}, "data": {"loc')
+    assert seen == [{"name": "x"}]
+    assert not parser.done
+
+
+@pytest.mark.parametrize("text", [
+    "好的，以下是结果：{}",
+    '{"a": 1,, "b": 2}',
+    '{"a": tru}',
+    '{"a": "line\nbreak"}',
+    '{"a" 1}',
+    '{"a": [1, 2}',
+])
+def test_malformed_json_fails_early(text):
+    parser = IncrementalJSONParser()
+    with pytest.raises(InvalidAgentResponseError):
+        feed_in_pieces(parser, text, 1)
+
+
+def test_truncated_response_fails_on_close():
+    parser = IncrementalJSONParser()
+    parser.feed('{"data": {"locators": [')
+    with pytest.raises(InvalidAgentResponseError):
+        parser.close()
+
+
+def test_callback_errors_propagate_to_feed():
+    def reject(path, value):
+        raise InvalidAgentResponseError("bad locators")
+
+    parser = IncrementalJSONParser(watch=[("data", "locators")], on_field=reject)
+    with pytest.raises(InvalidAgentResponseError, match="bad locators"):
+        parser.feed('{"data": {"locators": 1}}')
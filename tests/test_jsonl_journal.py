@@ -0,0 +1,87 @@
+import json
+
+from auto.core.llm.base import ChatMessage, ChatRole
+from auto.core.memory.jsonl_journal import JSONLJournalMemory
+
+
+def message(content: str, role: str = ChatRole.USER) -> ChatMessage:
+    return ChatMessage(role=role, content=content)
+
+
+def open_memory(tmp_path, **kwargs) -> JSONLJournalMemory:
+    return JSONLJournalMemory("session", "LocationAgent", memory_path=str(tmp_path), **kwargs)
+
+
+def records(memory: JSONLJournalMemory) -> list[dict]:
+    return [json.loads(line) for line in memory.file_path.read_text(encoding="utf-8").splitlines() if line]
+
+
+def test_replay_applies_operations_in_order(tmp_path):
+    memory = open_memory(tmp_path)
+    memory.add(message("a"))
+    memory.add(message("b"))
+    memory.clear()
+    memory.add(message("c"))
+    memory.head_add(message("system", ChatRole.SYSTEM))
+    memory.add(message("d"))
+
+    reopened = open_memory(tmp_path)
+    assert [item["content"] for item in reopened] == ["system", "c", "d"]
+    assert reopened.memories == memory.memories
+
+
+def test_writes_do_not_load_history(tmp_path):
+    open_memory(tmp_path).add(message("a"))
+    memory = open_memory(tmp_path)
+    assert memory.add(message("b")) is None
+    assert memory._memories is None
+    assert len(memory) == 2
+
+
+def test_corrupt_and_torn_records_are_skipped(tmp_path):
+    memory = open_memory(tmp_path)
+    memory.add(message("a"))
+    with memory.file_path.open("ab") as f:
+        f.write(b'not json\n{"op": "add", "m": {"role": "user", "con')
+
+    # 新的实例先补一个换行，追加的记录不会与写了一半的记录拼接
+    reopened = open_memory(tmp_path)
+    reopened.add(message("b"))
+    assert [item["content"] for item in open_memory(tmp_path)] == ["a", "b"]
+
+
+def test_compaction_rewrites_only_current_messages(tmp_path):
+    memory = open_memory(tmp_path, compact_min_ops=8)
+    memory.load_index()
+    for i in range(3):
+        memory.add(message(str(i)))
+    memory.clear()
+    memory.add(message("kept"))
+    for i in range(4):
+        memory.add(message(f"x{i}"))
+        memory.clear()
+    memory.add(message("last"))
+
+    assert [item["content"] for item in memory] == ["last"]
+    assert len(records(memory)) < 8
+    assert [item["content"] for item in open_memory(tmp_path)] == ["last"]
+
+
+def test_compact_is_replayed_identically(tmp_path):
+    memory = open_memory(tmp_path)
+    memory.add(message("a"))
+    memory.head_add(message("s", ChatRole.SYSTEM))
+    memory.compact()
+    assert records(memory) == [{"op": "add", "m": message("s", ChatRole.SYSTEM)}, {"op": "add", "m": message("a")}]
+    assert [item["content"] for item in open_memory(tmp_path)] == ["s", "a"]
+
+
+def test_legacy_json_file_is_migrated(tmp_path):
+    session_path = tmp_path / "session"
+    session_path.mkdir()
+    (session_path / "LocationAgent_context.json").write_text(
+        json.dumps([message("old 1"), message("old 2", ChatRole.ASSISTANT)]), encoding="utf-8")
+
+    memory = open_memory(tmp_path)
+    memory.add(message("new"))
+    assert [item["content"] for item in open_memory(tmp_path)] == ["old 1", "old 2", "new"]
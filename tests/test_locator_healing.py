@@ -0,0 +1,51 @@
+import pytest
+
+from auto.core.dom import normalize_strategy
+from auto.core.dom.locator_healing import signature_similarity
+
+
+@pytest.mark.parametrize("locator, expected", [
+    ("id", "id"),
+    ("ID", "id"),
+    ("css", "css selector"),
+    ("CSS_SELECTOR", "css selector"),
+    ("By.XPATH", "xpath"),
+    ("by.class_name", "class name"),
+    ("class", "class name"),
+    (" link text ", "link text"),
+    ("PARTIAL_LINK_TEXT", "partial link text"),
+    ("tag", "tag name"),
+    (None, ""),
+])
+def test_normalize_strategy(locator, expected):
+    assert normalize_strategy(locator) == expected
+
+
+BUTTON = {"tag": "button", "id": "su", "type": "submit", "text": "百度一下", "classes": ["btn", "bg"]}
+
+
+def test_identical_signature():
+    assert signature_similarity(BUTTON, dict(BUTTON)) == 1.0
+
+
+def test_changed_id_and_classes_still_match_by_text():
+    redesigned = {**BUTTON, "id": "search-btn", "classes": ["s-btn"]}
+    score = signature_similarity(BUTTON, redesigned)
+    assert 0.5 < score < 1.0
+
+
+def test_different_tag_halves_the_score():
+    link = {**BUTTON, "tag": "a"}
+    assert signature_similarity(BUTTON, link) == pytest.approx(0.5)
+
+
+def test_only_recorded_fields_count():
+    # 记录时为空的字段不参与计算，当前元素多出的属性不影响相似度
+    assert signature_similarity({"tag": "input", "name": "wd"}, {"tag": "input", "name": "wd", "id": "kw"}) == 1.0
+    assert signature_similarity({"tag": "input"}, {"tag": "input"}) == 0.0
+
+
+def test_text_similarity_is_partial():
+    expected = {"tag": "a", "text": "下一页"}
+    assert 0.0 < signature_similarity(expected, {"tag": "a", "text": "下一页 >"}) < 1.0
+    assert signature_similarity(expected, {"tag": "a", "text": ""}) == 0.0
@@ -0,0 +1,145 @@
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+from auto.core.drivers.script_fast_path import ScriptFastPath, ScriptOp, is_chromium, translate_script
+
+IMPORTS = """
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+"""
+
+
+def test_translate_find_and_actions():
+    ops = translate_script(IMPORTS + """
+driver.get("http://localhost/search.html")
+box = driver.find_element(By.ID, "kw")
+box.clear()
+box.send_keys("aium", Keys.ENTER)
+driver.find_element("css selector", "#su").click()
+time.sleep(2)
+""")
+    assert ops == (
+        ScriptOp("get", value="http://localhost/search.html"),
+        ScriptOp("find", "box", "id", "kw"),
+        ScriptOp("clear", "box"),
+        ScriptOp("send_keys", "box", keys=("aium", ("key", "ENTER"))),
+        ScriptOp("find", "__element_1", "css selector", "#su"),
+        ScriptOp("click", "__element_1"),
+        ScriptOp("sleep", seconds=2.0),
+    )
+
+
+def test_translate_wait():
+    ops = translate_script(IMPORTS + """
+link = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.LINK_TEXT, "aium")))
+link.click()
+""")
+    assert ops[0] == ScriptOp("wait", "link", "link text", "aium", seconds=5.0, condition="clickable")
+    assert ops[1] == ScriptOp("click", "link")
+
+
+@pytest.mark.parametrize("script", [
+    # 控制流、函数与未知调用
+    'for id in ["a", "b"]:\n    driver.find_element("id", id).click()\n',
+    'def click():\n    driver.find_element("id", "a").click()\nclick()\n',
+    'driver.execute_script("window.scrollTo(0, 0)")\n',
+    # 非常量的定位与不允许的导入
+    'value = "kw"\ndriver.find_element("id", value)\n',
+    'import os\ndriver.find_element("id", "kw")\n',
+    # WebDriverWait 的 poll_frequency、ignored_exceptions
+    IMPORTS + 'WebDriverWait(driver, 5, 0.1).until(EC.presence_of_element_located((By.ID, "kw")))\n',
+    IMPORTS + 'WebDriverWait(driver, 5, ignored_exceptions=[]).until(EC.presence_of_element_located((By.ID, "kw")))\n',
+    'driver.find_element("id", "kw").send_keys(text)\n',
+    "driver.find_element(\n",
+])
+def test_untranslatable_scripts_fall_back(script):
+    assert translate_script(script) is None
+
+
+def test_in_page_ops():
+    assert ScriptOp("click", "a").in_page()
+    assert ScriptOp("send_keys", "a", keys=("text",)).in_page()
+    assert not ScriptOp("send_keys", "a", keys=(("key", "ENTER"),)).in_page()
+    assert not ScriptOp("get", value="http://localhost").in_page()
+    assert not ScriptOp("sleep", seconds=60).in_page()
+
+
+class _Element:
+    def __init__(self, log, value):
+        self.log, self.value = log, value
+
+    def click(self):
+        self.log.append(("click", self.value))
+
+    def send_keys(self, *keys):
+        self.log.append(("send_keys", self.value, keys))
+
+    def clear(self):
+        self.log.append(("clear", self.value))
+
+
+class _Driver:
+    """页面内执行不可用（例如 CSP 限制），所有操作都由 WebDriver 执行"""
+
+    capabilities = {"browserName": "chrome"}
+
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.log = []
+
+    def execute_async_script(self, *args):
+        return {"done": 0}
+
+    def find_element(self, by, value):
+        if value in self.missing:
+            raise NoSuchElementException(value)
+        return _Element(self.log, value)
+
+
+SEARCH = 'box = driver.find_element("id", "kw")\nbox.send_keys("aium")\ndriver.find_element("id", "su").click()\n'
+
+
+def test_run_executes_each_op_once():
+    driver = _Driver()
+    assert is_chromium(driver)
+    assert ScriptFastPath().run(driver, SEARCH)
+    assert driver.log == [("send_keys", "kw", ("aium",)), ("click", "su")]
+
+
+def test_run_returns_false_for_untranslatable_scripts():
+    fast_path = ScriptFastPath()
+    assert not fast_path.run(_Driver(), "for i in range(2):\n    pass\n")
+    assert fast_path.stats["fallbacks"] == 1
+
+
+def test_failure_before_any_action_is_replayable():
+    with pytest.raises(NoSuchElementException) as info:
+        ScriptFastPath().run(_Driver(missing=["kw"]), SEARCH)
+    assert info.value.aium_replayable
+
+
+def test_failure_after_an_action_is_not_replayable():
+    driver = _Driver(missing=["su"])
+    with pytest.raises(NoSuchElementException) as info:
+        ScriptFastPath().run(driver, SEARCH)
+    assert not info.value.aium_replayable
+    assert driver.log == [("send_keys", "kw", ("aium",))]
+
+
+def test_in_page_timeout_records_position():
+    class TimingOut(_Driver):
+        def execute_async_script(self, script, ops, *args):
+            # 查找与点击在第一次调用中完成，随后单独一批的等待超时
+            if len(ops) == 3:
+                return {"done": 2, "click": True}
+            if len(ops) == 1:
+                return {"done": 0, "error": "Timed out waiting for id=next"}
+            return {"done": 0}
+
+    script = 'driver.find_element("id", "a").click()\n' \
+             'WebDriverWait(driver, 1).until(EC.presence_of_element_located(("id", "next")))\n'
+    with pytest.raises(TimeoutException) as info:
+        ScriptFastPath().run(TimingOut(), script)
+    assert not info.value.aium_replayable
@@ -0,0 +1,97 @@
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+
+from auto.agents.script_agent import ScriptAgent, _failed_line, _replayable_line, is_replayable
+from auto.core.cache.script_cache import SCRIPT_FILENAME
+
+SEARCH = '''from selenium.webdriver.common.by import By
+box = driver.find_element(By.ID, "kw")
+box.send_keys("aium")
+driver.find_element(By.ID, "su").click()
+'''
+
+
+@pytest.mark.parametrize("script, lineno, expected", [
+    (SEARCH, 2, True),
+    (SEARCH, 4, False),
+    # 同一行中失败之前的语句已经跳转
+    ('driver.get("http://localhost"); driver.find_element("id", "kw")\n', 1, False),
+    # 等待与休眠不改变页面
+    ('import time\ntime.sleep(1)\ndriver.find_element("id", "kw").click()\n', 3, True),
+    # 循环中失败时之前的迭代可能已经点击过
+    ('for id in ["a", "b"]:\n    driver.find_element("id", id).click()\n', 2, False),
+    ("driver.find_element(\n", 1, False),
+])
+def test_replayable_line(script, lineno, expected):
+    assert _replayable_line(script, lineno) is expected
+
+
+def _raise_from_script(source: str) -> Exception:
+    def find_element(by, value):
+        raise NoSuchElementException(value)
+
+    class Driver:
+        pass
+
+    driver = Driver()
+    driver.find_element = find_element
+    try:
+        exec(compile(source, SCRIPT_FILENAME, "exec"), {"driver": driver})
+    except NoSuchElementException as e:
+        return e
+    raise AssertionError("script did not fail")
+
+
+def test_failed_line_is_the_top_level_line():
+    assert _failed_line(_raise_from_script('x = 1\ndriver.find_element("id", "kw")\n')) == 2
+
+
+def test_failed_line_inside_a_function_is_unknown():
+    error = _raise_from_script('def find():\n    driver.find_element("id", "kw")\nfind()\n')
+    assert _failed_line(error) is None
+
+
+class _Element:
+    def __init__(self, log, value):
+        self.log, self.value = log, value
+
+    def send_keys(self, *keys):
+        self.log.append(("send_keys", self.value))
+
+    def click(self):
+        self.log.append(("click", self.value))
+
+
+class _Driver:
+    def __init__(self, missing):
+        self.missing = missing
+        self.log = []
+
+    def find_element(self, by, value):
+        if value == self.missing:
+            raise NoSuchElementException(value)
+        return _Element(self.log, value)
+
+
+@pytest.fixture
+def agent():
+    # 只使用 exec 路径，不需要 LLM、缓存与定位自愈
+    agent = ScriptAgent.__new__(ScriptAgent)
+    agent.locator_healer = None
+    agent.fast_path = None
+    agent.script_cache = None
+    return agent
+
+
+def test_exec_script_marks_failure_before_actions_as_replayable(agent):
+    with pytest.raises(NoSuchElementException) as info:
+        agent.exec_script(_Driver("kw"), SEARCH)
+    assert is_replayable(info.value)
+
+
+def test_exec_script_marks_failure_after_actions_as_not_replayable(agent):
+    driver = _Driver("su")
+    with pytest.raises(NoSuchElementException) as info:
+        agent.exec_script(driver, SEARCH)
+    assert not is_replayable(info.value)
+    assert driver.log == [("send_keys", "kw")]